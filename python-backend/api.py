@@ -3,32 +3,73 @@ FinStocks FastAPI Backend
 Handles all business logic, PDF parsing, LLM integrations, and data processing
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
-import yfinance as yf
-import pandas as pd
+import asyncio
 import os
 from dotenv import load_dotenv
 import json
 from datetime import datetime
 import uuid
+from contextlib import asynccontextmanager
 from services.portfolio import portfolio_summary_from_form, portfolio_summariser
 from services.news import news_extractor
 from services.stock_extracter import stock_extractor
 from services.parallel import run_parallel_news_and_macro
 from services.advice import advice as advice_generator
 from services.strategy import strategy as strategy_generator
-from services.macro_analysis import market_trends
+from services.deadline import ClientDisconnected, Deadline, STRATEGY_DEADLINE_SECONDS, run_cancellable
+from services.pipeline import run_market_stage, run_strategy_pipeline, strategy_result
+from services.prefetch import prefetch_market, prefetched_market
+from services.jobs import FINISHED, JobQueueFull, get_job, job_key, submit_job
+from services.metrics import render_metrics
+from services.executors import executor_stats, init_executors, run_in, shutdown_executors, submit
+from services.clients import clients_ready, init_clients
+from services.dashboard import DASHBOARD_NEWS_LIMIT, dashboard_sections, holding_symbols
+from services.health import portfolio_health
+from services.hinglish import hinglish_summaries, holding_articles
+from services.news_store import NEWS_STORE, SENTIMENT_RANGES
+from services.prices import fetch_price_histories, records_by_stock
+from services.risk import risk_signals
+from services.subscriptions import SUBSCRIPTIONS
+from services.covariance import COVARIANCE
+from services.var import VAR_CONFIDENCES, VAR_DEFAULT_PATHS, VAR_MAX_PATHS, portfolio_var
 from classes import UsageClassfier
 
 load_dotenv()
 
+# Non-standard status (nginx convention) logged when the client hung up first.
+CLIENT_CLOSED_REQUEST = 499
+
+NEWS_PAGE_SIZE_MAX = 100
+
+# Comment line sent on idle event streams so proxies don't close them.
+SSE_KEEPALIVE_SECONDS = 15
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared worker pools live for the whole process instead of per request.
+    init_executors()
+    # Clients (and the heavy SDK imports behind them) are built in the
+    # background so the process starts accepting connections right away; a
+    # request that needs one before then waits for it.
+    submit("io", init_clients)
+    # Seeds the covariance store on first start and folds in any daily bars
+    # that arrived since the last run.
+    submit("request", COVARIANCE.refresh)
+    yield
+    SUBSCRIPTIONS.close()
+    shutdown_executors(wait=False)
+
+
 app = FastAPI(
     title="FinStocks API",
     description="AI-powered financial intelligence for Indian retail investors",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS configuration for frontend
@@ -104,6 +145,13 @@ class HinglishNewsResponse(BaseModel):
     news: List[NewsItem]
 
 
+class NewsPageResponse(HinglishNewsResponse):
+    page: int
+    page_size: int
+    total: int
+    has_more: bool
+
+
 class RiskSignal(BaseModel):
     id: str
     type: str  # concentration, overlap, volatility, sector, liquidity
@@ -118,6 +166,21 @@ class RiskSignalsResponse(BaseModel):
     signals: List[RiskSignal]
 
 
+class VaRHorizon(BaseModel):
+    days: int
+    expected_pnl: float
+    var: Dict[str, float]  # loss at each confidence level, e.g. {"0.95": 12500.0}
+    cvar: Dict[str, float]  # average loss beyond the VaR
+
+
+class VaRResponse(BaseModel):
+    currency: str
+    portfolio_value: float
+    paths: int
+    horizons: List[VaRHorizon]
+    missing: List[str]
+
+
 class PDFParseResponse(BaseModel):
     success: bool
     holdings: List[Dict[str, Any]]
@@ -180,6 +243,13 @@ class AdviceRequest(BaseModel):
     query: str
 
 
+class DashboardRequest(BaseModel):
+    userId: Optional[str] = None
+    holdings: Optional[List[Dict[str, Any]]] = None
+    newsLimit: Optional[int] = None
+    stream: bool = True
+
+
 
 # ============== In-Memory Storage (Replace with Supabase in production) ==============
 
@@ -187,6 +257,35 @@ users_db: Dict[str, Dict] = {}
 holdings_db: Dict[str, List[Dict]] = {}
 
 
+def strategy_usage(payload: PortfolioAnalyzeRequest) -> UsageClassfier:
+    """Investor profile for the strategy endpoints, accepting camelCase or snake_case fields."""
+    payload_data = payload.model_dump() if hasattr(payload, "model_dump") else payload.dict()
+    holdings_symbols = [
+        (h.get("symbol") or "").strip().upper()
+        for h in (payload_data.get("holdings") or [])
+        if isinstance(h, dict)
+    ]
+    holdings_symbols = [s for s in holdings_symbols if s]
+    input_stocks = payload_data.get("stocks") or holdings_symbols
+    return UsageClassfier(
+        user_query=payload_data.get("lifestyle") or "",
+        usage="strategy",
+        age=payload_data.get("age"),
+        job_type=payload_data.get("jobType") or payload_data.get("job_type") or "",
+        job=payload_data.get("job") or "",
+        monthly_income=payload_data.get("monthlyIncome") or payload_data.get("monthly_income"),
+        side_income=payload_data.get("sideIncome") or payload_data.get("side_income"),
+        investment_goal=payload_data.get("investmentGoal") or payload_data.get("investment_goal") or "",
+        investment_duration=payload_data.get("investmentDuration") or payload_data.get("investment_duration") or "",
+        risk_preference=payload_data.get("riskPreference") or payload_data.get("risk_preference"),
+        investing_years=payload_data.get("investingYears") or payload_data.get("investing_years"),
+        retirement_age=payload_data.get("retirementAge") or payload_data.get("retirement_age"),
+        martial_status=payload_data.get("martial_status") or payload_data.get("maritalStatus") or "",
+        children=payload_data.get("children"),
+        stocks=input_stocks,
+    )
+
+
 # ============== API Endpoints ==============
 
 @app.get("/")
@@ -200,7 +299,19 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "executors": executor_stats(),
+        "clients_ready": clients_ready(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 
 # ---------- Onboarding Endpoints ----------
@@ -278,27 +389,8 @@ async def stock_data(payload: StocksRequest):
     if not stocks:
         raise HTTPException(status_code=400, detail="stocks must be a non-empty array of symbols")
 
-    stock_data_map: Dict[str, Any] = {}
-
-    for stock in stocks:
-        try:
-            df = yf.download(stock, period="1y", interval="1wk", progress=False)
-            if df.empty:
-                stock_data_map[stock] = {"error": {"message": "No data returned"}}
-                continue
-
-            df.dropna(inplace=True)
-
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.get_level_values(0)
-
-            df.reset_index(inplace=True)
-            if "Date" in df.columns:
-                df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
-
-            stock_data_map[stock] = df.to_dict(orient="records")
-        except Exception as e:
-            stock_data_map[stock] = {"error": {"message": str(e)}}
+    histories = await run_in("node", fetch_price_histories, stocks)
+    stock_data_map = records_by_stock(histories)
 
     return {"stocks": stock_data_map}
 
@@ -308,98 +400,185 @@ async def stock_data(payload: StocksRequest):
 @app.get("/api/portfolio/health", response_model=PortfolioHealthResponse)
 async def get_portfolio_health(userId: str):
     """Get portfolio health score and analysis"""
-    
-    # TODO: Implement actual analysis using LangGraph pipeline
-    # For now, return mock data
-    
-    factors = [
-        HealthFactor(
-            name="Diversification",
-            score=18,
-            max_score=25,
-            status="good",
-            description="Your portfolio spans 6 sectors. Consider adding more exposure to healthcare and consumer goods."
-        ),
-        HealthFactor(
-            name="Volatility",
-            score=15,
-            max_score=25,
-            status="warning",
-            description="High exposure to volatile mid-caps. 35% of holdings show beta > 1.5"
-        ),
-        HealthFactor(
-            name="Overlap",
-            score=22,
-            max_score=25,
-            status="excellent",
-            description="Minimal duplicate holdings across your mutual funds and direct equity."
-        ),
-        HealthFactor(
-            name="Cash Exposure",
-            score=17,
-            max_score=25,
-            status="good",
-            description="12% cash allocation. Slightly high for current market conditions."
-        ),
-    ]
-    
-    overall = sum(f.score for f in factors)
-    
-    return PortfolioHealthResponse(
-        overall_score=overall,
-        factors=factors,
-        last_updated="2 hours ago"
-    )
+    holdings = holdings_db.get(userId, [])
+    histories = await run_in("node", fetch_price_histories, holding_symbols(holdings))
+    health = await run_in("cpu", portfolio_health, holdings, histories)
+    return PortfolioHealthResponse(**health)
 
 
 @app.get("/api/portfolio/risks", response_model=RiskSignalsResponse)
 async def get_risk_signals(userId: str):
     """Get risk signals and warnings"""
-    
-    signals = [
-        RiskSignal(
-            id="1",
-            type="concentration",
-            severity="high",
-            title="High Single-Stock Concentration",
-            description="HDFCBANK represents 10.4% of your portfolio, which is above the recommended 8% threshold for individual stocks.",
-            affected_stocks=["HDFCBANK"],
-            recommendation="Consider reducing position size or adding more diversified holdings."
-        ),
-        RiskSignal(
-            id="2",
-            type="overlap",
-            severity="medium",
-            title="Duplicate Holdings Detected",
-            description="RELIANCE appears in both your direct equity and 2 of your mutual funds, creating 15% effective exposure.",
-            affected_stocks=["RELIANCE"],
-            recommendation="Review your mutual fund holdings to avoid unintended concentration."
-        ),
-        RiskSignal(
-            id="3",
-            type="sector",
-            severity="medium",
-            title="Sector Overweight: Banking",
-            description="18% allocation to Banking sector. Market cap exposure is skewed towards large-cap financials.",
-            affected_stocks=["HDFCBANK", "ICICIBANK"],
-            recommendation="Consider adding exposure to other sectors like healthcare or consumer goods."
-        ),
-        RiskSignal(
-            id="4",
-            type="volatility",
-            severity="low",
-            title="High Beta Holdings",
-            description="TATAMOTORS has a beta of 1.8, contributing to overall portfolio volatility.",
-            affected_stocks=["TATAMOTORS"],
-            recommendation="If risk-averse, consider balancing with low-beta dividend stocks."
-        ),
-    ]
-    
-    return RiskSignalsResponse(signals=signals)
+    holdings = holdings_db.get(userId, [])
+    histories = await run_in("node", fetch_price_histories, holding_symbols(holdings))
+    signals = await run_in("cpu", risk_signals, holdings, histories)
+    return RiskSignalsResponse(signals=[RiskSignal(**signal) for signal in signals])
+
+
+@app.get("/api/portfolio/var", response_model=VaRResponse)
+async def get_portfolio_var(
+    userId: str,
+    paths: int = VAR_DEFAULT_PATHS,
+    confidence: str = ",".join(f"{c:g}" for c in VAR_CONFIDENCES),
+    seed: Optional[int] = None,
+):
+    """Monte Carlo 1-day and 10-day Value at Risk and CVaR of the user's holdings"""
+    holdings = holdings_db.get(userId, [])
+    if not holdings:
+        raise HTTPException(status_code=404, detail="No holdings stored for this user")
+    try:
+        confidences = sorted({float(c) for c in confidence.split(",") if c.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="confidence must be comma-separated numbers, e.g. 0.95,0.99")
+    if not confidences or not all(0.5 <= c < 1 for c in confidences):
+        raise HTTPException(status_code=400, detail="confidence levels must be in [0.5, 1)")
+    if not 1000 <= paths <= VAR_MAX_PATHS:
+        raise HTTPException(status_code=400, detail=f"paths must be between 1000 and {VAR_MAX_PATHS}")
+
+    result = await run_in("node", portfolio_var, holdings, paths, confidences, (1, 10), seed)
+    return VaRResponse(**result)
+
+
+@app.post("/api/dashboard")
+async def get_dashboard(payload: DashboardRequest, request: Request):
+    """Prices, health, risks and news for the dashboard in one call.
+
+    Sections are computed concurrently and streamed as server-sent events in
+    the order they finish, followed by a `done` event. With `stream: false`
+    the endpoint waits for all of them and returns a single JSON object.
+    """
+    holdings = payload.holdings
+    if holdings is None and payload.userId:
+        holdings = holdings_db.get(payload.userId)
+    if not holdings:
+        raise HTTPException(status_code=400, detail="userId with stored holdings or holdings is required")
+
+    sections = dashboard_sections(holdings, payload.newsLimit or DASHBOARD_NEWS_LIMIT)
+
+    if not payload.stream:
+        body: Dict[str, Any] = {"errors": {}}
+        async for name, data, error in sections:
+            if error is not None:
+                body["errors"][name] = str(error)
+            body[name] = data
+        return body
+
+    async def events():
+        try:
+            async for name, data, error in sections:
+                if await request.is_disconnected():
+                    break
+                if error is not None:
+                    yield f"event: error\ndata: {json.dumps({'section': name, 'message': str(error)})}\n\n"
+                else:
+                    yield f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            await sections.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def subscription_symbols(symbols: Optional[str], userId: Optional[str]) -> List[str]:
+    requested = [s for s in (symbols or "").split(",") if s.strip()]
+    if userId:
+        requested += holding_symbols(holdings_db.get(userId, []))
+    return requested
+
+
+@app.get("/api/stream")
+async def stream_updates(request: Request, symbols: Optional[str] = None, userId: Optional[str] = None):
+    """Server-sent `news` and `bar` events for a comma-separated list of symbols and/or a user's holdings.
+
+    Each symbol is polled once by the server however many clients follow it.
+    A client that falls behind gets the latest bar and a capped batch of
+    articles per symbol rather than every intermediate update.
+    """
+    wanted = subscription_symbols(symbols, userId)
+    if not wanted:
+        raise HTTPException(status_code=400, detail="symbols or userId with stored holdings is required")
+
+    subscriber = SUBSCRIPTIONS.connect()
+    subscribed = SUBSCRIPTIONS.subscribe(subscriber, wanted)
+
+    async def events():
+        try:
+            yield f"event: subscribed\ndata: {json.dumps({'symbols': subscribed})}\n\n"
+            while not await request.is_disconnected():
+                batch = await subscriber.next(timeout=SSE_KEEPALIVE_SECONDS)
+                if not batch:
+                    yield ": keepalive\n\n"
+                    continue
+                for update in batch:
+                    data = {"symbol": update["symbol"], "data": update["data"]}
+                    yield f"event: {update['event']}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            SUBSCRIPTIONS.disconnect(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/ws/stream")
+async def stream_updates_ws(websocket: WebSocket, symbols: Optional[str] = None, userId: Optional[str] = None):
+    """WebSocket variant of /api/stream.
+
+    Clients may change their symbols at any time by sending
+    {"subscribe": [...]} or {"unsubscribe": [...]}; updates arrive as
+    {"event": "news" | "bar", "symbol": ..., "data": ...}.
+    """
+    await websocket.accept()
+    subscriber = SUBSCRIPTIONS.connect()
+
+    async def receive():
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                continue
+            invalid = [
+                action for action in ("unsubscribe", "subscribe")
+                if action in message and not (
+                    isinstance(message[action], list) and all(isinstance(s, str) for s in message[action])
+                )
+            ]
+            if invalid:
+                await websocket.send_json({"event": "error", "detail": f"{invalid[0]} must be a list of symbols"})
+                continue
+            if message.get("unsubscribe"):
+                SUBSCRIPTIONS.unsubscribe(subscriber, message["unsubscribe"])
+            if message.get("subscribe"):
+                SUBSCRIPTIONS.subscribe(subscriber, message["subscribe"])
+            await websocket.send_json({"event": "subscribed", "symbols": sorted(subscriber.symbols)})
+
+    receiver = asyncio.create_task(receive())
+    try:
+        SUBSCRIPTIONS.subscribe(subscriber, subscription_symbols(symbols, userId))
+        await websocket.send_json({"event": "subscribed", "symbols": sorted(subscriber.symbols)})
+        while True:
+            updates = asyncio.ensure_future(subscriber.next(timeout=SSE_KEEPALIVE_SECONDS))
+            await asyncio.wait({receiver, updates}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                updates.cancel()
+                receiver.result()
+                break
+            for update in updates.result():
+                await websocket.send_text(json.dumps(update, default=str))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        SUBSCRIPTIONS.disconnect(subscriber)
 
 
 @app.post("/api/portfolio/analyze")
-async def analyze_portfolio(payload: PortfolioAnalyzeRequest):
+async def analyze_portfolio(payload: PortfolioAnalyzeRequest, request: Request):
     """Trigger a new portfolio analysis based on onboarding form data"""
     try:
         payload_data = payload.model_dump() if hasattr(payload, "model_dump") else payload.dict()
@@ -420,12 +599,16 @@ async def analyze_portfolio(payload: PortfolioAnalyzeRequest):
             children=payload_data.get("children"),
             stocks=payload_data.get("stocks") or [],
         )
-        summary_state = portfolio_summariser(state)
+        summary_state = await run_cancellable(
+            request, Deadline(), "portfolio_analyze", portfolio_summariser, state
+        )
         return {
             "profile": payload_data,
             "portfolio": summary_state.get("portfolio"),
             "stocks": summary_state.get("stocks"),
         }
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -446,6 +629,7 @@ async def get_hinglish_news(payload: NewsStocksRequest):
         "portfolio": "",
         "news": "",
         "news_dict": {},
+        "news_sentiment": {},
         "market_news": "",
         "macro_economics": "",
         "macro_economics_dict": {},
@@ -463,83 +647,103 @@ async def get_hinglish_news(payload: NewsStocksRequest):
 @app.get("/api/news/hinglish", response_model=HinglishNewsResponse)
 async def get_hinglish_news(userId: str, limit: int = 10):
     """Get Hinglish news summaries filtered for user's holdings"""
-    
-    # TODO: Implement actual news fetching and LLM summarization
-    # For now, return mock data
-    
-    news = [
-        NewsItem(
-            id="1",
-            title="Reliance Q4 Results Beat Estimates",
-            hinglish_summary="Reliance ke Q4 results expectations se zyada ache aaye hain. Jio aur retail ka growth strong raha. Stock mein short-term mein positive momentum expected hai.",
-            related_stock="RELIANCE",
-            sentiment="positive",
-            source="Economic Times",
-            time_ago="15 min ago",
-            impact="high"
-        ),
-        NewsItem(
-            id="2",
-            title="HDFC Bank's Net Interest Margin Stable",
-            hinglish_summary="HDFC Bank ka NIM stable raha hai despite competition. Deposit growth bhi theek hai. Long-term investors ke liye ye achi news hai.",
-            related_stock="HDFCBANK",
-            sentiment="neutral",
-            source="Moneycontrol",
-            time_ago="1 hour ago",
-            impact="medium"
-        ),
-        NewsItem(
-            id="3",
-            title="IT Sector Faces Headwinds",
-            hinglish_summary="IT companies ko US recession fears se dikkat ho rahi hai. TCS aur Infosys ke guidance cautious hai.",
-            related_stock="TCS",
-            sentiment="negative",
-            source="Business Standard",
-            time_ago="2 hours ago",
-            impact="high"
-        ),
-        NewsItem(
-            id="4",
-            title="Tata Motors EV Sales Surge",
-            hinglish_summary="Tata Motors ke EV sales mein 45% growth dekhi gayi. Nexon EV market leader ban gaya hai.",
-            related_stock="TATAMOTORS",
-            sentiment="positive",
-            source="LiveMint",
-            time_ago="3 hours ago",
-            impact="medium"
-        ),
-        NewsItem(
-            id="5",
-            title="RBI Policy Update",
-            hinglish_summary="RBI ne interest rates unchanged rakhe hain. Banking stocks ke liye ye neutral hai.",
-            related_stock="MARKET",
-            sentiment="neutral",
-            source="Reuters India",
-            time_ago="5 hours ago",
-            impact="high"
-        ),
-    ]
-    
-    return HinglishNewsResponse(news=news[:limit])
+    symbols = holding_symbols(holdings_db.get(userId, []))
+    if not symbols or limit <= 0:
+        return HinglishNewsResponse(news=[])
+
+    articles = await run_in("node", holding_articles, symbols, limit)
+    summaries = await run_in("node", hinglish_summaries, articles)
+    return HinglishNewsResponse(news=[news_item(a, summaries.get(a["id"])) for a in articles])
+
+
+def time_ago(timestamp: int) -> str:
+    seconds = max(0, int(datetime.now().timestamp()) - int(timestamp))
+    for unit, size in (("day", 86400), ("hour", 3600), ("min", 60)):
+        if seconds >= size:
+            count = seconds // size
+            return f"{count} {unit}{'s' if count > 1 and unit != 'min' else ''} ago"
+    return "just now"
+
+
+def news_item(article: Dict[str, Any], summary: Optional[Dict[str, str]] = None) -> NewsItem:
+    """NewsItem for a stored article.
+
+    With an LLM `summary` (see services.hinglish) its text, sentiment and
+    impact are used; otherwise the English summary and the local score.
+    """
+    score = article.get("sentiment")
+    if summary:
+        sentiment, impact = summary["sentiment"], summary["impact"]
+    elif score is None:
+        sentiment, impact = "neutral", "low"
+    else:
+        sentiment = "positive" if score >= 0.15 else "negative" if score <= -0.15 else "neutral"
+        impact = "high" if abs(score) >= 0.5 else "medium" if abs(score) >= 0.2 else "low"
+    return NewsItem(
+        id=str(article["id"]),
+        title=article.get("headline") or "",
+        hinglish_summary=summary["summary"] if summary else article.get("summary") or "",
+        related_stock=article["symbol"],
+        sentiment=sentiment,
+        source=article.get("source") or "",
+        time_ago=time_ago(article["datetime"]),
+        impact=impact,
+    )
 
 
-@app.get("/api/news/stock/{symbol}", response_model=HinglishNewsResponse)
-async def get_stock_news(symbol: str):
-    """Get news for a specific stock"""
-    # Filter news for specific stock
-    all_news = await get_hinglish_news("", 20)
-    filtered = [n for n in all_news.news if n.related_stock.upper() == symbol.upper()]
-    return HinglishNewsResponse(news=filtered)
+def news_page(
+    page: int,
+    page_size: int,
+    query: str = "",
+    symbol: Optional[str] = None,
+    days: Optional[int] = None,
+    sentiment: Optional[str] = None,
+) -> NewsPageResponse:
+    page = max(1, page)
+    page_size = min(max(1, page_size), NEWS_PAGE_SIZE_MAX)
+    articles, total = NEWS_STORE.search(
+        query, symbol=symbol, days=days, sentiment=sentiment,
+        limit=page_size, offset=(page - 1) * page_size,
+    )
+    return NewsPageResponse(
+        news=[news_item(a) for a in articles],
+        page=page,
+        page_size=page_size,
+        total=total,
+        has_more=page * page_size < total,
+    )
+
+
+@app.get("/api/news/stock/{symbol}", response_model=NewsPageResponse)
+async def get_stock_news(symbol: str, page: int = 1, page_size: int = 20, days: Optional[int] = None):
+    """Get stored news for a specific stock, newest first, from the local index"""
+    return await run_in("io", news_page, page, page_size, "", symbol, days)
+
+
+@app.get("/api/news/search", response_model=NewsPageResponse)
+async def search_news(
+    q: str,
+    symbol: Optional[str] = None,
+    days: Optional[int] = None,
+    sentiment: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20,
+):
+    """Keyword search (e.g. "RBI rate") over ingested news; never calls upstream"""
+    if sentiment is not None and sentiment not in SENTIMENT_RANGES:
+        raise HTTPException(status_code=400, detail=f"sentiment must be one of {sorted(SENTIMENT_RANGES)}")
+    return await run_in("io", news_page, page, page_size, q, symbol, days, sentiment)
 
 
 # ---------- Advice & Strategy Endpoints ----------
 
 @app.post("/api/advice")
-async def get_advice(payload: AdviceRequest):
+async def get_advice(payload: AdviceRequest, request: Request):
     """Get AI-generated advice using the stock extractor + pipeline"""
     try:
+        deadline = Deadline()
         usage_state = UsageClassfier(user_query=payload.query.strip())
-        usage_state = stock_extractor(usage_state)
+        usage_state = await run_cancellable(request, deadline, "advice", stock_extractor, usage_state)
 
         state: AppState = {
             "usage": "advice",
@@ -548,6 +752,7 @@ async def get_advice(payload: AdviceRequest):
             "portfolio": "",
             "news": "",
             "news_dict": {},
+            "news_sentiment": {},
             "market_news": "",
             "macro_economics": "",
             "macro_economics_dict": {},
@@ -555,148 +760,184 @@ async def get_advice(payload: AdviceRequest):
             "advice": "",
             "strategy": "",
             "final_proposal": "",
+            "deadline": deadline,
         }
 
-        state = run_parallel_news_and_macro(state)
-        state = advice_generator(state)
+        def pipeline(state):
+            state = run_parallel_news_and_macro(state)
+            return advice_generator(state)
+
+        state = await run_cancellable(request, deadline, "advice", pipeline, state)
 
         return {
             "stocks": state.get("stocks", []),
             "advice": state.get("advice", ""),
             "type": "advice",
         }
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/strategy")
-async def get_strategy(payload: PortfolioAnalyzeRequest):
-    """Get strategy recommendations based on user portfolio data"""
+async def get_strategy(payload: PortfolioAnalyzeRequest, request: Request):
+    """Get strategy recommendations based on user portfolio data
+
+    Send an `Idempotency-Key` header to make retries resume: nodes that
+    finished on an earlier attempt with the same key and payload are not run again.
+    """
     try:
-        payload_data = payload.model_dump() if hasattr(payload, "model_dump") else payload.dict()
-        holdings_symbols = [
-            (h.get("symbol") or "").strip().upper()
-            for h in (payload_data.get("holdings") or [])
-            if isinstance(h, dict)
-        ]
-        holdings_symbols = [s for s in holdings_symbols if s]
-        input_stocks = payload_data.get("stocks") or holdings_symbols
-        usage_state = UsageClassfier(
-            user_query=payload_data.get("lifestyle") or "",
-            usage="strategy",
-            age=payload_data.get("age"),
-            job_type=payload_data.get("jobType") or payload_data.get("job_type") or "",
-            job=payload_data.get("job") or "",
-            monthly_income=payload_data.get("monthlyIncome") or payload_data.get("monthly_income"),
-            side_income=payload_data.get("sideIncome") or payload_data.get("side_income"),
-            investment_goal=payload_data.get("investmentGoal") or payload_data.get("investment_goal") or "",
-            investment_duration=payload_data.get("investmentDuration") or payload_data.get("investment_duration") or "",
-            risk_preference=payload_data.get("riskPreference") or payload_data.get("risk_preference"),
-            investing_years=payload_data.get("investingYears") or payload_data.get("investing_years"),
-            retirement_age=payload_data.get("retirementAge") or payload_data.get("retirement_age"),
-            martial_status=payload_data.get("martial_status") or payload_data.get("maritalStatus") or "",
-            children=payload_data.get("children"),
-            stocks=input_stocks,
-        )
+        usage_state = strategy_usage(payload)
 
         print(usage_state)
 
-        summary_state = portfolio_summariser(usage_state)
-        summary_state = run_parallel_news_and_macro(summary_state)
-        summary_state = market_trends(summary_state)
-        summary_state = strategy_generator(summary_state)
+        # The run is keyed by the payload too, so a key reused with a different
+        # profile or stock list doesn't resume the other payload's nodes.
+        idempotency_key = request.headers.get("Idempotency-Key")
+        run_id = f"strategy:{idempotency_key}:{job_key(usage_state)}" if idempotency_key else None
 
-        return {
-            "portfolio": summary_state.get("portfolio"),
-            "stocks": summary_state.get("stocks"),
-            "market_news": summary_state.get("market_news"),
-            "macro_economics": summary_state.get("macro_economics"),
-            "market_trends": summary_state.get("market_trends"),
-            "strategy": summary_state.get("strategy"),
-        }
+        deadline = Deadline(STRATEGY_DEADLINE_SECONDS)
+        summary_state = await run_cancellable(
+            request, deadline, "strategy", run_strategy_pipeline, usage_state, deadline, None, run_id
+        )
+
+        return strategy_result(summary_state)
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/strategy/jobs", status_code=202)
+async def create_strategy_job(payload: PortfolioAnalyzeRequest):
+    """Start strategy generation in the background, or attach to an identical running job"""
+    try:
+        job, attached = submit_job(strategy_usage(payload))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "10"})
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "attached": attached,
+        "status_url": f"/api/strategy/jobs/{job.id}",
+        "events_url": f"/api/strategy/jobs/{job.id}/events",
+    }
+
+
+@app.get("/api/strategy/jobs/{job_id}")
+async def get_strategy_job(job_id: str):
+    """Current status, progress and (once finished) result of a strategy job"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
+
+
+@app.get("/api/strategy/jobs/{job_id}/events")
+async def stream_strategy_job(job_id: str, request: Request):
+    """Server-sent events for a strategy job: status, per-node progress, then result or error"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        seen = 0
+        while not await request.is_disconnected():
+            batch = await job.wait(seen, timeout=SSE_KEEPALIVE_SECONDS)
+            if not batch:
+                yield ": keepalive\n\n"
+                continue
+            for event in batch:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+            seen += len(batch)
+            if batch[-1]["event"] in ("result", "error") and job.status in FINISHED:
+                break
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/api/strategy/summary")
-async def get_strategy_summary(payload: PortfolioAnalyzeRequest):
+async def get_strategy_summary(payload: PortfolioAnalyzeRequest, request: Request):
     """Generate portfolio summary quickly for incremental strategy loading"""
     try:
-        payload_data = payload.model_dump() if hasattr(payload, "model_dump") else payload.dict()
-        holdings_symbols = [
-            (h.get("symbol") or "").strip().upper()
-            for h in (payload_data.get("holdings") or [])
-            if isinstance(h, dict)
-        ]
-        holdings_symbols = [s for s in holdings_symbols if s]
-        input_stocks = payload_data.get("stocks") or holdings_symbols
-        usage_state = UsageClassfier(
-            user_query=payload_data.get("lifestyle") or "",
-            usage="strategy",
-            age=payload_data.get("age"),
-            job_type=payload_data.get("jobType") or payload_data.get("job_type") or "",
-            job=payload_data.get("job") or "",
-            monthly_income=payload_data.get("monthlyIncome") or payload_data.get("monthly_income"),
-            side_income=payload_data.get("sideIncome") or payload_data.get("side_income"),
-            investment_goal=payload_data.get("investmentGoal") or payload_data.get("investment_goal") or "",
-            investment_duration=payload_data.get("investmentDuration") or payload_data.get("investment_duration") or "",
-            risk_preference=payload_data.get("riskPreference") or payload_data.get("risk_preference"),
-            investing_years=payload_data.get("investingYears") or payload_data.get("investing_years"),
-            retirement_age=payload_data.get("retirementAge") or payload_data.get("retirement_age"),
-            martial_status=payload_data.get("martial_status") or payload_data.get("maritalStatus") or "",
-            children=payload_data.get("children"),
-            stocks=input_stocks,
-        )
+        usage_state = strategy_usage(payload)
+        # Start the market stage now so it overlaps with the summary and with
+        # the user reading it; /api/strategy/market picks it up.
+        prefetch_market(usage_state.stocks or [], usage_state.user_query)
 
-        summary_state = portfolio_summariser(usage_state)
+        summary_state = await run_cancellable(
+            request, Deadline(), "strategy_summary", portfolio_summariser, usage_state
+        )
         return {
             "portfolio": summary_state.get("portfolio"),
             "stocks": summary_state.get("stocks"),
             "user_query": usage_state.user_query,
         }
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/strategy/market")
-async def get_strategy_market(payload: StrategyMarketRequest):
+async def get_strategy_market(payload: StrategyMarketRequest, request: Request):
     """Generate market data and trends for strategy"""
     try:
-        state: AppState = {
-            "usage": "strategy",
-            "user_query": payload.user_query or "",
-            "stocks": payload.stocks,
-            "portfolio": payload.portfolio,
-            "news": "",
-            "news_dict": {},
-            "market_news": "",
-            "macro_economics": "",
-            "macro_economics_dict": {},
-            "market_trends": "",
-            "advice": "",
-            "strategy": "",
-            "final_proposal": "",
-        }
-
-        state = run_parallel_news_and_macro(state)
-        state = market_trends(state)
+        state = None
+        prefetched = prefetched_market(payload.stocks, payload.user_query or "")
+        if prefetched is not None:
+            try:
+                # Shielded: the prefetch is shared, so a disconnect here must not cancel it.
+                state = await asyncio.shield(asyncio.wrap_future(prefetched))
+            except Exception as e:
+                print("Prefetched market stage failed, recomputing:", e)
+
+        if state is None:
+            deadline = Deadline()
+            state: AppState = {
+                "usage": "strategy",
+                "user_query": payload.user_query or "",
+                "stocks": payload.stocks,
+                "portfolio": payload.portfolio,
+                "news": "",
+                "news_dict": {},
+                "news_sentiment": {},
+                "market_news": "",
+                "macro_economics": "",
+                "macro_economics_dict": {},
+                "market_trends": "",
+                "advice": "",
+                "strategy": "",
+                "final_proposal": "",
+                "deadline": deadline,
+            }
+            state = await run_cancellable(request, deadline, "strategy_market", run_market_stage, state)
 
         return {
             "market_news": state.get("market_news"),
             "macro_economics": state.get("macro_economics"),
             "market_trends": state.get("market_trends"),
-            "stocks": state.get("stocks"),
-            "portfolio": state.get("portfolio"),
-            "user_query": state.get("user_query"),
+            "stocks": payload.stocks,
+            "portfolio": payload.portfolio,
+            "user_query": payload.user_query or "",
         }
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/strategy/final")
-async def get_strategy_final(payload: StrategyFinalRequest):
+async def get_strategy_final(payload: StrategyFinalRequest, request: Request):
     """Generate the final strategy using precomputed summary + market data"""
     try:
+        deadline = Deadline()
         state: AppState = {
             "usage": "strategy",
             "user_query": payload.user_query or "",
@@ -704,6 +945,7 @@ async def get_strategy_final(payload: StrategyFinalRequest):
             "portfolio": payload.portfolio,
             "news": "",
             "news_dict": {},
+            "news_sentiment": {},
             "market_news": payload.market_news,
             "macro_economics": payload.macro_economics,
             "macro_economics_dict": {},
@@ -711,11 +953,14 @@ async def get_strategy_final(payload: StrategyFinalRequest):
             "advice": "",
             "strategy": "",
             "final_proposal": "",
+            "deadline": deadline,
         }
 
-        state = strategy_generator(state)
+        state = await run_cancellable(request, deadline, "strategy_final", strategy_generator, state)
         
         return {"strategy": state.get("strategy")}
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
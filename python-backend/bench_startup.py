@@ -0,0 +1,143 @@
+"""
+Startup benchmark for the FinStocks API process.
+
+Measures, in fresh interpreters:
+  - cold import time of `api` (what every autoscaled replica pays first)
+  - time from spawning uvicorn until the first /health request succeeds
+  - time until the lazily built LLM / Finnhub clients are ready
+
+Usage:
+    python bench_startup.py                 # 5 runs, print medians
+    python bench_startup.py --runs 10 --max-import 1.5 --max-ready 3
+    python bench_startup.py --importtime    # also list the slowest imports
+
+With --max-import / --max-ready the script exits non-zero when a median is
+over budget, so it can gate CI on startup regressions.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import api; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "bench")
+    env["PYTHONPATH"] = HERE + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def cold_import() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=HERE, env=_env(), capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int = 15):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api"],
+        cwd=HERE, env=_env(), capture_output=True, text=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.replace("import time:", "").split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_request(timeout: float = 60.0):
+    """Seconds from spawn until /health answers, and until clients are built."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    ready = None
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited: {proc.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        ready = time.perf_counter() - start
+                        break
+            except OSError:
+                time.sleep(0.02)
+        if ready is None:
+            raise TimeoutError(f"/health did not answer within {timeout}s")
+
+        # The clients are built in the background after startup; wait for them.
+        clients_ready = None
+        while time.perf_counter() - start < timeout:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if json.load(response).get("clients_ready"):
+                    clients_ready = time.perf_counter() - start
+                    break
+            time.sleep(0.02)
+        return ready, clients_ready
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import", type=float, default=None, help="budget for median cold import (s)")
+    parser.add_argument("--max-ready", type=float, default=None, help="budget for median time to first request (s)")
+    parser.add_argument("--importtime", action="store_true", help="list the slowest imports")
+    args = parser.parse_args()
+
+    imports = [cold_import() for _ in range(args.runs)]
+    print(f"cold import of api:     median {statistics.median(imports):.3f}s  (min {min(imports):.3f}s, max {max(imports):.3f}s)")
+
+    runs = [first_request() for _ in range(args.runs)]
+    ready = [r for r, _ in runs]
+    print(f"time to first request:  median {statistics.median(ready):.3f}s  (min {min(ready):.3f}s, max {max(ready):.3f}s)")
+    warm = [c for _, c in runs if c is not None]
+    if warm:
+        print(f"time to warm clients:   median {statistics.median(warm):.3f}s")
+
+    if args.importtime:
+        print("\nslowest imports (cumulative / self, ms):")
+        for cumulative, own, name in slowest_imports():
+            print(f"  {cumulative / 1000:8.1f} {own / 1000:8.1f}  {name}")
+
+    failed = False
+    if args.max_import is not None and statistics.median(imports) > args.max_import:
+        print(f"FAIL: cold import over budget of {args.max_import}s")
+        failed = True
+    if args.max_ready is not None and statistics.median(ready) > args.max_ready:
+        print(f"FAIL: time to first request over budget of {args.max_ready}s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
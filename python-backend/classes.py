@@ -1,4 +1,4 @@
-from typing import TypedDict, Literal, List, Optional, Dict
+from typing import Any, TypedDict, Literal, List, Optional, Dict
 from pydantic import BaseModel, Field
 
 class UsageClassfier(BaseModel):
@@ -28,6 +28,7 @@ class AppState(TypedDict):
 
     news : str
     news_dict: Dict
+    news_sentiment: Dict
     market_news : str
 
     
@@ -36,10 +37,20 @@ class AppState(TypedDict):
 
     market_trends : str
 
+    #Optimizer weights (services.optimizer) the strategy explains
+    target_allocation : Dict
+
     advice : str
     strategy : str
     final_proposal : str
 
+    #Investor profile the pipeline was started for (UsageClassfier)
+    profile : Any
+
+    #Request control
+    deadline : Any
+    degraded : Dict
+
     #Optionals
     """
     exsisting_loans : float
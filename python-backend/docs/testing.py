@@ -28,7 +28,7 @@ llm = ChatGroq(
     api_key=os.environ.get("GROQ_API_KEY"),
 )
 
-data = pd.read_csv("DATA3.csv", index_col=False, usecols= ['Query','Stock', 'Day1', 'Day3', 'Day7', 'Date Time', 'Advice'])
+data = pd.read_csv("DATA3.csv", index_col=False, usecols=lambda c: not c.startswith('Unnamed'))
 e = time.perf_counter()
 
 print(s-e)
@@ -60,7 +60,7 @@ for q in advice_queries[:10]:
 
         stocks = list(info.keys())
         for stock in stocks[:-1]:
-            new_row = {"Query" : q, "Stock": stock, 'Day1' : info[stock]['Day1'], 'Day3' : info[stock]['Day3'], 'Day7' : info[stock]['Day7'], 'Date Time' : info[stock]['date_time'], "Advice" : info['advice']}
+            new_row = {"Query" : q, "Stock": stock, 'Day1' : info[stock]['Day1'], 'Day3' : info[stock]['Day3'], 'Day7' : info[stock]['Day7'], 'Date Time' : info[stock]['date_time'], "Advice" : info['advice'], "Model" : MODEL}
             data = pd.concat([data, pd.DataFrame([new_row])], ignore_index=True)
             data.to_csv("DATA3.csv")
 
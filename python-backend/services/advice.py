@@ -4,9 +4,12 @@ import re
 from langchain_core.messages import HumanMessage
 
 from classes import AppState
-from services.clients import llm
+from services import clients
+from services.deadline import bounded
+from services.metrics import instrument_node
 
 
+@instrument_node
 def advice(state: AppState) -> AppState:
     print('\n', "Generating the Advice the user is looking for.\n")
 
@@ -70,7 +73,7 @@ def advice(state: AppState) -> AppState:
     Keep reasons short and avoid long paragraphs. Do not include markdown or extra text.
     """
 
-    response = llm.invoke([HumanMessage(prompt)])
+    response = bounded(clients.llm, state).invoke([HumanMessage(prompt)])
     raw = response.content
 
     match = re.search(r"\{.*\}", raw, flags=re.DOTALL)
@@ -82,6 +85,7 @@ def advice(state: AppState) -> AppState:
     return state
 
 
+@instrument_node
 def advice_data(state: AppState) -> AppState:
     print('\n', "Generating the Advice the user is looking for.\n")
 
@@ -121,7 +125,7 @@ def advice_data(state: AppState) -> AppState:
     """
 
     try:
-        response = llm.invoke([HumanMessage(prompt)])
+        response = bounded(clients.llm, state).invoke([HumanMessage(prompt)])
         raw = response.content
 
         # # Debug: print raw output
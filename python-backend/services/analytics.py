@@ -0,0 +1,190 @@
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+from services.cache import TTLCache
+from services.prices import PRICE_HISTORY_TTL_SECONDS, price_history
+from stocks import NASDAQ, NIFTY50
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Market index each universe's betas are measured against.
+BENCHMARKS = {"NIFTY50": "^NSEI", "NASDAQ": "^GSPC"}
+
+# Weekly bars, as fetched by services.prices.
+PERIODS_PER_YEAR = 52
+
+SECTORS = {
+    **{symbol: entry["sector"] for symbol, entry in NIFTY50.items()},
+    **{symbol: entry["sector"] for symbol, entry in NASDAQ.items()},
+}
+
+# Stats only change when a new bar is downloaded, so they live as long as the histories.
+PORTFOLIO_STATS_CACHE = TTLCache("portfolio_stats", PRICE_HISTORY_TTL_SECONDS)
+
+
+def base_symbol(symbol: str) -> str:
+    """Ticker without an exchange suffix, as used by stocks.py ("TCS.NS" -> "TCS")."""
+    return symbol.upper().rsplit(".", 1)[0] if symbol.upper().endswith((".NS", ".BO")) else symbol.upper()
+
+
+# Sector of symbols the stock lists don't map.
+UNKNOWN_SECTOR = "Other"
+
+
+def sector_of(symbol: str) -> str:
+    return SECTORS.get(base_symbol(symbol), UNKNOWN_SECTOR)
+
+
+def universe_of(symbol: str) -> str:
+    return "NIFTY50" if base_symbol(symbol) in NIFTY50 or symbol.upper().endswith((".NS", ".BO")) else "NASDAQ"
+
+
+def holdings_hash(holdings: List[Dict[str, Any]]) -> str:
+    """Order-independent hash of the (symbol, quantity) positions."""
+    positions: Dict[str, float] = {}
+    for h in holdings:
+        if not isinstance(h, dict):
+            continue
+        symbol = (h.get("symbol") or "").strip().upper()
+        try:
+            quantity = float(h.get("quantity") or 0)
+        except (TypeError, ValueError):
+            quantity = 0.0
+        if symbol and quantity > 0:
+            positions[symbol] = positions.get(symbol, 0.0) + quantity
+    encoded = json.dumps(sorted(positions.items())).encode()
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def _closes(histories: Dict[str, Any], symbols: List[str]) -> "pd.DataFrame":
+    import pandas as pd
+
+    columns = {}
+    for symbol in symbols:
+        df = histories.get(symbol)
+        if isinstance(df, pd.DataFrame) and "Close" in df.columns and len(df) > 2:
+            close = df["Close"].astype(float)
+            index = pd.DatetimeIndex(close.index)
+            # NSE and US bars carry different timezones; align on the calendar date.
+            close.index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+            columns[symbol] = close[~close.index.duplicated(keep="last")]
+    return pd.DataFrame(columns)
+
+
+def _benchmark_returns(universe: str, dates: "pd.Index") -> Optional[np.ndarray]:
+    """Benchmark returns on `dates`, or None if the index could not be fetched."""
+    try:
+        closes = _closes({"index": price_history(BENCHMARKS[universe])}, ["index"])
+    except Exception as e:
+        print(f"Error fetching benchmark {BENCHMARKS[universe]}:", e)
+        return None
+    if closes.empty:
+        return None
+    returns = closes["index"].pct_change().reindex(dates)
+    return None if returns.isna().any() else returns.to_numpy()
+
+
+def compute_stats(holdings: List[Dict[str, Any]], histories: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-symbol and portfolio statistics from the request's price histories.
+
+    Every statistic comes from one weekly return matrix R (dates x symbols):
+    volatility is its column standard deviation, correlation its correlation
+    matrix, beta the covariance of each column with the benchmark over the
+    benchmark variance, and portfolio volatility sqrt(w' cov(R) w).
+    Symbols without usable history keep their weight and sector but get NaN
+    market statistics.
+    """
+    quantities: Dict[str, float] = {}
+    for h in holdings:
+        symbol = (h.get("symbol") or "").strip().upper() if isinstance(h, dict) else ""
+        try:
+            quantity = float(h.get("quantity") or 0)
+        except (TypeError, ValueError):
+            continue
+        if symbol and quantity > 0:
+            quantities[symbol] = quantities.get(symbol, 0.0) + quantity
+
+    symbols = list(quantities)
+    n = len(symbols)
+    closes = _closes(histories, symbols)
+
+    last_price = np.array([
+        closes[s].dropna().iloc[-1] if s in closes.columns and closes[s].notna().any() else np.nan
+        for s in symbols
+    ])
+    values = np.array([quantities[s] for s in symbols]) * last_price
+    if n and np.isfinite(values).any():
+        # Unpriced positions are left out of the value weights rather than guessed.
+        values = np.nan_to_num(values, nan=0.0)
+    else:
+        values = np.array([quantities[s] for s in symbols])
+    weights = values / values.sum() if n and values.sum() > 0 else np.zeros(n)
+
+    volatility = np.full(n, np.nan)
+    beta = np.full(n, np.nan)
+    liquidity = np.full(n, np.nan)
+    correlation = np.eye(n)
+    portfolio_volatility = np.nan
+    portfolio_beta = np.nan
+
+    priced = [s for s in symbols if s in closes.columns]
+    returns = closes[priced].pct_change().iloc[1:].dropna(how="any") if priced else closes
+    if len(returns) >= 3:
+        index = np.array([symbols.index(s) for s in priced])
+        r = returns.to_numpy()
+        cov = np.cov(r, rowvar=False).reshape(len(priced), len(priced))
+        std = np.sqrt(np.diag(cov))
+        volatility[index] = std * np.sqrt(PERIODS_PER_YEAR)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            correlation[np.ix_(index, index)] = np.nan_to_num(cov / np.outer(std, std), nan=0.0)
+        np.fill_diagonal(correlation, 1.0)
+
+        w = weights[index]
+        portfolio_volatility = float(np.sqrt(w @ cov @ w * PERIODS_PER_YEAR))
+
+        universe_weight: Dict[str, float] = {}
+        for symbol, weight in zip(symbols, weights):
+            universe_weight[universe_of(symbol)] = universe_weight.get(universe_of(symbol), 0.0) + weight
+        market = _benchmark_returns(max(universe_weight, key=universe_weight.get), returns.index)
+        if market is not None and market.var() > 0:
+            centred = r - r.mean(axis=0)
+            beta[index] = centred.T @ (market - market.mean()) / (len(market) - 1) / market.var(ddof=1)
+            portfolio_beta = float(np.nansum(weights * beta))
+
+    for i, symbol in enumerate(symbols):
+        df = histories.get(symbol)
+        if hasattr(df, "columns") and {"Close", "Volume"} <= set(df.columns) and len(df):
+            # Average traded value per bar, in the listing currency.
+            liquidity[i] = float((df["Close"] * df["Volume"]).tail(PERIODS_PER_YEAR // 4).mean())
+
+    return {
+        "symbols": symbols,
+        "sectors": [sector_of(s) for s in symbols],
+        "weights": weights,
+        "volatility": volatility,
+        "beta": beta,
+        "liquidity": liquidity,
+        "correlation": correlation,
+        "portfolio_volatility": portfolio_volatility,
+        "portfolio_beta": portfolio_beta,
+        "as_of": returns.index[-1].strftime("%d %b %Y") if len(returns) else None,
+    }
+
+
+def portfolio_stats(holdings: List[Dict[str, Any]], histories: Dict[str, Any]) -> Dict[str, Any]:
+    """`compute_stats`, cached per holdings hash and shared by the health and risk endpoints.
+
+    Results missing a symbol's history (a failed download) are not cached,
+    so the next request retries instead of serving the gap for the TTL.
+    """
+    key = holdings_hash(holdings)
+    stats = PORTFOLIO_STATS_CACHE.get(key)
+    if stats is None:
+        stats = compute_stats(holdings, histories)
+        if not np.isnan(stats["volatility"]).any():
+            PORTFOLIO_STATS_CACHE.set(key, stats)
+    return stats
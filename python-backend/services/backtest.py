@@ -0,0 +1,253 @@
+import os
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+
+from services.covariance import yf_ticker
+from services.executors import map_bounded
+from services.prices import price_history
+
+# A point prediction (Day1 / Day3 / Day7) counts as a hit when the realized
+# close is within this fraction of it; range predictions (advice target_range)
+# are hits when the close falls inside the range.
+BACKTEST_HIT_TOLERANCE = float(os.environ.get("BACKTEST_HIT_TOLERANCE", "0.02"))
+
+# The realized close must fall within this many days of the horizon's end
+# (a weekend plus a holiday); a later close belongs to another period.
+BACKTEST_MAX_GAP_DAYS = int(os.environ.get("BACKTEST_MAX_GAP_DAYS", "4"))
+
+# Local closing time in minutes after midnight, by ticker suffix; everything
+# else closes at 16:00 New York time.
+MARKET_CLOSES = {".NS": 15 * 60 + 30}
+DEFAULT_MARKET_CLOSE = 16 * 60
+
+# Columns of the advice_data prediction log (docs/testing.py) and their horizon in days.
+LOG_HORIZONS = {"Day1": 1, "Day3": 3, "Day7": 7}
+
+# advice time_horizon entries and their horizon in days.
+ADVICE_HORIZONS = {"today": 1, "three_days": 3, "one_week": 7}
+
+DATE_FORMATS = ("%d-%m-%Y %H:%M", "%d-%m-%Y %H-%M")
+
+# yfinance history periods, smallest first, with the days each covers.
+PERIODS = (("1mo", 30), ("3mo", 90), ("6mo", 182), ("1y", 365), ("2y", 730), ("5y", 1826), ("10y", 3652))
+
+COLUMNS = ["model", "stock", "made_at", "horizon", "predicted", "low", "high"]
+
+
+def _parse_dates(values: "pd.Series") -> "pd.Series":
+    import pandas as pd
+
+    parsed = pd.to_datetime(values, format=DATE_FORMATS[0], errors="coerce")
+    for fmt in DATE_FORMATS[1:]:
+        parsed = parsed.fillna(pd.to_datetime(values, format=fmt, errors="coerce"))
+    return parsed
+
+
+def log_predictions(log: "pd.DataFrame", model: str = "unknown") -> "pd.DataFrame":
+    """One row per (stock, horizon) from the Day1/Day3/Day7 prediction log.
+
+    The log's optional Model column names the LLM behind each row; rows
+    without one are attributed to `model`. "NULL" rows from failed runs are dropped.
+    """
+    import pandas as pd
+
+    log = log.copy()
+    log["model"] = log["Model"].fillna(model) if "Model" in log.columns else model
+    log["stock"] = log["Stock"].astype("string").str.strip().str.upper()
+    log["made_at"] = _parse_dates(log["Date Time"])
+    rows = log.melt(
+        id_vars=["model", "stock", "made_at"],
+        value_vars=[c for c in LOG_HORIZONS if c in log.columns],
+        var_name="horizon",
+        value_name="predicted",
+    )
+    rows["horizon"] = rows["horizon"].map(LOG_HORIZONS)
+    rows["predicted"] = pd.to_numeric(rows["predicted"], errors="coerce")
+    rows["low"] = np.nan
+    rows["high"] = np.nan
+    return rows.dropna(subset=["stock", "made_at", "predicted"])[COLUMNS].reset_index(drop=True)
+
+
+def advice_predictions(advice: Dict[str, Any], made_at: Any, model: str = "unknown") -> "pd.DataFrame":
+    """Prediction rows for the time_horizon target ranges of one `advice` response."""
+    import pandas as pd
+
+    rows = []
+    for stock in advice.get("stocks") or []:
+        for key, horizon in ADVICE_HORIZONS.items():
+            target = ((stock.get("time_horizon") or {}).get(key) or {}).get("target_range")
+            bounds = [float(x) for x in re.findall(r"\d+(?:\.\d+)?", str(target or "").replace(",", ""))[:2]]
+            if not bounds:
+                continue
+            low, high = min(bounds), max(bounds)
+            rows.append({
+                "model": model,
+                "stock": str(stock.get("symbol", "")).strip().upper(),
+                "made_at": pd.Timestamp(made_at),
+                "horizon": horizon,
+                "predicted": (low + high) / 2,
+                "low": low,
+                "high": high,
+            })
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def _period(days: int) -> str:
+    return next((name for name, covers in PERIODS if covers >= days), "max")
+
+
+def realized_closes(stocks: List[str], since: "pd.Timestamp") -> Dict[str, "pd.Series"]:
+    """Daily closes per stock from `since` on, through the shared price history cache."""
+    import pandas as pd
+
+    period = _period((pd.Timestamp.now() - since).days + 7)
+
+    def fetch(stock):
+        try:
+            df = price_history(yf_ticker(stock), period=period, interval="1d")
+        except Exception as e:
+            print(f"Error fetching daily history for {stock}:", e)
+            return None
+        if df.empty or "Close" not in df.columns:
+            return None
+        close = df["Close"].astype(float).dropna()
+        index = pd.DatetimeIndex(close.index)
+        close.index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+        return close[~close.index.duplicated(keep="last")].sort_index()
+
+    return {s: c for s, c in zip(stocks, map_bounded(fetch, stocks)) if c is not None and len(c)}
+
+
+def _days(values) -> np.ndarray:
+    return np.asarray(values, dtype="datetime64[D]").astype(np.int64)
+
+
+def join_realized(predictions: "pd.DataFrame", closes: Dict[str, "pd.Series"]) -> "pd.DataFrame":
+    """Add reference and realized closes to every prediction in one vectorized lookup.
+
+    made_at is taken in the stock's market time. The reference is the last
+    close the predictor could have seen: the previous session's when the
+    prediction was made before that day's close. The realized close for a
+    horizon of N days is the first close on or after N calendar days later
+    (so Day1 from a Friday is Monday's close), and only if it falls within
+    BACKTEST_MAX_GAP_DAYS of that day. All histories are laid end to end and
+    keyed by (stock, day), so every prediction is matched with a single
+    searchsorted over the combined keys. Predictions whose horizon has not
+    elapsed yet, or has no close near it, get a NaN realized close.
+    """
+    out = predictions.copy()
+    out["reference"] = np.nan
+    out["realized"] = np.nan
+    stocks = sorted(closes)
+    if not stocks or out.empty:
+        return out
+
+    code = {s: i for i, s in enumerate(stocks)}
+    dates = [_days(closes[s].index) for s in stocks]
+    span = int(max(d.max() for d in dates)) + 1
+    keys = np.concatenate([i * span + d for i, d in enumerate(dates)])
+    prices = np.concatenate([closes[s].to_numpy(dtype=float) for s in stocks])
+    ends = np.cumsum([len(d) for d in dates])
+    starts = ends - np.array([len(d) for d in dates])
+
+    codes = out["stock"].map(code)
+    known = codes.notna().to_numpy()
+    c = codes.fillna(0).astype(np.int64).to_numpy()
+    made = _days(out["made_at"].dt.normalize())
+    horizon = out["horizon"].to_numpy(dtype=np.int64)
+    market_close = out["stock"].map(
+        lambda s: next((m for suffix, m in MARKET_CLOSES.items() if yf_ticker(s).endswith(suffix)), DEFAULT_MARKET_CLOSE)
+    )
+    before_close = (out["made_at"].dt.hour * 60 + out["made_at"].dt.minute < market_close).to_numpy()
+
+    base = np.searchsorted(keys, c * span + made - before_close, side="right") - 1
+    due = c * span + made + horizon
+    target = np.searchsorted(keys, due, side="left")
+    last = len(prices) - 1
+    realized = known & (target < ends[c]) & (keys[np.clip(target, 0, last)] - due <= BACKTEST_MAX_GAP_DAYS)
+    out["reference"] = np.where(known & (base >= starts[c]), prices[np.clip(base, 0, last)], np.nan)
+    out["realized"] = np.where(realized, prices[np.clip(target, 0, last)], np.nan)
+    return out
+
+
+def score(joined: "pd.DataFrame", tolerance: float = BACKTEST_HIT_TOLERANCE) -> "pd.DataFrame":
+    """Hit rate, directional accuracy and error statistics per model, stock and horizon.
+
+    Every metric is first computed as a column over the whole log, then
+    averaged per group; each model also gets an "ALL" row per horizon so
+    models can be compared on the same predictions.
+    """
+    import pandas as pd
+
+    df = joined.copy()
+    evaluated = df["realized"].notna()
+    predicted, realized, reference = df["predicted"], df["realized"], df["reference"]
+    in_range = (realized >= df["low"]) & (realized <= df["high"])
+    near = (realized - predicted).abs() <= tolerance * predicted.abs()
+    ranged = df["low"].notna() & df["high"].notna()
+
+    df["evaluated"] = evaluated
+    df["hit"] = np.where(evaluated, np.where(ranged, in_range, near), np.nan)
+    df["direction"] = np.where(
+        evaluated & reference.notna(),
+        np.sign(predicted - reference) == np.sign(realized - reference),
+        np.nan,
+    )
+    df["error"] = np.where(evaluated, predicted - realized, np.nan)
+    df["abs_error"] = df["error"].abs()
+    df["squared_error"] = df["error"] ** 2
+    df["pct_error"] = df["error"] / realized * 100
+    df["abs_pct_error"] = df["pct_error"].abs()
+
+    metrics = dict(
+        predictions=("stock", "size"),
+        evaluated=("evaluated", "sum"),
+        hit_rate=("hit", "mean"),
+        directional_accuracy=("direction", "mean"),
+        mae=("abs_error", "mean"),
+        rmse=("squared_error", "mean"),
+        mape=("abs_pct_error", "mean"),
+        bias_pct=("pct_error", "mean"),
+    )
+    by_stock = df.groupby(["model", "stock", "horizon"]).agg(**metrics).reset_index()
+    overall = df.groupby(["model", "horizon"]).agg(**metrics).reset_index().assign(stock="ALL")
+    report = pd.concat([by_stock, overall[by_stock.columns]], ignore_index=True)
+    report["rmse"] = np.sqrt(report["rmse"])
+    report["evaluated"] = report["evaluated"].astype(int)
+    report["overall"] = report["stock"] == "ALL"
+    report = report.sort_values(["model", "overall", "stock", "horizon"])
+    return report.drop(columns="overall").reset_index(drop=True)
+
+
+def backtest(predictions: "pd.DataFrame", tolerance: float = BACKTEST_HIT_TOLERANCE) -> "pd.DataFrame":
+    """Score a prediction log (see `log_predictions` / `advice_predictions`) against realized closes."""
+    closes = {} if predictions.empty else realized_closes(
+        sorted(predictions["stock"].unique()), predictions["made_at"].min().normalize()
+    )
+    return score(join_realized(predictions, closes), tolerance)
+
+
+if __name__ == "__main__":
+    # python -m services.backtest docs/DATA3.csv [docs/DATA.csv ...] [--model NAME]
+    import argparse
+
+    import pandas as pd
+
+    from services.executors import init_executors, shutdown_executors
+
+    parser = argparse.ArgumentParser(description="Score stored price predictions against realized closes.")
+    parser.add_argument("logs", nargs="+", help="prediction log CSVs written by docs/testing.py")
+    parser.add_argument("--model", default="unknown", help="model for rows without a Model column")
+    parser.add_argument("--tolerance", type=float, default=BACKTEST_HIT_TOLERANCE)
+    args = parser.parse_args()
+
+    predictions = pd.concat([log_predictions(pd.read_csv(path), args.model) for path in args.logs], ignore_index=True)
+    init_executors()
+    try:
+        report = backtest(predictions, args.tolerance)
+    finally:
+        shutdown_executors()
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(report.round(3).to_string(index=False))
@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from services.metrics import record_cache
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds.
+
+    Expired entries are kept until evicted so callers that are short on time
+    can still fall back to a stale value with `allow_stale=True`.
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def _lookup(self, key: Hashable, allow_stale: bool) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if allow_stale or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    return value
+        return None
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[Any]:
+        value = self._lookup(key, allow_stale)
+        record_cache(self.name, value is not None)
+        return value
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for `key`, computing it at most once across concurrent callers."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another caller may have filled it while we waited for the lock.
+            value = self._lookup(key, False)
+            if value is None:
+                value = compute()
+                if value:
+                    self.set(key, value)
+        with self._lock:
+            if not key_lock.locked():
+                self._key_locks.pop(key, None)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,117 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+CHECKPOINT_DB = os.environ.get("CHECKPOINT_DB", "checkpoints.sqlite3")
+
+# Checkpoints only need to outlive a client's retries of the same request.
+CHECKPOINT_TTL_SECONDS = float(os.environ.get("CHECKPOINT_TTL_SECONDS", str(60 * 60)))
+
+
+def _to_json(value: Any) -> Any:
+    # Node outputs carry numpy / pandas scalars from the technicals; keep
+    # them as numbers where possible instead of stringifying them.
+    if hasattr(value, "item"):
+        try:
+            return value.item()
+        except (TypeError, ValueError):
+            pass
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class CheckpointStore:
+    """SQLite table of node outputs per run, so a retried run can skip finished nodes.
+
+    Rows are keyed by (run id, node, stock); `stock` is "" for nodes that
+    are not per-stock. The outputs are the AppState fields the node
+    produced, stored as JSON.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_DB, ttl: float = CHECKPOINT_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS checkpoints (
+                    run_id TEXT NOT NULL,
+                    node TEXT NOT NULL,
+                    stock TEXT NOT NULL,
+                    outputs TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, node, stock)
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_created ON checkpoints (created_at)")
+            self._conn = conn
+        return self._conn
+
+    def load(self, run_id: str) -> Dict[Tuple[str, Optional[str]], Dict[str, Any]]:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM checkpoints WHERE created_at < ?", (time.time() - self.ttl,))
+            conn.commit()
+            rows = conn.execute(
+                "SELECT node, stock, outputs FROM checkpoints WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {(node, stock or None): json.loads(outputs) for node, stock, outputs in rows}
+
+    def save(self, run_id: str, node: str, stock: Optional[str], outputs: Dict[str, Any]) -> None:
+        encoded = json.dumps(outputs, default=_to_json)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                (run_id, node, stock or "", encoded, time.time()),
+            )
+            conn.commit()
+
+    def clear(self, run_id: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+            conn.commit()
+
+    def run(self, run_id: str) -> "RunCheckpoint":
+        return RunCheckpoint(self, run_id)
+
+
+class RunCheckpoint:
+    """Checkpoints of one run, as handed to DAG.run."""
+
+    def __init__(self, store: CheckpointStore, run_id: str):
+        self.store = store
+        self.run_id = run_id
+
+    def completed(self) -> Dict[Tuple[str, Optional[str]], Dict[str, Any]]:
+        try:
+            return self.store.load(self.run_id)
+        except Exception as e:
+            print(f"Could not load checkpoints for {self.run_id}:", e)
+            return {}
+
+    def save(self, node: str, stock: Optional[str], outputs: Dict[str, Any]) -> None:
+        try:
+            self.store.save(self.run_id, node, stock, outputs)
+        except Exception as e:
+            # Checkpoints only save work on retry; never fail the run over one.
+            print(f"Could not checkpoint {node} for {self.run_id}:", e)
+
+    def clear(self) -> None:
+        try:
+            self.store.clear(self.run_id)
+        except Exception as e:
+            print(f"Could not clear checkpoints for {self.run_id}:", e)
+
+
+CHECKPOINTS = CheckpointStore()
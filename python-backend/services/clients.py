@@ -1,17 +1,52 @@
 import os
+import threading
 
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-import finnhub
+
+from services.metrics import LLM_METRICS
 
 load_dotenv()
 
 MODEL = "llama-3.1-8b-instant"
 
-llm = ChatGroq(
-    temperature=0,
-    model_name=MODEL,
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
+# `llm` and `FIN_CLIENT` are built on first access (PEP 562), so importing a
+# service no longer pulls in langchain_groq and finnhub. The API builds them
+# from its lifespan; scripts and the Streamlit app build them on first use.
+_CLIENTS = ("llm", "FIN_CLIENT")
+_clients_lock = threading.Lock()
+
+
+def _build(name: str):
+    if name == "llm":
+        from langchain_groq import ChatGroq
+
+        return ChatGroq(
+            temperature=0,
+            model_name=MODEL,
+            api_key=os.environ.get("GROQ_API_KEY"),
+            callbacks=[LLM_METRICS],
+        )
+
+    import finnhub
+
+    return finnhub.Client(api_key=os.environ.get("FINNHUB_API"))
+
+
+def __getattr__(name: str):
+    if name not in _CLIENTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _clients_lock:
+        if name not in globals():
+            # Stored as a module global, so later lookups skip __getattr__.
+            globals()[name] = _build(name)
+    return globals()[name]
+
+
+def clients_ready() -> bool:
+    return all(name in globals() for name in _CLIENTS)
+
 
-FIN_CLIENT = finnhub.Client(api_key=os.environ.get("FINNHUB_API"))
+def init_clients() -> None:
+    """Build every client up front; called from the FastAPI lifespan."""
+    for name in _CLIENTS:
+        __getattr__(name)
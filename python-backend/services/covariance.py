@@ -0,0 +1,500 @@
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from services.executors import map_bounded, submit
+from services.prices import price_history
+from stocks import NASDAQ, NIFTY50
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialised within one process.
+    fcntl = None
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+COVARIANCE_DIR = os.environ.get("COVARIANCE_DIR", "covariance")
+
+# Weight of a day's return halves every this many trading days.
+COVARIANCE_HALF_LIFE_DAYS = float(os.environ.get("COVARIANCE_HALF_LIFE_DAYS", "60"))
+
+# History used to seed the matrix, and to backfill symbols added later.
+COVARIANCE_SEED_PERIOD = os.environ.get("COVARIANCE_SEED_PERIOD", "2y")
+
+# The store is not checked for new bars more often than this.
+COVARIANCE_REFRESH_SECONDS = float(os.environ.get("COVARIANCE_REFRESH_SECONDS", str(6 * 60 * 60)))
+
+# Daily closes kept in the store (about two years), used to backfill symbols added later.
+COVARIANCE_HISTORY_DAYS = int(os.environ.get("COVARIANCE_HISTORY_DAYS", "520"))
+
+# A stored close further than this (relative) from a fresh download means the
+# history was re-adjusted for a split or dividend, and the symbol is re-seeded.
+COVARIANCE_READJUST_TOLERANCE = float(os.environ.get("COVARIANCE_READJUST_TOLERANCE", "0.005"))
+
+# Exchange time zone by ticker suffix; everything else trades in New York.
+EXCHANGE_TIMEZONES = {".NS": "Asia/Kolkata"}
+DEFAULT_TIMEZONE = "America/New_York"
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def yf_ticker(symbol: str) -> str:
+    """Yahoo ticker for a symbol; bare NIFTY50 symbols trade on the NSE."""
+    symbol = symbol.strip().upper()
+    return f"{symbol}.NS" if symbol in NIFTY50 else symbol
+
+
+UNIVERSE = [yf_ticker(s) for s in NIFTY50] + list(NASDAQ)
+
+
+def _daily_closes(tickers: List[str], period: str) -> "pd.DataFrame":
+    """Daily closes (dates x tickers) on the union of trading days; NaN where a market was shut."""
+    import pandas as pd
+
+    def fetch(ticker):
+        try:
+            df = price_history(ticker, period=period, interval="1d")
+        except Exception as e:
+            print(f"Error fetching daily history for {ticker}:", e)
+            return None
+        if df.empty or "Close" not in df.columns:
+            return None
+        close = df["Close"].astype(float)
+        index = pd.DatetimeIndex(close.index)
+        close.index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+        return close[~close.index.duplicated(keep="last")]
+
+    columns = {t: c for t, c in zip(tickers, map_bounded(fetch, tickers)) if c is not None}
+    return pd.DataFrame(columns, columns=tickers).sort_index()
+
+
+def _exchange_today(ticker: str) -> "pd.Timestamp":
+    import pandas as pd
+
+    tz = next((zone for suffix, zone in EXCHANGE_TIMEZONES.items() if ticker.endswith(suffix)), DEFAULT_TIMEZONE)
+    return pd.Timestamp.now(tz=tz).tz_localize(None).normalize()
+
+
+def _closed_sessions(closes: "pd.DataFrame") -> "pd.DataFrame":
+    """Only the days before today in every exchange's local time; today's bar may still be trading.
+
+    The store keeps a single last date for all symbols, so one cutoff (the
+    earliest local "today") is used rather than one per exchange: a day is
+    applied once, when it is final everywhere.
+    """
+    if closes.empty:
+        return closes
+    cutoff = min(_exchange_today(t) for t in closes.columns)
+    return closes[closes.index < cutoff]
+
+
+class CovarianceStore:
+    """Exponentially weighted covariance of daily returns, persisted as memory-mapped .npy files.
+
+    The matrix is seeded once from COVARIANCE_SEED_PERIOD of history. After
+    that each new trading day costs one O(n^2) rank-one update per bar
+    instead of a rebuild over the whole history:
+
+        mean <- lam * mean + (1 - lam) * r
+        cov  <- lam * cov  + (1 - lam) * (r - mean_prev)(r - mean_prev)'
+
+    restricted to the symbols that traded that day (NSE and US holidays
+    differ). Readers slice sub-matrices with np.ix_ straight from the
+    memory map, so a portfolio's covariance costs microseconds.
+
+    The store is shared by the API processes and the daily cron. Every write
+    produces a new generation of files, published by atomically replacing
+    state.json; writers are serialised across processes with a file lock
+    and reload the latest generation before changing anything, and readers
+    pick up a new generation as soon as state.json changes. The last
+    COVARIANCE_HISTORY_DAYS of daily closes are kept alongside the matrix so
+    symbols can be added without downloading everyone else's history again.
+    """
+
+    def __init__(self, path: str = COVARIANCE_DIR, half_life: float = COVARIANCE_HALF_LIFE_DAYS):
+        self.path = path
+        self.decay = 0.5 ** (1 / half_life)
+        # Guards the in-memory generation; held only to load or snapshot it.
+        self._lock = threading.RLock()
+        # Serialises this process's writers; the file lock covers other processes.
+        self._write_lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._queued: Set[str] = set()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._cov: Optional[np.ndarray] = None
+        self._mean: Optional[np.ndarray] = None
+        self._closes: Optional[np.ndarray] = None
+        self.generation = 0
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.dates: List[str] = []
+        self.last_close: Dict[str, float] = {}
+        self.checked_at = 0.0
+
+    @property
+    def last_date(self) -> Optional[str]:
+        return self.dates[-1] if self.dates else None
+
+    # ---- persistence ----
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self) -> bool:
+        """Make sure the latest published generation is open; False when there is none yet."""
+        with self._lock:
+            for _ in range(3):
+                try:
+                    stat = os.stat(self._file("state.json"))
+                    if (stat.st_ino, stat.st_mtime_ns) == self._stamp:
+                        return True
+                    with open(self._file("state.json")) as f:
+                        state = json.load(f)
+                    generation = state["generation"]
+                    arrays = {
+                        name: np.lib.format.open_memmap(self._file(f"{name}-{generation}.npy"), mode="r")
+                        for name in ("cov", "mean", "closes")
+                    }
+                except FileNotFoundError:
+                    # No store yet, or a writer published a newer generation
+                    # and removed this one between the two reads.
+                    if not os.path.exists(self._file("state.json")):
+                        return False
+                    continue
+                except (OSError, ValueError, KeyError) as e:
+                    print("Covariance store unreadable, rebuilding:", e)
+                    return False
+                self._cov, self._mean, self._closes = arrays["cov"], arrays["mean"], arrays["closes"]
+                self.generation = generation
+                self.symbols = state["symbols"]
+                self.index = {s: i for i, s in enumerate(self.symbols)}
+                self.dates = state["dates"]
+                self.last_close = state["last_close"]
+                self._stamp = (stat.st_ino, stat.st_mtime_ns)
+                return True
+            return False
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive write access across threads and processes, with the latest generation loaded."""
+        with self._write_lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._file("lock"), "w") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    self._load()
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _commit(self, symbols: List[str], dates: List[str], closes: np.ndarray, cov: np.ndarray, mean: np.ndarray) -> None:
+        """Publish a new generation; must be called inside `_writing`."""
+        generation = self.generation + 1
+        for name, values in (("cov", cov), ("mean", mean), ("closes", closes)):
+            np.save(self._file(f"{name}-{generation}.npy"), np.asarray(values, dtype=np.float64))
+
+        last_close = {}
+        for i, symbol in enumerate(symbols):
+            finite = np.flatnonzero(np.isfinite(closes[:, i]))
+            if len(finite):
+                last_close[symbol] = float(closes[finite[-1], i])
+        state = {"generation": generation, "symbols": symbols, "dates": dates, "last_close": last_close}
+        tmp = self._file("state.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._file("state.json"))
+
+        # Maps already open on older generations stay valid after the unlink.
+        for name in os.listdir(self.path):
+            match = re.fullmatch(r"(?:cov|mean|closes)-(\d+)\.npy", name)
+            if match and int(match.group(1)) != generation:
+                try:
+                    os.remove(self._file(name))
+                except OSError:
+                    pass
+        self._load()
+
+    def _history(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.DataFrame(np.asarray(self._closes), index=pd.DatetimeIndex(self.dates), columns=self.symbols)
+
+    # ---- building ----
+
+    def _weighted(self, returns: "pd.DataFrame") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """EWMA weights per day and the zero-filled returns / observed mask, oldest day first."""
+        r = returns.to_numpy()
+        observed = ~np.isnan(r)
+        weights = (1 - self.decay) * self.decay ** np.arange(len(r) - 1, -1, -1)
+        return weights, np.where(observed, r, 0.0), observed.astype(float)
+
+    def _ewma(self, returns: "pd.DataFrame", others: Optional["pd.DataFrame"] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """EWMA mean of `returns` and its covariance with `others` (default: itself), pairwise over shared days."""
+        w, x, mx = self._weighted(returns)
+        mean = (w @ x) / np.maximum(w @ mx, 1e-12)
+        dx = (x - mean) * mx
+        if others is None:
+            dy, my = dx, mx
+        else:
+            _, y, my = self._weighted(others)
+            dy = (y - (w @ y) / np.maximum(w @ my, 1e-12)) * my
+        num = (dx * w[:, None]).T @ dy
+        den = (mx * w[:, None]).T @ my
+        return mean, np.where(den > 0, num / np.maximum(den, 1e-12), 0.0)
+
+    def build(self, symbols: Iterable[str]) -> None:
+        """Seed the matrix from history; O(n^2 T), done once per store."""
+        tickers = list(dict.fromkeys(yf_ticker(s) for s in symbols))
+        closes = _daily_closes(tickers, COVARIANCE_SEED_PERIOD).dropna(axis=1, how="all")
+        if closes.empty:
+            print("No daily history available, covariance matrix not built")
+            return
+        returns = closes.pct_change(fill_method=None).iloc[1:]
+        mean, cov = self._ewma(returns)
+        history = closes.iloc[-COVARIANCE_HISTORY_DAYS:]
+
+        with self._writing():
+            self._commit(
+                list(closes.columns), [d.strftime("%Y-%m-%d") for d in history.index],
+                history.to_numpy(), cov, mean,
+            )
+        print('\n', f"Built covariance matrix for {len(self.symbols)} symbols\n")
+
+    def add_symbols(self, symbols: Iterable[str]) -> List[str]:
+        """Grow the matrix with new symbols, backfilling only their rows: O(n k T) for k new symbols.
+
+        Only the new symbols' history is downloaded, outside any lock; their
+        covariance with the rest comes from the closes kept in the store. A
+        store that was never built is left to `refresh` to seed.
+        """
+        if not self._load():
+            return []
+        new = [t for t in dict.fromkeys(map(yf_ticker, symbols)) if t not in self.index]
+        if not new:
+            return []
+        fetched = _daily_closes(new, COVARIANCE_SEED_PERIOD).dropna(axis=1, how="all")
+        if fetched.empty:
+            return []
+
+        with self._writing():
+            history = self._history()
+            new = [t for t in fetched.columns if t not in self.index]
+            combined = history.join(fetched[new].reindex(history.index))
+            new = [t for t in new if combined[t].notna().any()]
+            if not new:
+                return []
+            returns = combined.pct_change(fill_method=None).iloc[1:]
+            mean_new, cross = self._ewma(returns[new], returns[self.symbols + new])
+
+            n, k = len(self.symbols), len(new)
+            cov = np.empty((n + k, n + k))
+            cov[:n, :n] = self._cov
+            cov[n:, :] = cross
+            cov[:, n:] = cross.T
+            mean = np.concatenate([self._mean, mean_new])
+            symbols = self.symbols + new
+            self._commit(symbols, self.dates, combined[symbols].to_numpy(), cov, mean)
+        return new
+
+    def queue_symbols(self, symbols: Iterable[str]) -> None:
+        """Add unknown symbols in the background, so a request never waits on their history.
+
+        Each symbol is its own task on the io pool: a single-ticker fetch runs
+        inline in map_bounded, so the task never waits on its own pool.
+        """
+        for ticker in dict.fromkeys(map(yf_ticker, symbols)):
+            with self._lock:
+                if ticker in self.index or ticker in self._queued:
+                    continue
+                self._queued.add(ticker)
+            submit("io", self._add_queued, ticker)
+
+    def _add_queued(self, ticker: str) -> None:
+        try:
+            self.add_symbols([ticker])
+        except Exception as e:
+            print(f"Error adding {ticker} to the covariance store:", e)
+        finally:
+            with self._lock:
+                self._queued.discard(ticker)
+
+    # ---- incremental updates ----
+
+    def _readjusted(self, closes: "pd.DataFrame") -> List[str]:
+        """Symbols whose stored closes no longer match `closes` on the days both cover.
+
+        Yahoo closes are adjusted, so a split or dividend rewrites the whole
+        history; folding the next bar onto the old basis would record a jump
+        that never happened.
+        """
+        with self._lock:
+            if self._closes is None:
+                return []
+            history = self._history()
+        overlap = closes.index.intersection(history.index)
+        if overlap.empty:
+            return []
+        stored = history.reindex(index=overlap, columns=closes.columns)
+        drift = ((closes.loc[overlap] - stored).abs() / stored.abs()).max()
+        return list(drift[drift > COVARIANCE_READJUST_TOLERANCE].index)
+
+    def _reseed(self, history: "pd.DataFrame", cov: np.ndarray, mean: np.ndarray, fetched: "pd.DataFrame") -> List[str]:
+        """Replace the stored closes of the symbols in `fetched` and recompute their rows, in place."""
+        tickers = [t for t in fetched.columns if t in self.index and fetched[t].notna().any()]
+        if not tickers:
+            return []
+        history[tickers] = fetched[tickers].reindex(history.index)
+        returns = history.pct_change(fill_method=None).iloc[1:]
+        mean_t, cross = self._ewma(returns[tickers], returns[self.symbols])
+        idx = [self.index[t] for t in tickers]
+        cov[idx, :] = cross
+        cov[:, idx] = cross.T
+        mean[idx] = mean_t
+        return tickers
+
+    def _apply(self, closes: "pd.DataFrame", reseed: Optional["pd.DataFrame"] = None) -> int:
+        """Fold every day of `closes` newer than the store into it, one O(n^2) update per day.
+
+        Symbols in `reseed` (their full re-adjusted history) first get their
+        stored closes and covariance rows rebuilt, so the new days are applied
+        on the same basis.
+        """
+        with self._writing():
+            if self._cov is None:
+                return 0
+            pending = closes[closes.index > self.last_date] if self.last_date else closes
+            history = self._history()
+            cov, mean = np.array(self._cov), np.array(self._mean)
+            reseeded = self._reseed(history, cov, mean, reseed) if reseed is not None else []
+            if reseeded:
+                print('\n', f"Re-seeded re-adjusted covariance rows for {', '.join(reseeded)}\n")
+            if pending.empty and not reseeded:
+                return 0
+
+            previous = history.ffill().iloc[-1].dropna().to_dict() if len(history) else {}
+            rows = np.full((len(pending), len(self.symbols)), np.nan)
+            lam = self.decay
+            for day, (_, row) in enumerate(pending.iterrows()):
+                idx, r = [], []
+                for ticker, close in row.dropna().items():
+                    i = self.index.get(ticker)
+                    if i is None or not previous.get(ticker) or not np.isfinite(close):
+                        continue
+                    idx.append(i)
+                    r.append(close / previous[ticker] - 1)
+                    previous[ticker] = float(close)
+                    rows[day, i] = close
+                if idx:
+                    idx_arr, r_arr = np.array(idx), np.array(r)
+                    d = r_arr - mean[idx_arr]
+                    block = np.ix_(idx_arr, idx_arr)
+                    cov[block] = lam * cov[block] + (1 - lam) * np.outer(d, d)
+                    mean[idx_arr] = lam * mean[idx_arr] + (1 - lam) * r_arr
+
+            dates = (self.dates + [d.strftime("%Y-%m-%d") for d in pending.index])[-COVARIANCE_HISTORY_DAYS:]
+            closes_kept = np.vstack([history.to_numpy(), rows])[-COVARIANCE_HISTORY_DAYS:]
+            self._commit(self.symbols, dates, closes_kept, cov, mean)
+            return len(pending)
+
+    def update(self, date: str, closes: Dict[str, float]) -> None:
+        """Fold one trading day's closes into the matrix: O(n^2), touching only symbols that traded."""
+        import pandas as pd
+
+        self._apply(pd.DataFrame([closes], index=pd.DatetimeIndex([date])))
+
+    def refresh(self, force: bool = False) -> int:
+        """Apply every daily bar newer than the store's last date; returns the number of days applied.
+
+        Bars are downloaded before the write lock is taken, and the days to
+        apply are picked against the latest generation under it, so a day the
+        cron (or another process) already applied is never applied twice.
+        Only sessions that have closed are applied, and symbols whose history
+        was re-adjusted since it was stored are re-seeded first.
+        """
+        if not force and time.time() - self.checked_at < COVARIANCE_REFRESH_SECONDS:
+            return 0
+        if not self._refreshing.acquire(blocking=False):
+            return 0
+        try:
+            self.checked_at = time.time()
+            if not self._load():
+                self.build(UNIVERSE)
+                return 0
+            closes = _closed_sessions(_daily_closes(self.symbols, "1mo"))
+            readjusted = self._readjusted(closes)
+            reseed = _daily_closes(readjusted, COVARIANCE_SEED_PERIOD) if readjusted else None
+            return self._apply(closes, reseed)
+        finally:
+            self._refreshing.release()
+
+    def _refresh_due(self) -> None:
+        """Start a background `refresh` when the throttle has run out; readers never wait for it."""
+        with self._lock:
+            if time.time() - self.checked_at < COVARIANCE_REFRESH_SECONDS or self._refreshing.locked():
+                return
+            self.checked_at = time.time()
+        # It fans out over the io pool, so it runs on the pool above it.
+        submit("node", self.refresh, True)
+
+    # ---- reads ----
+
+    def covariance(self, symbols: List[str], annualize: bool = True) -> Tuple[np.ndarray, List[str]]:
+        """Covariance sub-matrix for `symbols` in order, and the symbols the store does not know.
+
+        Unknown symbols get zero rows; add them with `add_symbols`, or
+        `queue_symbols` when the caller can't wait for their history.
+        """
+        self._refresh_due()
+        with self._lock:
+            if not self._load():
+                return np.zeros((len(symbols), len(symbols))), list(symbols)
+            positions = [self.index.get(yf_ticker(s), -1) for s in symbols]
+            known = np.array([p >= 0 for p in positions], dtype=bool)
+            idx = np.array([max(p, 0) for p in positions], dtype=int)
+            sub = np.array(self._cov[np.ix_(idx, idx)])
+        sub *= np.outer(known, known)
+        if annualize:
+            sub *= TRADING_DAYS_PER_YEAR
+        return sub, [s for s, ok in zip(symbols, known) if not ok]
+
+    def mean(self, symbols: List[str], annualize: bool = True) -> np.ndarray:
+        """EWMA mean daily return per symbol, 0 for symbols the store does not know."""
+        self._refresh_due()
+        with self._lock:
+            if not self._load():
+                return np.zeros(len(symbols))
+            means = np.array([
+                self._mean[self.index[t]] if t in self.index else 0.0 for t in map(yf_ticker, symbols)
+            ])
+        return means * TRADING_DAYS_PER_YEAR if annualize else means
+
+    def correlation(self, symbols: List[str]) -> Tuple[np.ndarray, List[str]]:
+        cov, missing = self.covariance(symbols, annualize=False)
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = np.nan_to_num(cov / np.outer(std, std))
+        np.fill_diagonal(corr, 1.0)
+        return corr, missing
+
+
+COVARIANCE = CovarianceStore()
+
+
+if __name__ == "__main__":
+    # Daily cron entry point: python -m services.covariance
+    from services.executors import init_executors, shutdown_executors
+
+    init_executors()
+    try:
+        print(f"Applied {COVARIANCE.refresh(force=True)} new trading days")
+    finally:
+        shutdown_executors()
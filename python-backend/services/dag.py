@@ -0,0 +1,236 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from classes import AppState
+from services.deadline import mark_degraded, time_left
+from services.executors import STOCK_FETCH_CONCURRENCY, run_in, submit
+from services.metrics import CANCELLED_WORK
+
+# Called with (node name, stock or None, succeeded) as each node job finishes.
+ProgressCallback = Callable[[str, Optional[str], bool], None]
+
+
+@dataclass(frozen=True)
+class Node:
+    """One pipeline step and the AppState fields it reads and writes.
+
+    A `per_stock` node is run once per stock with `state['stocks']` narrowed to
+    that stock, so each stock moves on to the next node as soon as its own
+    inputs are ready. Its dict outputs are merged by key and its string
+    outputs concatenated in stock order.
+
+    `reserve` is the time, in seconds, the node must leave on the request
+    deadline for the stages that run after it. An error in a `required` node
+    fails the whole run; other failures only leave the node's outputs unset.
+    `pool` names the shared executor the node runs on. `concurrency` caps how
+    many of a per-stock node's jobs run at once within one run; it defaults to
+    STOCK_FETCH_CONCURRENCY, the bound map_bounded puts on one node's stock list.
+    """
+    name: str
+    fn: Callable[[AppState], AppState]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    per_stock: bool = False
+    reserve: float = 0.0
+    required: bool = False
+    pool: str = "node"
+    concurrency: int = STOCK_FETCH_CONCURRENCY
+
+
+@dataclass
+class _Job:
+    node: Node
+    stock: Optional[str] = None
+    waiting_on: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+
+
+class DAG:
+    """Runs nodes as soon as their inputs are ready instead of in fixed stages."""
+
+    def __init__(self, nodes: List[Node]):
+        self.nodes = nodes
+        self.producers: Dict[str, Node] = {}
+        for node in nodes:
+            for output in node.outputs:
+                if output in self.producers:
+                    raise ValueError(f"{output} is produced by both {self.producers[output].name} and {node.name}")
+                self.producers[output] = node
+
+    def job_count(self, stocks: List[str]) -> int:
+        """Number of node jobs one run over `stocks` is made of."""
+        return sum(len(stocks) if node.per_stock else 1 for node in self.nodes)
+
+    def _dependencies(self, node: Node, stock: Optional[str], stocks: List[str]):
+        deps = []
+        for name in node.inputs:
+            producer = self.producers.get(name)
+            if producer is None:
+                continue
+            if not producer.per_stock:
+                deps.append((name, None))
+            elif stock is not None:
+                deps.append((name, stock))
+            else:
+                deps.extend((name, s) for s in stocks)
+        return deps
+
+    def _assemble(self, name: str, parts: Dict[str, object], stocks: List[str]):
+        values = [parts[s] for s in stocks if s in parts and parts[s] is not None]
+        if any(isinstance(v, dict) for v in values):
+            merged = {}
+            for v in values:
+                merged.update(v or {})
+            return merged
+        if any(isinstance(v, list) for v in values):
+            return [item for v in values for item in v]
+        return "".join(str(v) for v in values)
+
+    async def run(
+        self,
+        state: AppState,
+        on_progress: Optional[ProgressCallback] = None,
+        checkpoint: Any = None,
+    ) -> AppState:
+        """Run every node, resuming from `checkpoint` (a RunCheckpoint) if given.
+
+        Jobs already recorded in the checkpoint are not run again; their saved
+        outputs are applied as if they had just finished. Each job that
+        finishes cleanly (no error, nothing degraded) is recorded.
+        """
+        stocks = list(state.get('stocks') or [])
+        result = dict(state)
+        parts: Dict[str, Dict[str, object]] = {}
+        ready = set()
+        deadline = state.get('deadline')
+
+        jobs: List[_Job] = []
+        for node in self.nodes:
+            for stock in (stocks if node.per_stock else [None]):
+                jobs.append(_Job(node, stock, self._dependencies(node, stock, stocks)))
+
+        def inputs_for(job: _Job) -> AppState:
+            sub = dict(result)
+            if job.node.per_stock:
+                sub['stocks'] = [job.stock]
+                for name in job.node.inputs:
+                    producer = self.producers.get(name)
+                    if producer is not None and producer.per_stock:
+                        empty = type(result[name])() if result.get(name) is not None else None
+                        sub[name] = parts.get(name, {}).get(job.stock, empty)
+            if deadline is not None and job.node.reserve:
+                sub['deadline'] = deadline.child(job.node.reserve)
+            return sub
+
+        def complete(job: _Job, out: Optional[AppState]):
+            if out is not None:
+                for name in job.node.outputs:
+                    if name not in out:
+                        continue
+                    if job.node.per_stock:
+                        parts.setdefault(name, {})[job.stock] = out[name]
+                        result[name] = self._assemble(name, parts[name], stocks)
+                    else:
+                        result[name] = out[name]
+                if out.get('degraded'):
+                    result['degraded'] = {**(result.get('degraded') or {}), **out['degraded']}
+            # Outputs are marked ready even when the node failed, so dependents
+            # still run on whatever is available, as the old branches did.
+            for name in job.node.outputs:
+                ready.add((name, job.stock))
+
+        # Per-stock jobs of one node share a semaphore, so a long stock list
+        # doesn't fan out unbounded on the node's pool.
+        slots = {
+            node.name: asyncio.Semaphore(max(node.concurrency, 1))
+            for node in self.nodes if node.per_stock
+        }
+
+        async def run_job(job: _Job):
+            slot = slots.get(job.node.name)
+            if slot is None:
+                return await _run(job)
+            async with slot:
+                return await _run(job)
+
+        async def _run(job: _Job):
+            sub = inputs_for(job)
+            degraded_before = dict(sub.get('degraded') or {})
+            out = await run_in(job.node.pool, job.node.fn, sub)
+            # Degraded output (skipped for time, upstream down) deserves a
+            # fresh attempt on retry, so only clean results are recorded.
+            if checkpoint is not None and out is not None and (out.get('degraded') or {}) == degraded_before:
+                checkpoint.save(job.node.name, job.stock, {n: out[n] for n in job.node.outputs if n in out})
+            return out
+
+        waiting = list(jobs)
+        if checkpoint is not None:
+            saved = checkpoint.completed()
+            for job in list(waiting):
+                if (job.node.name, job.stock) in saved:
+                    waiting.remove(job)
+                    complete(job, saved[(job.node.name, job.stock)])
+                    if on_progress is not None:
+                        on_progress(job.node.name, job.stock, True)
+
+        running: Dict[asyncio.Future, _Job] = {}
+        while waiting or running:
+            for job in list(waiting):
+                if all(dep in ready for dep in job.waiting_on):
+                    waiting.remove(job)
+                    running[asyncio.ensure_future(run_job(job))] = job
+
+            if not running:
+                # Nothing can start: an input was never produced.
+                for job in waiting:
+                    print(f"Skipping {job.node.name}: inputs never became ready")
+                break
+
+            done, _ = await asyncio.wait(
+                list(running), timeout=time_left(result), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                for task, job in running.items():
+                    task.cancel()
+                    CANCELLED_WORK.labels("task").inc()
+                    label = f"{job.node.name} ({job.stock})" if job.stock else job.node.name
+                    mark_degraded(result, job.node.name, f"deadline reached before {label} finished")
+                for job in waiting:
+                    mark_degraded(result, job.node.name, "deadline reached before it could start")
+                break
+
+            for task in done:
+                job = running.pop(task)
+                try:
+                    out = task.result()
+                except Exception as e:
+                    if job.node.required:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    print(f"Error in {job.node.name}:", e)
+                    out = None
+                complete(job, out)
+                if on_progress is not None:
+                    on_progress(job.node.name, job.stock, out is not None)
+
+        return result
+
+    def run_sync(
+        self,
+        state: AppState,
+        on_progress: Optional[ProgressCallback] = None,
+        checkpoint: Any = None,
+    ) -> AppState:
+        """Run from synchronous code, with or without an event loop in this thread."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Not asyncio.run: it would wait on pool work that overran the deadline.
+            loop = asyncio.new_event_loop()
+            try:
+                return loop.run_until_complete(self.run(state, on_progress, checkpoint))
+            finally:
+                loop.close()
+
+        return submit("request", self.run_sync, state, on_progress, checkpoint).result()
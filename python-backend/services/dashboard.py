@@ -0,0 +1,61 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from services.executors import run_in
+from services.health import portfolio_health
+from services.news import news_extractor
+from services.pipeline import new_state
+from services.prices import fetch_price_histories, records_by_stock
+from services.risk import risk_signals
+
+DASHBOARD_NEWS_LIMIT = int(os.environ.get("DASHBOARD_NEWS_LIMIT", "5"))
+
+
+def holding_symbols(holdings: List[Dict[str, Any]]) -> List[str]:
+    symbols = [(h.get("symbol") or "").strip().upper() for h in holdings if isinstance(h, dict)]
+    return list(dict.fromkeys(s for s in symbols if s))
+
+
+def _news_section(stocks: List[str], limit: int) -> Dict[str, Any]:
+    return news_extractor(new_state(stocks=stocks), limit=limit)['news_dict']
+
+
+async def dashboard_sections(
+    holdings: List[Dict[str, Any]],
+    news_limit: int = DASHBOARD_NEWS_LIMIT,
+) -> AsyncIterator[Tuple[str, Optional[Any], Optional[Exception]]]:
+    """Yield (section, data, error) for every dashboard widget as soon as it is ready.
+
+    Price histories are downloaded once and shared by the prices, health and
+    risks sections; news is fetched alongside them.
+    """
+    stocks = holding_symbols(holdings)
+    histories = asyncio.ensure_future(run_in("node", fetch_price_histories, stocks))
+
+    # Every section awaits the same download; shield it so one section being
+    # cancelled doesn't cancel it for the others.
+    async def prices():
+        return await run_in("cpu", records_by_stock, await asyncio.shield(histories))
+
+    async def health():
+        return await run_in("cpu", portfolio_health, holdings, await asyncio.shield(histories))
+
+    async def risks():
+        return await run_in("cpu", risk_signals, holdings, await asyncio.shield(histories))
+
+    async def news():
+        return await run_in("node", _news_section, stocks, news_limit)
+
+    sections = {"prices": prices, "health": health, "risks": risks, "news": news}
+    pending = {asyncio.ensure_future(fn()): name for name, fn in sections.items()}
+    try:
+        while pending:
+            done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = pending.pop(task)
+                error = task.exception()
+                yield name, (None if error else task.result()), error
+    finally:
+        for task in list(pending) + [histories]:
+            task.cancel()
@@ -0,0 +1,121 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+from classes import AppState
+from services.executors import run_in
+from services.metrics import CANCELLED_REQUESTS
+
+STRATEGY_DEADLINE_SECONDS = float(os.environ.get("STRATEGY_DEADLINE_SECONDS", "30"))
+
+# Time set aside for each LLM stage that still has to run after the current one.
+LLM_STAGE_SECONDS = float(os.environ.get("LLM_STAGE_SECONDS", "8"))
+
+# Below this much remaining time an LLM call is skipped rather than started.
+LLM_MIN_SECONDS = float(os.environ.get("LLM_MIN_SECONDS", "3"))
+
+# Below this much remaining time no new upstream fetch is started.
+FETCH_MIN_SECONDS = float(os.environ.get("FETCH_MIN_SECONDS", "1.5"))
+
+# How often a running request checks whether its client is still connected.
+DISCONNECT_POLL_SECONDS = float(os.environ.get("DISCONNECT_POLL_SECONDS", "0.5"))
+
+
+class Deadline:
+    """Absolute point in (monotonic) time by which a request must be answered.
+
+    A deadline can also be cancelled (e.g. when the client disconnects), which
+    makes it expire immediately for every stage sharing it.
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        expires_at: Optional[float] = None,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        if expires_at is None:
+            expires_at = math.inf if seconds is None else time.monotonic() + seconds
+        self.expires_at = expires_at
+        self._cancelled = cancelled or threading.Event()
+
+    def remaining(self) -> float:
+        if self._cancelled.is_set():
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def child(self, reserve: float) -> "Deadline":
+        """Deadline for an earlier stage that leaves `reserve` seconds for later ones."""
+        return Deadline(expires_at=self.expires_at - reserve, cancelled=self._cancelled)
+
+
+_degraded_lock = threading.Lock()
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready."""
+
+
+def has_time(state: AppState, seconds: float) -> bool:
+    deadline = state.get('deadline')
+    return deadline is None or deadline.remaining() >= seconds
+
+
+def time_left(state: AppState) -> Optional[float]:
+    """Seconds left for this request, or None if it is unbounded."""
+    deadline = state.get('deadline')
+    if deadline is None:
+        return None
+    remaining = deadline.remaining()
+    return None if math.isinf(remaining) else remaining
+
+
+def mark_degraded(state: AppState, section: str, reason: str) -> None:
+    print(f"Degraded {section}: {reason}")
+    # Per-stock workers of one node may degrade the same state concurrently.
+    with _degraded_lock:
+        degraded = dict(state.get('degraded') or {})
+        degraded[section] = f"{degraded[section]}; {reason}" if section in degraded else reason
+        state['degraded'] = degraded
+
+
+def bounded(llm, state: AppState):
+    """LLM bound to the remaining request time, so a slow call can't overrun it."""
+    deadline = state.get('deadline')
+    if deadline is not None and deadline.cancelled():
+        raise ClientDisconnected("request cancelled before the LLM call")
+    remaining = time_left(state)
+    if remaining is None:
+        return llm
+    return llm.bind(timeout=max(remaining, 0.1))
+
+
+async def run_cancellable(request, deadline: Deadline, endpoint: str, fn, *args):
+    """Run a blocking pipeline on the request pool, cancelling it if the client disconnects.
+
+    On disconnect the deadline is cancelled so nodes still running stop before
+    their next upstream or LLM call, and ClientDisconnected is raised.
+    """
+    task = asyncio.ensure_future(run_in("request", fn, *args))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            print(f"Client disconnected, cancelling {endpoint}")
+            deadline.cancel()
+            task.cancel()
+            CANCELLED_REQUESTS.labels(endpoint).inc()
+            raise ClientDisconnected(endpoint)
@@ -0,0 +1,163 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import multiprocessing
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+from services.metrics import THREADPOOL_ACTIVE, THREADPOOL_QUEUED, THREADPOOL_SIZE
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Upper bound on concurrent upstream fetches made for one node's stock list.
+STOCK_FETCH_CONCURRENCY = int(os.environ.get("STOCK_FETCH_CONCURRENCY", "4"))
+
+# Process-wide worker pools. Work only ever waits on a pool further down this
+# list, never on its own pool, so a saturated pool cannot deadlock itself:
+#   request - one blocking pipeline per HTTP request (run_cancellable)
+#   job     - background strategy jobs (services.jobs)
+#   node    - DAG nodes that coordinate further fan-out
+#   io      - leaf Finnhub / yfinance fetches
+#   cpu     - leaf CPU work: technical indicators, sentiment scoring
+#   llm     - nodes whose work is a Groq call
+POOL_SIZES = {
+    "request": int(os.environ.get("REQUEST_POOL_SIZE", "16")),
+    "job": int(os.environ.get("JOB_POOL_SIZE", "4")),
+    "node": int(os.environ.get("NODE_POOL_SIZE", "32")),
+    "io": int(os.environ.get("IO_POOL_SIZE", "16")),
+    "cpu": int(os.environ.get("CPU_POOL_SIZE", str(os.cpu_count() or 2))),
+    "llm": int(os.environ.get("LLM_POOL_SIZE", "8")),
+}
+
+# Worker processes for numeric work big enough to be worth pickling its
+# inputs over (Monte Carlo simulation). Separate from the thread pools: the
+# GIL-bound part of that work would otherwise serialize on one core.
+PROCESS_POOL_SIZE = int(os.environ.get("PROCESS_POOL_SIZE", str(os.cpu_count() or 2)))
+
+
+class InstrumentedExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Thread pool that reports its queue depth and active workers."""
+
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers=max_workers, thread_name_prefix=f"finstocks-{name}")
+        self.name = name
+        self.max_workers = max_workers
+        self._stats_lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        THREADPOOL_SIZE.labels(name).set(max_workers)
+
+    def _move(self, queued: int, active: int) -> None:
+        with self._stats_lock:
+            self.queued += queued
+            self.active += active
+        THREADPOOL_QUEUED.labels(self.name).inc(queued)
+        THREADPOOL_ACTIVE.labels(self.name).inc(active)
+
+    def submit(self, fn, /, *args, **kwargs):
+        def run():
+            self._move(-1, 1)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._move(0, -1)
+
+        self._move(1, 0)
+        future = super().submit(run)
+        future.add_done_callback(lambda f: f.cancelled() and self._move(-1, 0))
+        return future
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {"max_workers": self.max_workers, "active": self.active, "queued": self.queued}
+
+
+_executors: Dict[str, InstrumentedExecutor] = {}
+_executors_lock = threading.Lock()
+_process_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+
+def init_executors() -> None:
+    """Create every pool up front; called from the FastAPI lifespan."""
+    for name in POOL_SIZES:
+        get_executor(name)
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    global _process_pool
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+        if _process_pool is not None:
+            executors.append(_process_pool)
+            _process_pool = None
+    for executor in executors:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def get_process_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Shared worker processes, started on first use.
+
+    Workers are spawned rather than forked: the API process runs many
+    threads, and forking one mid-operation can leave locks held in the child.
+    """
+    global _process_pool
+    with _executors_lock:
+        if _process_pool is None:
+            _process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def get_executor(name: str) -> InstrumentedExecutor:
+    """Shared pool by name, created on first use outside the API (Streamlit, scripts)."""
+    executor = _executors.get(name)
+    if executor is not None:
+        return executor
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = InstrumentedExecutor(name, POOL_SIZES[name])
+        return _executors[name]
+
+
+def executor_stats() -> Dict[str, Dict[str, int]]:
+    return {name: executor.stats() for name, executor in list(_executors.items())}
+
+
+def submit(pool: str, fn: Callable[..., R], *args) -> "concurrent.futures.Future[R]":
+    """Submit to a shared pool, carrying the caller's context (e.g. metrics node name)."""
+    return get_executor(pool).submit(contextvars.copy_context().run, fn, *args)
+
+
+async def run_in(pool: str, fn: Callable[..., R], *args) -> R:
+    """Await `fn` on a shared pool; the pool counterpart of asyncio.to_thread."""
+    return await asyncio.wrap_future(submit(pool, fn, *args))
+
+
+def map_bounded(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    limit: int = STOCK_FETCH_CONCURRENCY,
+    pool: str = "io",
+) -> List[R]:
+    """Apply `fn` to every item on a shared pool with at most `limit` in flight.
+
+    Results come back in input order. `fn` is expected to handle its own
+    per-item errors; an exception that escapes it is re-raised here.
+    """
+    items = list(items)
+    if len(items) <= 1 or limit <= 1:
+        return [fn(item) for item in items]
+
+    slots = threading.BoundedSemaphore(limit)
+    futures = []
+    for item in items:
+        slots.acquire()
+        future = submit(pool, fn, item)
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    return [future.result() for future in futures]
@@ -0,0 +1,141 @@
+from typing import Any, Dict, List
+
+import numpy as np
+
+from services.analytics import portfolio_stats
+
+FACTOR_MAX_SCORE = 25
+
+# A portfolio scores full marks for diversification once its weights are as
+# spread as this many equal sectors / equal positions.
+TARGET_SECTORS = 5
+TARGET_POSITIONS = 10
+
+# Annualized volatility scored 25 at or below the low mark and 0 at the high mark.
+VOLATILITY_RANGE = (0.15, 0.40)
+
+# Weighted average pairwise correlation scored 25 at or below the low mark and
+# 0 at the high mark; pairs above DUPLICATE_CORRELATION are named as overlaps.
+CORRELATION_RANGE = (0.30, 0.80)
+DUPLICATE_CORRELATION = 0.85
+
+HIGH_BETA = 1.5
+
+
+def _status(score: float) -> str:
+    ratio = score / FACTOR_MAX_SCORE
+    if ratio >= 0.85:
+        return "excellent"
+    if ratio >= 0.6:
+        return "good"
+    if ratio >= 0.35:
+        return "warning"
+    return "critical"
+
+
+def _factor(name: str, score: float, description: str) -> Dict[str, Any]:
+    score = int(round(np.clip(score, 0, FACTOR_MAX_SCORE)))
+    return {
+        "name": name,
+        "score": score,
+        "max_score": FACTOR_MAX_SCORE,
+        "status": _status(score),
+        "description": description,
+    }
+
+
+def _scaled(value: float, good: float, bad: float) -> float:
+    """FACTOR_MAX_SCORE at `good` or better, 0 at `bad` or worse, linear between."""
+    return FACTOR_MAX_SCORE * float(np.clip((bad - value) / (bad - good), 0, 1))
+
+
+def _sector_weights(sectors: List[str], weights: np.ndarray) -> Dict[str, float]:
+    names, inverse = np.unique(np.array(sectors, dtype=object), return_inverse=True)
+    totals = np.bincount(inverse, weights=weights, minlength=len(names))
+    order = np.argsort(-totals)
+    return {str(names[i]): float(totals[i]) for i in order if totals[i] > 0}
+
+
+def _diversification(stats: Dict[str, Any]) -> Dict[str, Any]:
+    sectors = _sector_weights(stats["sectors"], stats["weights"])
+    # Herfindahl index over sectors; 1 / HHI is the "effective" number of sectors.
+    hhi = sum(w * w for w in sectors.values())
+    effective = 1 / hhi
+    score = FACTOR_MAX_SCORE * min(1.0, effective / TARGET_SECTORS)
+    largest, largest_weight = next(iter(sectors.items()))
+    return _factor(
+        "Diversification",
+        score,
+        f"Your portfolio spans {len(sectors)} sector{'s' if len(sectors) != 1 else ''} "
+        f"(about {effective:.1f} by weight). {largest} is the largest at {largest_weight:.0%}.",
+    )
+
+
+def _concentration(stats: Dict[str, Any]) -> Dict[str, Any]:
+    weights = stats["weights"]
+    hhi = float(weights @ weights)
+    effective = 1 / hhi
+    score = FACTOR_MAX_SCORE * min(1.0, effective / TARGET_POSITIONS)
+    top = int(np.argmax(weights))
+    return _factor(
+        "Concentration",
+        score,
+        f"Herfindahl index {hhi:.2f}, equivalent to {effective:.1f} equal-sized positions. "
+        f"{stats['symbols'][top]} is the largest holding at {weights[top]:.0%}.",
+    )
+
+
+def _volatility(stats: Dict[str, Any]) -> Dict[str, Any]:
+    volatility = stats["portfolio_volatility"]
+    if np.isnan(volatility):
+        return _factor("Volatility", FACTOR_MAX_SCORE / 2, "Not enough price history to measure volatility yet.")
+
+    beta, weights = stats["beta"], stats["weights"]
+    description = f"Annualized volatility is {volatility:.0%}."
+    if not np.isnan(stats["portfolio_beta"]):
+        high_beta = float(weights[np.nan_to_num(beta) > HIGH_BETA].sum())
+        description += f" Portfolio beta is {stats['portfolio_beta']:.2f}"
+        description += f"; {high_beta:.0%} of the portfolio is in stocks with beta > {HIGH_BETA}." if high_beta else "."
+    return _factor("Volatility", _scaled(volatility, *VOLATILITY_RANGE), description)
+
+
+def _overlap(stats: Dict[str, Any]) -> Dict[str, Any]:
+    weights, correlation, symbols = stats["weights"], stats["correlation"], stats["symbols"]
+    if len(symbols) < 2:
+        return _factor("Overlap", FACTOR_MAX_SCORE, "A single holding has nothing to overlap with.")
+
+    # Weighted average correlation over distinct pairs.
+    pair_weights = np.outer(weights, weights)
+    np.fill_diagonal(pair_weights, 0)
+    total = pair_weights.sum()
+    average = float((pair_weights * correlation).sum() / total) if total > 0 else 0.0
+
+    upper = np.triu(correlation, k=1)
+    i, j = np.nonzero(upper >= DUPLICATE_CORRELATION)
+    if len(i):
+        pairs = ", ".join(f"{symbols[a]}/{symbols[b]}" for a, b in zip(i[:3], j[:3]))
+        description = f"{pairs} move almost in lockstep (correlation above {DUPLICATE_CORRELATION})."
+    else:
+        description = "No two holdings move in lockstep."
+    description += f" Average correlation between holdings is {average:.2f}."
+    return _factor("Overlap", _scaled(average, *CORRELATION_RANGE), description)
+
+
+def portfolio_health(holdings: List[Dict[str, Any]], histories: Dict[str, Any]) -> Dict[str, Any]:
+    """Health score and per-factor breakdown for a set of holdings.
+
+    `histories` is the price history per symbol already fetched for the
+    request (see services.prices). The factors are scored locally from the
+    statistics in services.analytics, which are cached per holdings hash;
+    only the benchmark index behind beta goes through the price cache.
+    """
+    stats = portfolio_stats(holdings, histories)
+    if not stats["symbols"]:
+        return {"overall_score": 0, "factors": [], "last_updated": "no holdings"}
+
+    factors = [_diversification(stats), _volatility(stats), _overlap(stats), _concentration(stats)]
+    return {
+        "overall_score": sum(f["score"] for f in factors),
+        "factors": factors,
+        "last_updated": f"prices as of {stats['as_of']}" if stats["as_of"] else "no price history",
+    }
@@ -0,0 +1,148 @@
+import concurrent.futures
+import os
+import threading
+from typing import Any, Dict, List, Literal, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field
+
+from services import clients
+from services.executors import map_bounded
+from services.metrics import instrument_node, record_cache
+from services.news_rank import rank_articles
+from services.news_store import NEWS_STORE
+
+# Articles packed into one summarization prompt.
+HINGLISH_BATCH_SIZE = int(os.environ.get("HINGLISH_BATCH_SIZE", "6"))
+
+# Summarization prompts in flight at once for one request.
+HINGLISH_CONCURRENCY = int(os.environ.get("HINGLISH_CONCURRENCY", "3"))
+
+# How long a request waits for another request that is summarizing the same article.
+HINGLISH_WAIT_SECONDS = float(os.environ.get("HINGLISH_WAIT_SECONDS", "30"))
+
+LANGUAGE = "hinglish"
+
+
+class ArticleSummary(BaseModel):
+    id: int
+    hinglish_summary: str
+    sentiment: Literal["positive", "negative", "neutral"]
+    impact: Literal["high", "medium", "low"]
+
+
+class ArticleSummaries(BaseModel):
+    articles: List[ArticleSummary] = Field(default_factory=list)
+
+
+# Articles currently being summarized, so concurrent requests for the same
+# popular story wait for one LLM call instead of each making their own.
+_inflight: Dict[int, concurrent.futures.Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _summarise_batch(articles: List[Dict[str, Any]]) -> Dict[int, Dict[str, str]]:
+    prompt = """You write short news summaries for Indian retail investors in Hinglish
+    (Hindi written in Roman script, mixed naturally with English financial terms).
+
+    For every article below return:
+    - id: the article id exactly as given
+    - hinglish_summary: 2-3 simple sentences in Hinglish on what happened and what it means for the stock
+    - sentiment: "positive", "negative" or "neutral" for the related stock
+    - impact: "high", "medium" or "low" expected effect on the stock price
+
+    Return one entry per article and only use the information in the article."""
+
+    body = "\n---\n".join(
+        f"id: {a['id']}\nstock: {a['symbol']}\nheadline: {a['headline']}\nsummary: {a['summary']}"
+        for a in articles
+    )
+    summarizer = clients.llm.with_structured_output(ArticleSummaries)
+    result = summarizer.invoke([SystemMessage(content=prompt), HumanMessage(content=body)])
+
+    wanted = {a["id"] for a in articles}
+    return {
+        item.id: {"summary": item.hinglish_summary, "sentiment": item.sentiment, "impact": item.impact}
+        for item in result.articles
+        if item.id in wanted and item.hinglish_summary.strip()
+    }
+
+
+def _summarise(articles: List[Dict[str, Any]]) -> Dict[int, Dict[str, str]]:
+    batches = [articles[i:i + HINGLISH_BATCH_SIZE] for i in range(0, len(articles), HINGLISH_BATCH_SIZE)]
+
+    def run(batch):
+        try:
+            return _summarise_batch(batch)
+        except Exception as e:
+            print("Error summarizing news in Hinglish:", e)
+            return {}
+
+    results: Dict[int, Dict[str, str]] = {}
+    for batch_result in map_bounded(run, batches, limit=HINGLISH_CONCURRENCY, pool="llm"):
+        results.update(batch_result)
+    return results
+
+
+def holding_articles(symbols: List[str], limit: int) -> List[Dict[str, Any]]:
+    """Most relevant stored articles across the holdings, refreshing stale symbols first."""
+    def fetch(symbol):
+        if NEWS_STORE.needs_refresh(symbol):
+            try:
+                NEWS_STORE.refresh(symbol)
+            except Exception as e:
+                print(f"Error fetching news for {symbol}:", e)
+        return NEWS_STORE.articles(symbol)
+
+    merged: Dict[int, Dict[str, Any]] = {}
+    for articles in map_bounded(fetch, symbols):
+        for article in articles:
+            # The same story is often filed under several of the holdings.
+            merged.setdefault(article["id"], article)
+    return rank_articles(list(merged.values()), limit)
+
+
+@instrument_node
+def hinglish_summaries(articles: List[Dict[str, Any]]) -> Dict[int, Dict[str, str]]:
+    """Hinglish summary, sentiment and impact per article id.
+
+    Each article is summarized at most once: results are cached in the news
+    store by (article id, language), articles missing from the cache are
+    packed several to an LLM call, and an article another request is
+    already summarizing is waited for rather than summarized again.
+    Articles that could not be summarized are left out of the result.
+    """
+    print('\n', "Summarizing news in Hinglish\n")
+
+    by_id = {a["id"]: a for a in articles}
+    results = NEWS_STORE.translated(list(by_id), LANGUAGE)
+    for article_id in by_id:
+        record_cache("hinglish_summary", article_id in results)
+
+    missing = [article_id for article_id in by_id if article_id not in results]
+    with _inflight_lock:
+        waiting = {i: _inflight[i] for i in missing if i in _inflight}
+        mine = [i for i in missing if i not in waiting]
+        for article_id in mine:
+            _inflight[article_id] = concurrent.futures.Future()
+
+    fresh: Dict[int, Dict[str, str]] = {}
+    try:
+        if mine:
+            fresh = _summarise([by_id[i] for i in mine])
+            if fresh:
+                NEWS_STORE.save_translated(LANGUAGE, fresh)
+            results.update(fresh)
+    finally:
+        with _inflight_lock:
+            for article_id in mine:
+                _inflight.pop(article_id).set_result(fresh.get(article_id))
+
+    for article_id, future in waiting.items():
+        try:
+            summary: Optional[Dict[str, str]] = future.result(timeout=HINGLISH_WAIT_SECONDS)
+        except concurrent.futures.TimeoutError:
+            summary = None
+        if summary:
+            results[article_id] = summary
+    return results
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from classes import UsageClassfier
+from services.checkpoint import CHECKPOINTS
+from services.deadline import Deadline
+from services.executors import POOL_SIZES, submit
+from services.pipeline import STRATEGY, run_strategy_pipeline, strategy_result
+from services.portfolio import profile_fingerprint
+
+# A background job is not tied to a load balancer timeout, so it gets more
+# room than an inline /api/strategy request.
+JOB_DEADLINE_SECONDS = float(os.environ.get("JOB_DEADLINE_SECONDS", "60"))
+
+# Jobs allowed to wait for a worker on top of the ones running on the job pool.
+JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", "16"))
+
+# How long a finished job (and its result) can still be fetched or attached to.
+JOB_TTL_SECONDS = float(os.environ.get("JOB_TTL_SECONDS", "600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+
+class JobQueueFull(Exception):
+    """Admission control rejected a job because every worker and queue slot is taken."""
+
+
+class Job:
+    """One background strategy run and the events it has produced so far.
+
+    Events are kept in order so a client that (re)connects to the event
+    stream replays the job's history before receiving live updates.
+    """
+
+    def __init__(self, key: str, stocks: List[str]):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.stocks = stocks
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.total = STRATEGY.job_count(stocks)
+        self.completed = 0
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.events: List[dict] = []
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self.emit("status", {"status": QUEUED})
+
+    def emit(self, kind: str, data: dict) -> None:
+        with self._lock:
+            self.events.append({"event": kind, "data": {"job_id": self.id, **data}})
+            waiters, self._waiters = self._waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop closed (shutdown); nobody is left to wake.
+                pass
+
+    def progress(self, node: str, stock: Optional[str], ok: bool) -> None:
+        with self._lock:
+            self.completed += 1
+            completed = self.completed
+        self.emit("progress", {
+            "node": node,
+            "stock": stock,
+            "ok": ok,
+            "completed": completed,
+            "total": self.total,
+        })
+
+    def finish(self, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        if status == DONE:
+            self.emit("result", {"status": status, "result": result})
+        else:
+            self.emit("error", {"status": status, "error": error})
+
+    async def wait(self, seen: int, timeout: float) -> List[dict]:
+        """Events after the first `seen`, waiting up to `timeout` for new ones."""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            if len(self.events) > seen:
+                return self.events[seen:]
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # Timed out or cancelled (client gone): don't leave the waiter
+            # behind until the next emit.
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        with self._lock:
+            return self.events[seen:]
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stocks": self.stocks,
+            "completed": self.completed,
+            "total": self.total,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+_jobs: Dict[str, Job] = {}
+_jobs_by_key: Dict[str, Job] = {}
+_jobs_lock = threading.Lock()
+
+
+def job_key(usage_state: UsageClassfier) -> str:
+    stocks = ",".join(sorted({s.strip().upper() for s in usage_state.stocks or []}))
+    return f"{profile_fingerprint(usage_state)}:{stocks}"
+
+
+def _prune(now: float) -> None:
+    for job in [j for j in _jobs.values() if j.finished_at and now - j.finished_at > JOB_TTL_SECONDS]:
+        _jobs.pop(job.id, None)
+        if _jobs_by_key.get(job.key) is job:
+            _jobs_by_key.pop(job.key)
+
+
+def _run(job: Job, usage_state: UsageClassfier) -> None:
+    job.status = RUNNING
+    job.emit("status", {"status": RUNNING})
+    try:
+        # Checkpoints are keyed by the job key, so resubmitting a failed job
+        # resumes from the nodes that had already finished.
+        run_id = f"job:{job.key}"
+        state = run_strategy_pipeline(usage_state, Deadline(JOB_DEADLINE_SECONDS), job.progress, run_id)
+        CHECKPOINTS.run(run_id).clear()
+        job.finish(DONE, result=strategy_result(state))
+    except Exception as e:
+        print(f"Strategy job {job.id} failed:", e)
+        job.finish(FAILED, error=str(e))
+
+
+def submit_job(usage_state: UsageClassfier) -> Tuple[Job, bool]:
+    """Start a strategy job, or attach to the live one for the same profile and stocks.
+
+    Returns the job and whether it already existed. Raises JobQueueFull when
+    the job pool and its queue are saturated.
+    """
+    key = job_key(usage_state)
+    with _jobs_lock:
+        _prune(time.time())
+        existing = _jobs_by_key.get(key)
+        if existing is not None and existing.status != FAILED:
+            return existing, True
+
+        active = sum(1 for j in _jobs.values() if j.status not in FINISHED)
+        if active >= POOL_SIZES["job"] + JOB_QUEUE_LIMIT:
+            raise JobQueueFull(f"{active} strategy jobs already queued or running")
+
+        job = Job(key, list(usage_state.stocks or []))
+        _jobs[job.id] = job
+        _jobs_by_key[key] = job
+
+    submit("job", _run, job, usage_state)
+    return job, False
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    with _jobs_lock:
+        _prune(time.time())
+        return _jobs.get(job_id)
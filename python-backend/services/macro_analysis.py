@@ -1,76 +1,132 @@
+import os
 import re
+from typing import TYPE_CHECKING
 
-import pandas as pd
-import pandas_ta as ta
-import yfinance as yf
 from langchain_core.messages import HumanMessage
 
 from classes import AppState
 from macro import macro_terms
-from services.clients import FIN_CLIENT, llm
+from services import clients
+from services.cache import TTLCache
+from services.deadline import FETCH_MIN_SECONDS, LLM_MIN_SECONDS, bounded, has_time, mark_degraded
+from services.executors import map_bounded, submit
+from services.metrics import instrument_node, track_upstream
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def macro_economic(state: AppState) -> AppState:
-    print('\n', "Gathering the market data and other economics for stocks.\n")
 
-    stocks = state["stocks"]
-    macro_economic_dict = {}
-    
-    for stock in stocks:
-        try:
-            df = yf.download(stock, period="12mo", interval="1d")
-            # print(df)
+FUNDAMENTALS_TTL_SECONDS = float(os.environ.get("FUNDAMENTALS_TTL_SECONDS", str(6 * 60 * 60)))
+
+# Finnhub basic financials only change with filings, so they are reused across
+# requests and, when a request is short on time, served even if stale.
+FUNDAMENTALS_CACHE = TTLCache("fundamentals", ttl=FUNDAMENTALS_TTL_SECONDS)
+
+
+def _technicals(stock: str) -> dict:
+    # Imported on first use: yfinance, pandas and pandas_ta dominate the
+    # import time of the API process.
+    import yfinance as yf
+
+    # Ticker.history rather than yf.download: download keeps per-call results in
+    # module globals, which is unsafe when several stocks are fetched at once.
+    with track_upstream("yfinance", "history"):
+        df = yf.Ticker(stock).history(period="12mo", interval="1d")
+    # print(df)
+
+    # The fetch runs on the io pool; indicator maths goes to the cpu pool so
+    # slow downloads don't hold CPU workers and vice versa.
+    return submit("cpu", _indicators, df).result()
+
+
+def _indicators(df: "pd.DataFrame") -> dict:
+    import pandas as pd
+    import pandas_ta as ta
+
+    df = df.drop(columns=["Dividends", "Stock Splits", "Capital Gains"], errors="ignore")
+    df.dropna(inplace=True)
 
-            df.dropna(inplace=True)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
 
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.get_level_values(0)
 
+    # Now apply RSI
+    df["RSI"] = ta.rsi(df["Close"], length=14)
 
-            # Now apply RSI
-            df["RSI"] = ta.rsi(df["Close"], length=14)
+    macd = ta.macd(df["Close"])
+    df["MACD_Line"] = macd["MACD_12_26_9"]
+    df["MACD_Signal"] = macd["MACDs_12_26_9"]
+    df["SMA_20"] = ta.sma(df["Close"], length=20)
+    df["EMA_20"] = ta.ema(df["Close"], length=20)
 
-            macd = ta.macd(df["Close"])
-            df["MACD_Line"] = macd["MACD_12_26_9"]
-            df["MACD_Signal"] = macd["MACDs_12_26_9"]
-            df["SMA_20"] = ta.sma(df["Close"], length=20)
-            df["EMA_20"] = ta.ema(df["Close"], length=20)
 
+    bbands = ta.bbands(df["Close"], length=20)
+    df["BB_upper"]  = bbands["BBU_20_2.0"]
+    df["BB_middle"] = bbands["BBM_20_2.0"]
+    df["BB_lower"]  = bbands["BBL_20_2.0"]
+    df["BB_bandwidth"] = bbands["BBB_20_2.0"]
+    df["BB_percent"]   = bbands["BBP_20_2.0"]
 
-            bbands = ta.bbands(df["Close"], length=20)
-            df["BB_upper"]  = bbands["BBU_20_2.0"]
-            df["BB_middle"] = bbands["BBM_20_2.0"]
-            df["BB_lower"]  = bbands["BBL_20_2.0"]
-            df["BB_bandwidth"] = bbands["BBB_20_2.0"]
-            df["BB_percent"]   = bbands["BBP_20_2.0"]
+    today = {}
+    for idx, row in df.tail(1).iterrows():
+        for col, val in row.items():
+            today[col] = val
+    return today
 
-            today = {}
-            for idx, row in df.tail(1).iterrows():
-                for col, val in row.items():
-                    today[col] = val
-            
 
-            info = FIN_CLIENT.company_basic_financials(stock, 'all')
-            economic = {
-                category: {
-                    fields[field]: info["metric"].get(field, None)  
-                    for field in fields
-                }
-                for category, fields in macro_terms.items()
-            }
+def _fundamentals(stock: str, state: AppState) -> dict:
+    economic = FUNDAMENTALS_CACHE.get(stock)
+    if economic is not None:
+        return economic
 
-            economic['Today'] = today
-            macro_economic_dict[stock] = economic
+    if not has_time(state, FETCH_MIN_SECONDS):
+        economic = FUNDAMENTALS_CACHE.get(stock, allow_stale=True)
+        if economic is None:
+            raise TimeoutError("deadline reached before fundamentals could be fetched")
+        mark_degraded(state, "macro_economics", f"deadline reached, stale fundamentals used for {stock}")
+        return economic
+
+    with track_upstream("finnhub", "company_basic_financials"):
+        info = clients.FIN_CLIENT.company_basic_financials(stock, 'all')
+    economic = {
+        category: {
+            fields[field]: info["metric"].get(field, None)  
+            for field in fields
+        }
+        for category, fields in macro_terms.items()
+    }
+    FUNDAMENTALS_CACHE.set(stock, economic)
+    return economic
+
+
+@instrument_node
+def macro_economic(state: AppState) -> AppState:
+    print('\n', "Gathering the market data and other economics for stocks.\n")
+
+    stocks = state["stocks"]
+
+    def fetch(stock):
+        try:
+            economic = dict(_fundamentals(stock, state))
+
+            if has_time(state, FETCH_MIN_SECONDS):
+                economic['Today'] = _technicals(stock)
+            else:
+                mark_degraded(state, "macro_economics", f"deadline reached, technical indicators skipped for {stock}")
+
+            return economic
 
         except Exception as e:
-            macro_economic_dict[stock] = {"error": {"message": str(e)}}
-            continue
+            return {"error": {"message": str(e)}}
+
+    macro_economic_dict = dict(zip(stocks, map_bounded(fetch, stocks)))
         
     state['macro_economics_dict'] = macro_economic_dict
     
     return state 
 
     
+@instrument_node
 def market_trends(state: AppState) -> AppState:
     print('\n', "Generating a detailed report based on Economics and News Sentiment.\n")
 
@@ -104,6 +160,11 @@ def market_trends(state: AppState) -> AppState:
     # print(economic_analysis)
     state['macro_economics'] = economic_analysis
 
+    if not has_time(state, LLM_MIN_SECONDS):
+        mark_degraded(state, "market_trends", "deadline reached, market trends report skipped")
+        state['market_trends'] = ""
+        return state
+
     prompt = f"""
 
 
@@ -136,7 +197,7 @@ def market_trends(state: AppState) -> AppState:
 
     """
 
-    response = llm.invoke([HumanMessage(prompt)])
+    response = bounded(clients.llm, state).invoke([HumanMessage(prompt)])
 
     state['market_trends'] = re.sub(r'\*\*', '', response.content)
 
@@ -0,0 +1,208 @@
+import asyncio
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+
+# Pipeline nodes range from a few milliseconds (pure formatting) to tens of
+# seconds (LLM calls), so the buckets are spread wider than the defaults.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+NODE_LATENCY = Histogram(
+    "finstocks_node_latency_seconds",
+    "Wall time spent inside a pipeline node",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+)
+NODE_ERRORS = Counter(
+    "finstocks_node_errors_total",
+    "Pipeline node invocations that raised",
+    ["node"],
+)
+
+LLM_LATENCY = Histogram(
+    "finstocks_llm_latency_seconds",
+    "Latency of a single LLM call",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "finstocks_llm_tokens_total",
+    "LLM tokens consumed, split into prompt and completion",
+    ["node", "kind"],
+)
+LLM_ERRORS = Counter(
+    "finstocks_llm_errors_total",
+    "LLM calls that raised",
+    ["node"],
+)
+
+UPSTREAM_REQUESTS = Counter(
+    "finstocks_upstream_requests_total",
+    "Calls made to upstream data providers",
+    ["service", "endpoint"],
+)
+UPSTREAM_ERRORS = Counter(
+    "finstocks_upstream_errors_total",
+    "Upstream data provider calls that raised",
+    ["service", "endpoint"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "finstocks_upstream_latency_seconds",
+    "Latency of upstream data provider calls",
+    ["service", "endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+
+CACHE_REQUESTS = Counter(
+    "finstocks_cache_requests_total",
+    "Cache lookups by outcome; hit ratio = hit / (hit + miss)",
+    ["cache", "result"],
+)
+
+CANCELLED_REQUESTS = Counter(
+    "finstocks_cancelled_requests_total",
+    "Requests abandoned because the client disconnected",
+    ["endpoint"],
+)
+CANCELLED_WORK = Counter(
+    "finstocks_cancelled_work_total",
+    "Pending tasks and pool futures cancelled before they ran to completion",
+    ["kind"],
+)
+
+THREADPOOL_ACTIVE = Gauge(
+    "finstocks_threadpool_active",
+    "Tasks currently running on a worker pool",
+    ["pool"],
+)
+THREADPOOL_QUEUED = Gauge(
+    "finstocks_threadpool_queued",
+    "Tasks submitted to a worker pool and waiting for a free worker",
+    ["pool"],
+)
+THREADPOOL_SIZE = Gauge(
+    "finstocks_threadpool_size",
+    "Configured number of workers in a pool",
+    ["pool"],
+)
+
+SUBSCRIPTION_FEEDS = Gauge(
+    "finstocks_subscription_feeds",
+    "Symbols with a running upstream poller",
+)
+SUBSCRIPTION_CLIENTS = Gauge(
+    "finstocks_subscription_clients",
+    "Connected WebSocket / SSE subscribers",
+)
+SUBSCRIPTION_COALESCED = Counter(
+    "finstocks_subscription_coalesced_total",
+    "Updates merged into or dropped from a slow subscriber's pending buffer",
+    ["kind"],
+)
+
+
+# Name of the node currently executing. Set by `instrument_node` so that LLM
+# and upstream calls made inside the node are attributed to it.
+CURRENT_NODE: contextvars.ContextVar[str] = contextvars.ContextVar("finstocks_node", default="none")
+
+
+def instrument_node(fn):
+    """Record latency and errors of a pipeline node under its function name."""
+    name = fn.__name__
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            token = CURRENT_NODE.set(name)
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except BaseException:
+                NODE_ERRORS.labels(name).inc()
+                raise
+            finally:
+                NODE_LATENCY.labels(name).observe(time.perf_counter() - start)
+                CURRENT_NODE.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = CURRENT_NODE.set(name)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            NODE_ERRORS.labels(name).inc()
+            raise
+        finally:
+            NODE_LATENCY.labels(name).observe(time.perf_counter() - start)
+            CURRENT_NODE.reset(token)
+
+    return wrapper
+
+
+@contextmanager
+def track_upstream(service: str, endpoint: str):
+    """Count and time one call to an upstream provider (finnhub, yfinance)."""
+    UPSTREAM_REQUESTS.labels(service, endpoint).inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        UPSTREAM_ERRORS.labels(service, endpoint).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(service, endpoint).observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback that records LLM latency and token usage per node."""
+
+    def __init__(self):
+        self._started: Dict[UUID, tuple] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = (CURRENT_NODE.get(), time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = (CURRENT_NODE.get(), time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        node, start = self._started.pop(run_id, (CURRENT_NODE.get(), None))
+        if start is not None:
+            LLM_LATENCY.labels(node).observe(time.perf_counter() - start)
+
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if not usage and response.generations:
+            message = getattr(response.generations[0][0], "message", None)
+            metadata = getattr(message, "usage_metadata", None) or {}
+            usage = {
+                "prompt_tokens": metadata.get("input_tokens", 0),
+                "completion_tokens": metadata.get("output_tokens", 0),
+            }
+
+        LLM_TOKENS.labels(node, "prompt").inc(usage.get("prompt_tokens") or 0)
+        LLM_TOKENS.labels(node, "completion").inc(usage.get("completion_tokens") or 0)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        node, _ = self._started.pop(run_id, (CURRENT_NODE.get(), None))
+        LLM_ERRORS.labels(node).inc()
+
+
+LLM_METRICS = LLMMetricsHandler()
+
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,40 +1,54 @@
-from datetime import datetime, timedelta
-
-import pandas as pd
 from langchain_core.messages import HumanMessage
 
 from classes import AppState
-from services.clients import FIN_CLIENT, llm
+from services import clients
+from services.deadline import FETCH_MIN_SECONDS, LLM_MIN_SECONDS, bounded, has_time, mark_degraded
+from services.executors import map_bounded
+from services.metrics import instrument_node
+from services.news_filter import compress_summaries
+from services.news_rank import rank_articles
+from services.news_store import NEWS_STORE
+from services.sentiment import NEWS_FAST_MODE
 
 
 # Node News Extractor for every stock present in the users query
+@instrument_node
 def news_extractor(state: AppState, limit = 10) -> AppState:
     print('\n', "Extracting News on User's stocks\n")
 
     stocks = state['stocks']
-    news_dict = {}
-    DF = pd.DataFrame(columns=["stock", "summary"])
-    today = datetime.today().strftime('%Y-%m-%d')
-    one_week_ago = (datetime.today() - timedelta(days=7)).strftime('%Y-%m-%d')
-
-    for stock in stocks:
-        data = FIN_CLIENT.company_news(stock, _from=one_week_ago, to= today)
-        final = []
-        for i in data[:limit]:
-            final.append({'stock': stock, 'summary': i['summary']})
-
-        temp = pd.DataFrame(final)
-    
-        DF = pd.concat([DF, temp], ignore_index=True)
 
+    def fetch(stock):
+        # Finnhub is only asked for articles newer than the store's
+        # high-water mark, and at most once per refresh interval per symbol.
+        refreshed = True
+        if NEWS_STORE.needs_refresh(stock):
+            if has_time(state, FETCH_MIN_SECONDS):
+                try:
+                    NEWS_STORE.refresh(stock)
+                except Exception as e:
+                    print(f"Error fetching news for {stock}:", e)
+            else:
+                refreshed = False
+        # Only the best `limit` articles by local relevance reach the prompts.
+        ranked = rank_articles(NEWS_STORE.articles(stock), limit)
+        return [article["summary"] for article in ranked], refreshed
+
+    fetched = map_bounded(fetch, stocks)
+
+    skipped = [stock for stock, (_, refreshed) in zip(stocks, fetched) if not refreshed]
+    if skipped:
+        mark_degraded(state, "news", f"deadline reached, stored news not refreshed for {skipped}")
+
+    news_dict = {stock: summaries for stock, (summaries, _) in zip(stocks, fetched) if summaries}
+
+    # The prompt text gets each stock's news compressed to a token budget;
+    # news_dict keeps the full summaries of the ranked articles, from which
+    # rank_articles has already dropped near-duplicates.
     news_text = ""
-    for stock, row in list(DF.iterrows()):
-        if row['stock'] not in news_dict:
-            news_dict[row['stock']] = [row['summary']]
-        else:
-            news_dict[row['stock']].append(row['summary'])
-
-        news_text += f"{row['stock']}\n{row['summary']}\n---\n"
+    for stock, summaries in news_dict.items():
+        for summary in compress_summaries(summaries):
+            news_text += f"{stock}\n{summary}\n---\n"
 
     # print(news_dict)
     state['news'] = news_text
@@ -42,9 +56,22 @@ def news_extractor(state: AppState, limit = 10) -> AppState:
     return state
 
 
+@instrument_node
 def news_report(state: AppState) -> AppState:
     print('\n', "Generating News Report with sentiments based on the extracted News.\n")
 
+    sentiment = state.get('news_sentiment') or {}
+    short_on_time = not has_time(state, LLM_MIN_SECONDS)
+    if sentiment:
+        if short_on_time and not NEWS_FAST_MODE:
+            mark_degraded(state, "market_news", "deadline reached, sentiment reported without explanation")
+        return news_report_scored(state, sentiment, explain=not (NEWS_FAST_MODE or short_on_time))
+
+    if short_on_time:
+        mark_degraded(state, "market_news", "deadline reached, news report skipped")
+        state["market_news"] = ""
+        return state
+
     prompt = f"""
 
 Choose a combined sentiment that best represents these news articles:
@@ -75,9 +102,61 @@ Choose a combined sentiment that best represents these news articles:
     {state["user_query"]}
     """
 
-    response = llm.invoke([HumanMessage(prompt)])
+    response = bounded(clients.llm, state).invoke([HumanMessage(prompt)])
     state["market_news"] = response.content
 
     # print(response.content)
 
     return state
+
+
+def _scored_header(stock: str, scored: dict) -> str:
+    return f"{stock} : {scored['label']} (with value {scored['score']})"
+
+
+def news_report_scored(state: AppState, sentiment: dict, explain: bool = True) -> AppState:
+    """Report built on locally scored sentiment; the LLM only explains it."""
+    if not explain:
+        report = ""
+        for stock in state['stocks']:
+            scored = sentiment.get(stock, {"label": "Neutral", "score": 0.0, "articles": 0})
+            report += "------\n"
+            report += _scored_header(stock, scored) + "\n\n"
+            report += f"Scored from {scored['articles']} recent news articles.\n"
+            report += "------\n"
+        state["market_news"] = report
+        return state
+
+    headers = "\n".join(
+        _scored_header(stock, sentiment[stock]) for stock in state['stocks'] if stock in sentiment
+    )
+
+    prompt = f"""
+
+The sentiment of each stock has already been scored from these news articles:
+
+    ```
+    {state['news']}
+    ```
+
+    Each article is separated by `---`.
+
+    Scored sentiment per stock (do not change the label or value):
+    {headers}
+
+    For each stock write a short explanation (1-2 sentences) of why the news supports that sentiment.
+    Format your answer for each stock in {state['stocks']} like this:
+
+    ------
+    STOCK (Companies Full Name) : SENTIMENT (with value x)
+
+    `your responce from next line`
+    ------
+
+    When creating your answer, focus on answering the user query:
+    {state["user_query"]}
+    """
+
+    response = bounded(clients.llm, state).invoke([HumanMessage(prompt)])
+    state["market_news"] = response.content
+    return state
@@ -0,0 +1,98 @@
+import os
+import re
+from typing import List, Set
+
+NEWS_DEDUP_THRESHOLD = float(os.environ.get("NEWS_DEDUP_THRESHOLD", "0.5"))
+NEWS_TOKEN_BUDGET = int(os.environ.get("NEWS_TOKEN_BUDGET", "300"))
+
+SHINGLE_SIZE = 3
+
+_WORD = re.compile(r"[a-z0-9]+(?:['.][a-z0-9]+)*")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'])")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "been", "but", "by", "for", "from",
+    "has", "have", "he", "her", "his", "in", "into", "is", "it", "its", "of", "on",
+    "or", "said", "says", "she", "that", "the", "their", "they", "this", "to", "was",
+    "were", "which", "will", "with", "would",
+}
+
+
+def words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> Set[int]:
+    """Hashed word k-grams; short texts fall back to their bag of words."""
+    tokens = words(text)
+    if len(tokens) < k:
+        return {hash(t) for t in tokens}
+    return {hash(" ".join(tokens[i:i + k])) for i in range(len(tokens) - k + 1)}
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def compress_summaries(summaries: List[str], token_budget: int = NEWS_TOKEN_BUDGET) -> List[str]:
+    """Extractive compression of one stock's news down to roughly `token_budget` tokens.
+
+    Sentences are scored by the corpus frequency of their content words. Every
+    article first keeps its best sentence, then the remaining budget is filled
+    by score. Sentences that repeat an already chosen one are skipped, and the
+    original article and sentence order is preserved in the output.
+    """
+    if sum(approx_tokens(s) for s in summaries) <= token_budget:
+        return summaries
+
+    sentences = []  # (article index, sentence index, text)
+    for a, summary in enumerate(summaries):
+        for i, sentence in enumerate(_SENTENCE.split(summary.strip())):
+            if sentence.strip():
+                sentences.append((a, i, sentence.strip()))
+
+    frequency = {}
+    for _, _, sentence in sentences:
+        for w in words(sentence):
+            if w not in STOPWORDS:
+                frequency[w] = frequency.get(w, 0) + 1
+
+    def score(sentence: str) -> float:
+        content = [w for w in words(sentence) if w not in STOPWORDS]
+        if not content:
+            return 0.0
+        return sum(frequency[w] for w in content) / len(content) ** 0.5
+
+    ranked = sorted(range(len(sentences)), key=lambda j: score(sentences[j][2]), reverse=True)
+
+    best_per_article = {}
+    for j in ranked:
+        best_per_article.setdefault(sentences[j][0], j)
+    firsts = set(best_per_article.values())
+    order = list(best_per_article.values()) + [j for j in ranked if j not in firsts]
+
+    chosen = []
+    chosen_shingles: List[Set[int]] = []
+    used = 0
+    for j in order:
+        text = sentences[j][2]
+        cost = approx_tokens(text)
+        if used + cost > token_budget:
+            continue
+        current = shingles(text)
+        if any(jaccard(current, seen) >= NEWS_DEDUP_THRESHOLD for seen in chosen_shingles):
+            continue
+        chosen.append(j)
+        chosen_shingles.append(current)
+        used += cost
+
+    compressed = {}
+    for j in sorted(chosen, key=lambda j: (sentences[j][0], sentences[j][1])):
+        compressed.setdefault(sentences[j][0], []).append(sentences[j][2])
+    return [" ".join(compressed[a]) for a in sorted(compressed)]
@@ -0,0 +1,136 @@
+import math
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from services.news_filter import NEWS_DEDUP_THRESHOLD, jaccard, shingles
+from stocks import NASDAQ, NIFTY50
+
+# An article loses half its recency score every this many hours.
+NEWS_RECENCY_HALF_LIFE_HOURS = float(os.environ.get("NEWS_RECENCY_HALF_LIFE_HOURS", "24"))
+
+# Weights of the relevance components; each component is in [0, 1].
+RECENCY_WEIGHT = 0.4
+SOURCE_WEIGHT = 0.2
+MENTION_WEIGHT = 0.4
+# Subtracted per unit of overlap with an article already picked.
+NOVELTY_WEIGHT = 0.5
+
+# Finnhub `source` values, lower-cased. Wire services and primary financial
+# press first, aggregators and promotional outlets last.
+SOURCE_WEIGHTS = {
+    "reuters": 1.0,
+    "bloomberg": 1.0,
+    "dow jones": 0.9,
+    "the wall street journal": 0.9,
+    "financial times": 0.9,
+    "cnbc": 0.8,
+    "marketwatch": 0.8,
+    "economic times": 0.8,
+    "moneycontrol": 0.8,
+    "livemint": 0.8,
+    "business standard": 0.8,
+    "barrons": 0.7,
+    "yahoo": 0.6,
+    "seekingalpha": 0.5,
+    "benzinga": 0.5,
+    "zacks": 0.4,
+    "motley fool": 0.4,
+    "investorplace": 0.3,
+    "tipranks": 0.3,
+}
+DEFAULT_SOURCE_WEIGHT = 0.5
+
+_NAME_SUFFIX = re.compile(r"\b(ltd|limited|inc|corp|corporation|plc|co|company|class [a-z])\b\.?", re.I)
+
+
+def _company_name(entry: Any) -> str:
+    name = entry["name"] if isinstance(entry, dict) else entry
+    return " ".join(_NAME_SUFFIX.sub(" ", name).split()).lower()
+
+
+COMPANY_NAMES = {symbol: _company_name(entry) for symbol, entry in {**NIFTY50, **NASDAQ}.items()}
+
+
+def recency_score(timestamp: int, now: Optional[float] = None) -> float:
+    age_hours = max(0.0, ((now or time.time()) - timestamp) / 3600)
+    return math.pow(0.5, age_hours / NEWS_RECENCY_HALF_LIFE_HOURS)
+
+
+def source_score(source: Optional[str]) -> float:
+    return SOURCE_WEIGHTS.get((source or "").strip().lower(), DEFAULT_SOURCE_WEIGHT)
+
+
+def _mentions(text: str, pattern: str, flags: int = 0) -> bool:
+    return bool(pattern) and re.search(rf"(?<!\w){re.escape(pattern)}(?!\w)", text, flags) is not None
+
+
+def mention_score(symbol: str, headline: Optional[str], summary: Optional[str]) -> float:
+    """How directly an article is about `symbol`.
+
+    1.0 when the headline names the ticker or the full company name, 0.6 for
+    just the first word of the name (e.g. "Tata", "Adani"), 0.3 when only the
+    summary mentions the company, 0 otherwise. Finnhub files general market
+    pieces under every ticker they touch; those score 0.
+    """
+    headline = headline or ""
+    summary = summary or ""
+    ticker = symbol.split(".")[0].upper()
+    name = COMPANY_NAMES.get(ticker, "")
+    first_word = name.split()[0] if name else ""
+
+    # Short tickers ("T", "ON") are ordinary words; require them in capitals.
+    if len(ticker) >= 2 and _mentions(headline, ticker):
+        return 1.0
+    if _mentions(headline, name, re.I):
+        return 1.0
+    if len(first_word) >= 4 and _mentions(headline, first_word, re.I):
+        return 0.6
+    if (len(ticker) >= 2 and _mentions(summary, ticker)) or _mentions(summary, name, re.I):
+        return 0.3
+    return 0.0
+
+
+def relevance(article: Dict[str, Any], now: Optional[float] = None) -> float:
+    return (
+        RECENCY_WEIGHT * recency_score(article["datetime"], now)
+        + SOURCE_WEIGHT * source_score(article.get("source"))
+        + MENTION_WEIGHT * mention_score(article["symbol"], article.get("headline"), article.get("summary"))
+    )
+
+
+def rank_articles(
+    articles: List[Dict[str, Any]],
+    limit: Optional[int] = None,
+    now: Optional[float] = None,
+    threshold: float = NEWS_DEDUP_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """The `limit` most useful stored articles, best first.
+
+    Articles are scored locally on recency, source weight and how strongly
+    the headline mentions the article's symbol, then picked greedily with a
+    novelty penalty for overlapping an already picked article (maximal
+    marginal relevance). Near-duplicates of a picked article are dropped.
+    """
+    # [relevance, shingles, overlap with the picked articles so far, article]
+    candidates = []
+    for article in articles:
+        text = article.get("summary") or ""
+        if text.strip():
+            candidates.append([relevance(article, now), shingles(f"{article.get('headline') or ''} {text}"), 0.0, article])
+
+    picked: List[Dict[str, Any]] = []
+    while candidates and (limit is None or len(picked) < limit):
+        best = max(candidates, key=lambda c: c[0] - NOVELTY_WEIGHT * c[2])
+        picked.append(best[3])
+        remaining = []
+        for candidate in candidates:
+            if candidate is best:
+                continue
+            # Only the newest pick can raise a candidate's overlap.
+            candidate[2] = max(candidate[2], jaccard(candidate[1], best[1]))
+            if candidate[2] < threshold:
+                remaining.append(candidate)
+        candidates = remaining
+    return picked
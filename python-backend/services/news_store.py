@@ -0,0 +1,307 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import clients
+from services.metrics import record_cache, track_upstream
+
+NEWS_DB = os.environ.get("NEWS_DB", "news.sqlite3")
+
+# Trailing window of news served to the pipeline, as the old per-request fetch did.
+NEWS_WINDOW_DAYS = int(os.environ.get("NEWS_WINDOW_DAYS", "7"))
+
+# A symbol is not asked for again within this many seconds of its last refresh.
+NEWS_REFRESH_SECONDS = float(os.environ.get("NEWS_REFRESH_SECONDS", "300"))
+
+# Articles older than this are deleted from the store.
+NEWS_RETENTION_DAYS = int(os.environ.get("NEWS_RETENTION_DAYS", "30"))
+
+ARTICLE_COLUMNS = ("id", "symbol", "datetime", "headline", "summary", "source", "url", "sentiment")
+
+# Sentiment filter names and the score range each covers, half-open so every
+# score falls in exactly one: -0.15 is Somewhat-Bearish and 0.15
+# Somewhat-Bullish in sentiment_band, so they count as negative / positive.
+SENTIMENT_RANGES = {
+    "positive": "a.sentiment >= 0.15",
+    "neutral": "a.sentiment > -0.15 AND a.sentiment < 0.15",
+    "negative": "a.sentiment <= -0.15",
+}
+
+_QUERY_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text: str) -> str:
+    """Free text as an FTS5 query: every word must match, the last one as a prefix.
+
+    Quoting each term keeps user input from being parsed as FTS5 syntax.
+    """
+    terms = _QUERY_TERM.findall(text)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class NewsStore:
+    """Local store of Finnhub company news, refreshed incrementally per symbol.
+
+    Articles are keyed by (Finnhub article id, symbol). Each symbol keeps a
+    high-water mark (newest article time seen) and the time of its last
+    refresh, so a refresh only asks Finnhub for days it may not have yet and
+    only inserts articles it has not stored.
+    """
+
+    def __init__(self, path: str = NEWS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._refresh_locks: Dict[str, threading.Lock] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER NOT NULL,
+                    symbol TEXT NOT NULL,
+                    datetime INTEGER NOT NULL,
+                    headline TEXT NOT NULL DEFAULT '',
+                    summary TEXT NOT NULL DEFAULT '',
+                    source TEXT NOT NULL DEFAULT '',
+                    url TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (id, symbol)
+                );
+                CREATE INDEX IF NOT EXISTS articles_symbol_time ON articles (symbol, datetime DESC);
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    symbol TEXT PRIMARY KEY,
+                    last_seen INTEGER NOT NULL,
+                    refreshed_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS article_summaries (
+                    id INTEGER NOT NULL,
+                    language TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    sentiment TEXT NOT NULL,
+                    impact TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (id, language)
+                );
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+            if "sentiment" not in columns:
+                conn.execute("ALTER TABLE articles ADD COLUMN sentiment REAL")
+
+            # Full-text index over the stored articles, kept in sync by triggers.
+            indexed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'"
+            ).fetchone()
+            conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                    headline, summary, symbol, content='articles', content_rowid='rowid'
+                );
+                CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+                    INSERT INTO articles_fts (rowid, headline, summary, symbol)
+                    VALUES (new.rowid, new.headline, new.summary, new.symbol);
+                END;
+                CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+                    INSERT INTO articles_fts (articles_fts, rowid, headline, summary, symbol)
+                    VALUES ('delete', old.rowid, old.headline, old.summary, old.symbol);
+                END;
+                """
+            )
+            if not indexed:
+                conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _watermark(self, symbol: str):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT last_seen, refreshed_at FROM watermarks WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        return row or (0, 0.0)
+
+    def needs_refresh(self, symbol: str) -> bool:
+        _, refreshed_at = self._watermark(symbol)
+        return time.time() - refreshed_at >= NEWS_REFRESH_SECONDS
+
+    def refresh(self, symbol: str) -> int:
+        """Fetch articles newer than the symbol's high-water mark; returns how many were new."""
+        with self._lock:
+            refresh_lock = self._refresh_locks.setdefault(symbol, threading.Lock())
+
+        # Concurrent requests for one symbol share a single Finnhub call.
+        with refresh_lock:
+            last_seen, refreshed_at = self._watermark(symbol)
+            fresh = time.time() - refreshed_at < NEWS_REFRESH_SECONDS
+            record_cache("news_store", fresh)
+            if fresh:
+                return 0
+
+            now = datetime.now()
+            window_start = now - timedelta(days=NEWS_WINDOW_DAYS)
+            since = max(window_start, datetime.fromtimestamp(last_seen)) if last_seen else window_start
+            with track_upstream("finnhub", "company_news"):
+                data = clients.FIN_CLIENT.company_news(
+                    symbol, _from=since.strftime('%Y-%m-%d'), to=now.strftime('%Y-%m-%d')
+                )
+
+            # Finnhub filters by day, so the first day overlaps the last
+            # refresh. Overlapping articles are dropped by the INSERT OR IGNORE
+            # on their id rather than by timestamp, which would lose articles
+            # sharing the watermark's second or indexed late with an older one.
+            rows = [
+                (
+                    int(item["id"]),
+                    symbol,
+                    int(item.get("datetime") or 0),
+                    item.get("headline") or "",
+                    item.get("summary") or "",
+                    item.get("source") or "",
+                    item.get("url") or "",
+                )
+                for item in data or []
+                if item.get("id") is not None
+            ]
+            newest = max([last_seen] + [row[2] for row in rows])
+            cutoff = int((now - timedelta(days=NEWS_RETENTION_DAYS)).timestamp())
+
+            with self._lock:
+                conn = self._connect()
+                cursor = conn.executemany(
+                    "INSERT OR IGNORE INTO articles (id, symbol, datetime, headline, summary, source, url) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                inserted = cursor.rowcount
+                conn.execute(
+                    "INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)",
+                    (symbol, newest, time.time()),
+                )
+                conn.execute("DELETE FROM articles WHERE symbol = ? AND datetime < ?", (symbol, cutoff))
+                conn.execute(
+                    "DELETE FROM article_summaries WHERE created_at < ?",
+                    (time.time() - NEWS_RETENTION_DAYS * 86400,),
+                )
+                conn.commit()
+            return inserted
+
+    def search(
+        self,
+        query: str = "",
+        symbol: Optional[str] = None,
+        days: Optional[int] = None,
+        sentiment: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Stored articles matching the filters, and how many match in total.
+
+        With a `query` the full-text index is used and results are ranked by
+        relevance; without one they are newest first. Upstream is never called.
+        """
+        where: List[str] = []
+        params: List[Any] = []
+        match = fts_query(query)
+        if match:
+            source = "articles_fts JOIN articles a ON a.rowid = articles_fts.rowid"
+            where.append("articles_fts MATCH ?")
+            params.append(match)
+            order = "bm25(articles_fts), a.datetime DESC"
+        else:
+            source = "articles a"
+            order = "a.datetime DESC"
+        if symbol:
+            where.append("a.symbol = ?")
+            params.append(symbol.upper())
+        if days:
+            where.append("a.datetime >= ?")
+            params.append(int((datetime.now() - timedelta(days=days)).timestamp()))
+        if sentiment in SENTIMENT_RANGES:
+            where.append(SENTIMENT_RANGES[sentiment])
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+
+        columns = ", ".join(f"a.{c}" for c in ARTICLE_COLUMNS)
+        with self._lock:
+            conn = self._connect()
+            (total,) = conn.execute(f"SELECT COUNT(*) FROM {source}{clause}", params).fetchone()
+            rows = conn.execute(
+                f"SELECT {columns} FROM {source}{clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [dict(zip(ARTICLE_COLUMNS, row)) for row in rows], total
+
+    def articles(
+        self,
+        symbol: str,
+        days: int = NEWS_WINDOW_DAYS,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Stored articles for a symbol from the last `days` days, newest first."""
+        rows, _ = self.search(symbol=symbol, days=days, limit=-1 if limit is None else limit)
+        return rows
+
+    def translated(self, ids: List[int], language: str) -> Dict[int, Dict[str, str]]:
+        """Cached LLM summaries of the given articles in `language`, by article id."""
+        if not ids:
+            return {}
+        placeholders = ", ".join("?" for _ in ids)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT id, summary, sentiment, impact FROM article_summaries "
+                f"WHERE language = ? AND id IN ({placeholders})",
+                [language, *ids],
+            ).fetchall()
+        return {
+            article_id: {"summary": summary, "sentiment": sentiment, "impact": impact}
+            for article_id, summary, sentiment, impact in rows
+        }
+
+    def save_translated(self, language: str, results: Dict[int, Dict[str, str]]) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO article_summaries VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (article_id, language, r["summary"], r["sentiment"], r["impact"], now)
+                    for article_id, r in results.items()
+                ],
+            )
+            conn.commit()
+
+    def sentiments(self, symbol: str, summaries: List[str]) -> Dict[str, float]:
+        """Stored sentiment of the given summaries of a symbol's articles, for those scored before."""
+        if not summaries:
+            return {}
+        placeholders = ", ".join("?" for _ in summaries)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT summary, sentiment FROM articles "
+                f"WHERE symbol = ? AND sentiment IS NOT NULL AND summary IN ({placeholders})",
+                [symbol, *summaries],
+            ).fetchall()
+        return dict(rows)
+
+    def save_sentiments(self, symbol: str, scores: Dict[str, float]) -> None:
+        """Store sentiment scores on a symbol's articles, keyed by summary."""
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "UPDATE articles SET sentiment = ? WHERE symbol = ? AND summary = ? AND sentiment IS NULL",
+                [(round(score, 4), symbol, summary) for summary, score in scores.items()],
+            )
+            conn.commit()
+
+
+NEWS_STORE = NewsStore()
@@ -0,0 +1,273 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from classes import AppState
+from services.covariance import COVARIANCE
+from services.deadline import FETCH_MIN_SECONDS, has_time, mark_degraded
+from services.metrics import instrument_node
+
+MIN_VARIANCE = "min_variance"
+RISK_PARITY = "risk_parity"
+MEAN_VARIANCE = "mean_variance"
+
+# Historical mean returns are noisy; mean-variance uses them shrunk this far
+# towards their cross-sectional average.
+MEAN_SHRINKAGE = 0.5
+
+# Solvers stop once no weight moves more than OPTIMIZER_TOLERANCE in an iteration.
+OPTIMIZER_ITERATIONS = 500
+OPTIMIZER_TOLERANCE = 1e-7
+RISK_PARITY_SWEEPS = 50
+PROJECTION_ITERATIONS = 40
+
+# Investment duration assumed when the profile does not give one, as in the
+# portfolio summariser's extraction prompt.
+DEFAULT_DURATION_YEARS = 10.0
+
+
+def duration_years(duration: Optional[str]) -> float:
+    """Years in a free-text investment duration ("12 years", "short term", "6 months")."""
+    text = (duration or "").lower()
+    number = re.search(r"\d+(?:\.\d+)?", text)
+    if number:
+        years = float(number.group())
+        return years / 12 if "month" in text else years
+    if "short" in text:
+        return 1.0
+    if "medium" in text or "mid" in text:
+        return 5.0
+    return DEFAULT_DURATION_YEARS
+
+
+def choose_method(risk_preference: Optional[float], investment_duration: Optional[str]) -> Dict[str, Any]:
+    """Optimizer settings for a profile.
+
+    Short horizons and low risk tolerance get minimum variance, moderate
+    profiles risk parity, and long-horizon risk-seeking profiles
+    mean-variance, with risk aversion falling and the per-stock cap rising
+    as risk preference grows.
+    """
+    risk = 0.5 if risk_preference is None else float(np.clip(risk_preference, 0, 1))
+    years = duration_years(investment_duration)
+    if risk < 0.35 or years < 2:
+        return {"method": MIN_VARIANCE, "risk_aversion": 0.0, "max_weight": 0.25}
+    if risk < 0.65 or years < 5:
+        return {"method": RISK_PARITY, "risk_aversion": 0.0, "max_weight": 0.35}
+    return {"method": MEAN_VARIANCE, "risk_aversion": 2.0 + 8.0 * (1 - risk), "max_weight": 0.5}
+
+
+def project_capped_simplex(v: np.ndarray, cap: np.ndarray) -> np.ndarray:
+    """Euclidean projection of each row of `v` onto {w : 0 <= w <= cap, sum(w) = 1}.
+
+    Solved for all rows at once by bisection on the shift tau in
+    w = clip(v - tau, 0, cap). Rows whose caps sum to less than 1 get their caps.
+    """
+    low = (v - cap).min(axis=1, keepdims=True) - 1.0
+    high = v.max(axis=1, keepdims=True)
+    for _ in range(PROJECTION_ITERATIONS):
+        tau = (low + high) / 2
+        over = np.clip(v - tau, 0, cap).sum(axis=1, keepdims=True) > 1
+        low = np.where(over, tau, low)
+        high = np.where(over, high, tau)
+    return np.clip(v - (low + high) / 2, 0, cap)
+
+
+def _largest_eigenvalue(cov: np.ndarray) -> np.ndarray:
+    return np.linalg.eigvalsh(cov)[:, -1:]
+
+
+def _projected_gradient(
+    cov: np.ndarray,
+    mu: np.ndarray,
+    risk_aversion: np.ndarray,
+    cap: np.ndarray,
+) -> np.ndarray:
+    """Minimize ra/2 w'Cw - mu'w (min-variance when mu = 0) over the capped simplex, per row.
+
+    Accelerated projected gradient with step 1 / L, L = ra * max eigenvalue of C.
+    """
+    ra = np.where(risk_aversion > 0, risk_aversion, 1.0)[:, None]
+    step = 1.0 / np.maximum(ra * _largest_eigenvalue(cov), 1e-12)
+    w = project_capped_simplex(np.where(cap > 0, 1.0, 0.0) / np.maximum((cap > 0).sum(axis=1, keepdims=True), 1), cap)
+    previous = w
+    for k in range(1, OPTIMIZER_ITERATIONS + 1):
+        y = w + (k - 1) / (k + 2) * (w - previous)
+        gradient = ra * np.einsum("bij,bj->bi", cov, y) - mu
+        previous, w = w, project_capped_simplex(y - step * gradient, cap)
+        if np.abs(w - previous).max() < OPTIMIZER_TOLERANCE:
+            break
+    return w
+
+
+def _risk_parity(cov: np.ndarray, cap: np.ndarray) -> np.ndarray:
+    """Equal risk contributions w_i (Cw)_i, then capped.
+
+    Minimizes the convex 1/2 x'Cx - b' log x (b = 1/n over the row's assets),
+    whose minimizer normalized to sum 1 is the risk-parity portfolio, by
+    cyclical coordinate descent: each x_i has a closed-form update, applied
+    to every portfolio in the batch at once.
+    """
+    active = cap > 0
+    b = active / np.maximum(active.sum(axis=1, keepdims=True), 1)
+    diag = np.maximum(np.einsum("bii->bi", cov), 1e-12)
+    x = active / np.sqrt(diag)
+    for _ in range(RISK_PARITY_SWEEPS):
+        for i in range(cov.shape[1]):
+            others = np.einsum("bj,bj->b", cov[:, i, :], x) - diag[:, i] * x[:, i]
+            x[:, i] = (-others + np.sqrt(others ** 2 + 4 * diag[:, i] * b[:, i])) / (2 * diag[:, i])
+    x = np.where(active, x, 0.0)
+    w = x / np.maximum(x.sum(axis=1, keepdims=True), 1e-18)
+    return project_capped_simplex(w, cap)
+
+
+def optimize_batch(
+    cov: np.ndarray,
+    mu: np.ndarray,
+    methods: Sequence[str],
+    risk_aversion: np.ndarray,
+    max_weight: np.ndarray,
+    mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Target weights for a batch of portfolios in one vectorized run.
+
+    `cov` is (B, n, n) annualized covariance and `mu` (B, n) expected
+    returns, padded to a common n; `mask` (B, n) marks each portfolio's real
+    assets. Portfolios are grouped by method and every group is solved with
+    array operations over the whole batch.
+    """
+    cov = np.asarray(cov, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+    batch, n = mu.shape
+    mask = np.ones((batch, n), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    counts = np.maximum(mask.sum(axis=1, keepdims=True), 1)
+    # A cap below 1/n has no feasible portfolio; such rows fall back to equal weights.
+    cap = np.where(mask, np.maximum(np.asarray(max_weight, dtype=float)[:, None], 1.0 / counts), 0.0)
+    methods = np.asarray(methods)
+    risk_aversion = np.asarray(risk_aversion, dtype=float)
+
+    weights = np.zeros((batch, n))
+    for method in np.unique(methods):
+        rows = np.flatnonzero(methods == method)
+        if method == RISK_PARITY:
+            weights[rows] = _risk_parity(cov[rows], cap[rows])
+        elif method == MEAN_VARIANCE:
+            weights[rows] = _projected_gradient(cov[rows], mu[rows], risk_aversion[rows], cap[rows])
+        else:
+            weights[rows] = _projected_gradient(cov[rows], np.zeros_like(mu[rows]), np.ones(len(rows)), cap[rows])
+    return weights
+
+
+def expected_returns(symbols: List[str]) -> np.ndarray:
+    historical = COVARIANCE.mean(symbols)
+    if not len(historical):
+        return historical
+    return (1 - MEAN_SHRINKAGE) * historical + MEAN_SHRINKAGE * historical.mean()
+
+
+def round_percentages(weights: Dict[str, float], total: float = 100.0) -> Dict[str, float]:
+    """Scale `weights` to `total` percent and round to one decimal so they still add up to it exactly.
+
+    Largest-remainder rounding: every weight is floored to a tenth, and the
+    tenths left over go to the weights that lost the most.
+    """
+    if not weights:
+        return {}
+    raw = np.array(list(weights.values()), dtype=float)
+    raw = raw / raw.sum() * total * 10 if raw.sum() > 0 else np.zeros(len(raw))
+    tenths = np.floor(raw)
+    leftover = int(round(total * 10 - tenths.sum())) if raw.any() else 0
+    tenths[np.argsort(tenths - raw, kind="stable")[:leftover]] += 1
+    return {s: round(float(t) / 10, 1) for s, t in zip(weights, tenths)}
+
+
+def target_allocations(profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Deterministic target weights for many investors in one vectorized run.
+
+    Each profile is a dict with `stocks`, `risk_preference` and
+    `investment_duration` (a UsageClassfier dump works). The covariance of
+    the union of their stocks is sliced once from the store, then every
+    portfolio is padded to the largest and solved by `optimize_batch`.
+    Stocks the store cannot price are left out and reported under `missing`;
+    nothing here waits on a download.
+    """
+    portfolios = [
+        list(dict.fromkeys(s.strip().upper() for s in p.get("stocks") or [] if s and s.strip()))
+        for p in profiles
+    ]
+    universe = list(dict.fromkeys(s for symbols in portfolios for s in symbols))
+    cov, missing = COVARIANCE.covariance(universe)
+    # Stocks outside the store are added in the background for later runs.
+    COVARIANCE.queue_symbols(missing)
+    mu = expected_returns(universe)
+    position = {s: i for i, s in enumerate(universe)}
+
+    usable = [[s for s in symbols if s not in missing] for symbols in portfolios]
+    settings = [choose_method(p.get("risk_preference"), p.get("investment_duration")) for p in profiles]
+    n = max((len(u) for u in usable), default=0)
+    index = np.zeros((len(profiles), n), dtype=int)
+    mask = np.zeros((len(profiles), n), dtype=bool)
+    for row, symbols in enumerate(usable):
+        index[row, :len(symbols)] = [position[s] for s in symbols]
+        mask[row, :len(symbols)] = True
+
+    batch_cov = cov[index[:, :, None], index[:, None, :]] * (mask[:, :, None] & mask[:, None, :])
+    batch_mu = np.where(mask, mu[index], 0.0)
+    weights = optimize_batch(
+        batch_cov, batch_mu,
+        [s["method"] for s in settings],
+        np.array([s["risk_aversion"] for s in settings]),
+        np.array([s["max_weight"] for s in settings]),
+        mask,
+    ) if n else np.zeros((len(profiles), 0))
+
+    results = []
+    for row, symbols in enumerate(usable):
+        w = weights[row, :len(symbols)]
+        c = batch_cov[row, :len(symbols), :len(symbols)]
+        result: Dict[str, Any] = {
+            **settings[row],
+            "weights": round_percentages({s: float(x) for s, x in zip(symbols, w)}),
+            "missing": [s for s in portfolios[row] if s in missing],
+        }
+        if symbols:
+            result["expected_return"] = round(float(w @ batch_mu[row, :len(symbols)]) * 100, 2)
+            result["volatility"] = round(float(np.sqrt(w @ c @ w)) * 100, 2)
+        results.append(result)
+    return results
+
+
+def target_allocation(
+    stocks: List[str],
+    risk_preference: Optional[float],
+    investment_duration: Optional[str],
+) -> Dict[str, Any]:
+    """Deterministic target weights for one investor's stocks, with the portfolio's expected risk and return (in %)."""
+    return target_allocations([{
+        "stocks": stocks,
+        "risk_preference": risk_preference,
+        "investment_duration": investment_duration,
+    }])[0]
+
+
+@instrument_node
+def allocation_targets(state: AppState) -> AppState:
+    print('\n', "Optimizing the target allocation for the user's stocks.\n")
+
+    state['target_allocation'] = {}
+    if not has_time(state, FETCH_MIN_SECONDS):
+        mark_degraded(state, "target_allocation", "deadline reached, target allocation not computed")
+        return state
+
+    profile = state['profile']
+    try:
+        targets = target_allocation(state['stocks'] or [], profile.risk_preference, profile.investment_duration)
+    except Exception as e:
+        mark_degraded(state, "target_allocation", f"optimizer failed: {e}")
+        return state
+
+    if targets['missing']:
+        mark_degraded(state, "target_allocation", f"no price history yet for {targets['missing']}, left out of the targets")
+    state['target_allocation'] = targets
+    return state
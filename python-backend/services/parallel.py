@@ -1,105 +1,57 @@
-import asyncio
-import concurrent.futures
+from functools import partial
 
 from classes import AppState
+from services.dag import DAG, Node
+from services.executors import run_in
 from services.macro_analysis import macro_economic
+from services.metrics import instrument_node
 from services.news import news_extractor, news_report
+from services.sentiment import news_sentiment
 
 
+NEWS_LIMIT = 5
+
+# News and macro fetches run per stock, so the macro fetch for B overlaps the
+# news fetch for A. Sentiment scoring and the news report run once over the
+# assembled news: one sentiment batch over every summary and one LLM call
+# that sees all the stocks' news together.
+NEWS_NODES = [
+    Node("news_extractor", partial(news_extractor, limit=NEWS_LIMIT),
+         outputs=("news", "news_dict"), per_stock=True),
+    Node("news_sentiment", news_sentiment,
+         inputs=("news_dict",), outputs=("news_sentiment",), pool="cpu"),
+    Node("news_report", news_report,
+         inputs=("news", "news_sentiment"), outputs=("market_news",), pool="llm"),
+]
+MACRO_NODES = [
+    Node("macro_economic", macro_economic,
+         outputs=("macro_economics_dict",), per_stock=True),
+]
+
+NEWS_AND_MACRO = DAG(NEWS_NODES + MACRO_NODES)
+
+
+@instrument_node
 def run_parallel_news_and_macro(state: AppState) -> AppState:
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        return asyncio.run(run_parallel_news_and_macro_async(state))
-    else:
-        # Fallback to thread pool if we're already inside a running event loop.
-        def news_branch(s):
-            try:
-                return news_report(news_extractor(s, 5))
-            except Exception as e:
-                print("Error in news branch:", e)
-                return s
-
-        def macro_branch(s):
-            try:
-                return macro_economic(s)
-            except Exception as e:
-                print("Error in macro branch:", e)
-                return s
-
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            f1 = executor.submit(news_branch, state.copy())
-            f2 = executor.submit(macro_branch, state.copy())
-
-            news_state = f1.result()
-            macro_state = f2.result()
-
-        # Defensive merging
-        merged = AppState()
-        merged['user_query'] = state.get('user_query', "")
-        merged['usage'] = state.get('usage', "")
-        merged['stocks'] = state.get('stocks', [])
-        merged['portfolio'] = state.get('portfolio', "")
-
-        # Merge news
-        merged['news'] = news_state.get('news', "")
-        merged['news_dict'] = news_state.get('news_dict', {})
-        merged['market_news'] = news_state.get('market_news', "")
-
-        # Merge macro
-        merged['macro_economics'] = macro_state.get('macro_economics', "")
-        merged['macro_economics_dict'] = macro_state.get('macro_economics_dict', {})
-
-        return merged
+    return NEWS_AND_MACRO.run_sync(state)
 
 
 async def news_extractor_async(state: AppState, limit = 10) -> AppState:
-    return await asyncio.to_thread(news_extractor, state, limit)
+    return await run_in("node", news_extractor, state, limit)
+
+
+async def news_sentiment_async(state: AppState) -> AppState:
+    return await run_in("cpu", news_sentiment, state)
 
 
 async def news_report_async(state: AppState) -> AppState:
-    return await asyncio.to_thread(news_report, state)
+    return await run_in("llm", news_report, state)
 
 
 async def macro_economic_async(state: AppState) -> AppState:
-    return await asyncio.to_thread(macro_economic, state)
+    return await run_in("node", macro_economic, state)
 
 
+@instrument_node
 async def run_parallel_news_and_macro_async(state: AppState) -> AppState:
-    async def news_branch(s):
-        try:
-            s = await news_extractor_async(s, 5)
-            return await news_report_async(s)
-        except Exception as e:
-            print("Error in news branch:", e)
-            return s
-
-    async def macro_branch(s):
-        try:
-            return await macro_economic_async(s)
-        except Exception as e:
-            print("Error in macro branch:", e)
-            return s
-
-    news_state, macro_state = await asyncio.gather(
-        news_branch(state.copy()),
-        macro_branch(state.copy())
-    )
-
-    # Defensive merging
-    merged = AppState()
-    merged['user_query'] = state.get('user_query', "")
-    merged['usage'] = state.get('usage', "")
-    merged['stocks'] = state.get('stocks', [])
-    merged['portfolio'] = state.get('portfolio', "")
-
-    # Merge news
-    merged['news'] = news_state.get('news', "")
-    merged['news_dict'] = news_state.get('news_dict', {})
-    merged['market_news'] = news_state.get('market_news', "")
-
-    # Merge macro
-    merged['macro_economics'] = macro_state.get('macro_economics', "")
-    merged['macro_economics_dict'] = macro_state.get('macro_economics_dict', {})
-
-    return merged
+    return await NEWS_AND_MACRO.run(state)
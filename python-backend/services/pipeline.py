@@ -0,0 +1,116 @@
+from dataclasses import replace
+from typing import Optional
+
+from classes import AppState, UsageClassfier
+from services.checkpoint import CHECKPOINTS
+from services.dag import DAG, Node, ProgressCallback
+from services.deadline import LLM_STAGE_SECONDS, Deadline
+from services.macro_analysis import market_trends
+from services.optimizer import allocation_targets
+from services.parallel import MACRO_NODES, NEWS_NODES
+from services.portfolio import portfolio_summariser
+from services.strategy import strategy
+
+
+def new_state(**fields) -> AppState:
+    state: AppState = {
+        "usage": "invalid",
+        "user_query": "",
+        "stocks": [],
+        "portfolio": "",
+        "news": "",
+        "news_dict": {},
+        "news_sentiment": {},
+        "market_news": "",
+        "macro_economics": "",
+        "macro_economics_dict": {},
+        "market_trends": "",
+        "target_allocation": {},
+        "advice": "",
+        "strategy": "",
+        "final_proposal": "",
+        "deadline": None,
+        "degraded": {},
+    }
+    state.update(fields)
+    return state
+
+
+def summarise_profile(state: AppState) -> AppState:
+    state['portfolio'] = portfolio_summariser(state['profile'], state.get('deadline'))['portfolio']
+    return state
+
+
+# The portfolio summary only feeds the strategy prompt, so it runs alongside
+# the news and macro nodes instead of before them. Those per-stock fetches
+# overlap each other; the news sentiment and report then run once over every
+# stock's news. All of them leave time on the deadline for the market_trends
+# and strategy LLM stages that follow. The optimizer sets the
+# target weights the strategy explains; it only reads the covariance store
+# (unknown stocks are queued, not fetched), so it is leaf CPU work.
+STRATEGY = DAG(
+    [Node("portfolio_summariser", summarise_profile, inputs=("profile",), outputs=("portfolio",),
+          required=True, pool="llm"),
+     Node("optimizer", allocation_targets, inputs=("profile",), outputs=("target_allocation",),
+          reserve=LLM_STAGE_SECONDS, pool="cpu")]
+    + [replace(node, reserve=2 * LLM_STAGE_SECONDS) for node in NEWS_NODES + MACRO_NODES]
+    + [
+        Node("market_trends", market_trends,
+             inputs=("macro_economics_dict", "market_news"),
+             outputs=("macro_economics", "market_trends"),
+             reserve=LLM_STAGE_SECONDS,
+             pool="llm"),
+        Node("strategy", strategy,
+             inputs=("portfolio", "macro_economics", "market_news", "target_allocation"),
+             outputs=("strategy",),
+             required=True,
+             pool="llm"),
+    ]
+)
+
+# The market stage on its own (news, macro and market_trends), as served by
+# /api/strategy/market and prefetched after /api/strategy/summary.
+MARKET = DAG(
+    NEWS_NODES + MACRO_NODES + [
+        Node("market_trends", market_trends,
+             inputs=("macro_economics_dict", "market_news"),
+             outputs=("macro_economics", "market_trends"),
+             pool="llm"),
+    ]
+)
+
+
+def run_market_stage(state: AppState) -> AppState:
+    return MARKET.run_sync(state)
+
+
+def run_strategy_pipeline(
+    usage_state: UsageClassfier,
+    deadline: Deadline,
+    on_progress: Optional[ProgressCallback] = None,
+    run_id: Optional[str] = None,
+) -> AppState:
+    """Run the strategy DAG; with a `run_id`, finished nodes are checkpointed and resumed."""
+    state = new_state(
+        usage="strategy",
+        user_query=usage_state.user_query,
+        stocks=usage_state.stocks or [],
+        profile=usage_state,
+        deadline=deadline,
+    )
+    checkpoint = CHECKPOINTS.run(run_id) if run_id else None
+    return STRATEGY.run_sync(state, on_progress, checkpoint)
+
+
+def strategy_result(state: AppState) -> dict:
+    """Response body of a strategy run, shared by /api/strategy and strategy jobs."""
+    return {
+        "portfolio": state.get("portfolio"),
+        "stocks": state.get("stocks"),
+        "market_news": state.get("market_news"),
+        "macro_economics": state.get("macro_economics"),
+        "market_trends": state.get("market_trends"),
+        "strategy": state.get("strategy"),
+        "target_allocation": state.get("target_allocation"),
+        "degraded": state.get("degraded", {}),
+    }
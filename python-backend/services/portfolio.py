@@ -1,10 +1,25 @@
-from typing import Any, Dict, List
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
 
 from classes import AppState, UsageClassfier
-from services.clients import llm
+from services import clients
+from services.cache import TTLCache
+from services.deadline import Deadline, bounded
+from services.metrics import instrument_node
+
+
+PORTFOLIO_SUMMARY_TTL_SECONDS = float(os.environ.get("PORTFOLIO_SUMMARY_TTL_SECONDS", str(24 * 60 * 60)))
+
+# The summary prompt only reads the profile fields, never the query, usage or
+# stocks, so those are left out of the key and every endpoint shares entries.
+# A changed profile hashes to a new key; the old entry ages out of the LRU.
+SUMMARY_FINGERPRINT_EXCLUDE = ("stocks", "user_query", "usage")
+PORTFOLIO_SUMMARY_CACHE = TTLCache("portfolio_summary", PORTFOLIO_SUMMARY_TTL_SECONDS)
 
 
 class PortfolioSummary(BaseModel):
@@ -14,6 +29,7 @@ class PortfolioSummary(BaseModel):
     key_takeaways: List[str] = Field(default_factory=list)
 
 
+@instrument_node
 def portfolio_summary_from_form(form_data: Dict[str, Any]) -> Dict[str, Any]:
     print('\n', "Summarizing the overall portfolio from form data\n")
 
@@ -25,7 +41,7 @@ def portfolio_summary_from_form(form_data: Dict[str, Any]) -> Dict[str, Any]:
 
     Keep the summary concise, practical, and based only on the provided data."""
 
-    usage_llm = llm.with_structured_output(PortfolioSummary)
+    usage_llm = clients.llm.with_structured_output(PortfolioSummary)
     analysis = usage_llm.invoke([
         SystemMessage(content=prompt),
         HumanMessage(content=str(form_data)),
@@ -38,7 +54,28 @@ def portfolio_summary_from_form(form_data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def profile_fingerprint(profile: UsageClassfier, exclude: Iterable[str] = ("stocks",)) -> str:
+    """Stable hash of an investor profile, so equivalent submissions share work.
+
+    Strings are trimmed and case-folded and numbers compared as floats, so
+    "Private" / " private" or 30 / 30.0 produce the same fingerprint.
+    """
+    data = profile.model_dump(exclude=set(exclude))
+    normalized = {}
+    for key, value in data.items():
+        if isinstance(value, str):
+            value = " ".join(value.split()).casefold()
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = round(float(value), 4)
+        elif isinstance(value, list):
+            value = sorted(str(v).strip().upper() for v in value)
+        normalized[key] = value
+    encoded = json.dumps(normalized, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
 # Node Portfolio Builder from the user Input
+@instrument_node
 def portfolio_builder(state: UsageClassfier) -> UsageClassfier:
     print('\n', "Building the portfolio from user query\n")
 
@@ -72,7 +109,7 @@ def portfolio_builder(state: UsageClassfier) -> UsageClassfier:
     """
 
     # Change structured model to AppState (not UsageClassfier) to receive all fields
-    usage_llm = llm.with_structured_output(UsageClassfier)
+    usage_llm = clients.llm.with_structured_output(UsageClassfier)
     
     extraction = usage_llm.invoke([
         SystemMessage(content=prompt),
@@ -99,7 +136,9 @@ def portfolio_builder(state: UsageClassfier) -> UsageClassfier:
 
 
 # Node Portfolio Builder from the user Input
-def portfolio_summariser(state: UsageClassfier) -> AppState:
+@instrument_node
+def portfolio_summariser(state: UsageClassfier, deadline: Optional[Deadline] = None) -> AppState:
+    """Summary of an investor profile; with a `deadline` the LLM call is bound to it."""
     print('\n', "Summarizing the overall portfolio from user inputs\n")
 
     prompt = f"""Analyze the following investor profile and provide a summary including the finalncial outlook, retirement strategy, risk assessment:
@@ -123,12 +162,15 @@ def portfolio_summariser(state: UsageClassfier) -> AppState:
     - Risk Preference (0â€“1 scale): {state.risk_preference}
     """
 
-    response = llm.invoke([HumanMessage(prompt)])
+    key = profile_fingerprint(state, exclude=SUMMARY_FINGERPRINT_EXCLUDE)
+    portfolio = PORTFOLIO_SUMMARY_CACHE.get_or_compute(
+        key, lambda: bounded(clients.llm, {"deadline": deadline}).invoke([HumanMessage(prompt)]).content
+    )
 
     new_state = AppState()
     new_state["usage"] = state.usage
     new_state["user_query"] = state.user_query
-    new_state['portfolio'] = response.content
+    new_state['portfolio'] = portfolio
     new_state['stocks'] = state.stocks
 
     # print(new_state['portfolio'])
@@ -0,0 +1,54 @@
+import concurrent.futures
+import os
+from typing import List, Optional
+
+from services.cache import TTLCache
+from services.deadline import Deadline
+from services.executors import submit
+from services.pipeline import new_state, run_market_stage
+
+# How long a prefetched market stage is kept for the /api/strategy/market
+# call that usually follows the summary. Set to 0 to disable prefetching.
+MARKET_PREFETCH_TTL_SECONDS = float(os.environ.get("MARKET_PREFETCH_TTL_SECONDS", "120"))
+
+# Values are futures, so a market request arriving while the prefetch is
+# still running attaches to it instead of starting the same work again.
+MARKET_PREFETCH = TTLCache("market_prefetch", MARKET_PREFETCH_TTL_SECONDS, maxsize=256)
+
+
+def market_key(stocks: List[str], user_query: str) -> tuple:
+    # market_trends reads the user query, so it is part of the key. Stock
+    # order is kept: the assembled market_news / macro_economics text follows it.
+    return (
+        tuple(dict.fromkeys(s.strip().upper() for s in stocks)),
+        " ".join((user_query or "").split()).casefold(),
+    )
+
+
+def prefetch_market(stocks: List[str], user_query: str) -> None:
+    """Start the market stage for `stocks` in the background if it isn't already cached."""
+    if not stocks or MARKET_PREFETCH_TTL_SECONDS <= 0:
+        return
+    key = market_key(stocks, user_query)
+
+    def start() -> concurrent.futures.Future:
+        print('\n', f"Prefetching market stage for {stocks}\n")
+        state = new_state(usage="strategy", user_query=user_query, stocks=list(stocks), deadline=Deadline())
+        future = submit("request", run_market_stage, state)
+        future.add_done_callback(drop_if_failed)
+        return future
+
+    def drop_if_failed(future: concurrent.futures.Future) -> None:
+        # A failed prefetch is dropped so the next request computes it live.
+        if future.cancelled() or future.exception() is not None:
+            MARKET_PREFETCH.pop(key)
+
+    MARKET_PREFETCH.get_or_compute(key, start)
+
+
+def prefetched_market(stocks: List[str], user_query: str) -> Optional[concurrent.futures.Future]:
+    """Future of a prefetched (possibly still running) market stage, if there is one."""
+    future = MARKET_PREFETCH.get(market_key(stocks, user_query))
+    if future is None or future.cancelled():
+        return None
+    return future
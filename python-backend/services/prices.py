@@ -0,0 +1,91 @@
+import os
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from services.cache import TTLCache
+from services.executors import map_bounded
+from services.metrics import track_upstream
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PRICE_HISTORY_TTL_SECONDS = float(os.environ.get("PRICE_HISTORY_TTL_SECONDS", str(15 * 60)))
+
+# Weekly closes change at most once a day, so every widget and endpoint in
+# the window shares one download per symbol.
+PRICE_HISTORY_CACHE = TTLCache("price_history", PRICE_HISTORY_TTL_SECONDS)
+
+
+def price_history(stock: str, period: str = "1y", interval: str = "1wk") -> "pd.DataFrame":
+    """OHLCV history for one symbol, indexed by date."""
+    key = (stock, period, interval)
+    df = PRICE_HISTORY_CACHE.get(key)
+    if df is not None:
+        return df
+
+    # Imported on first use to keep them out of the API's startup path.
+    import pandas as pd
+    import yfinance as yf
+
+    # Ticker.history rather than yf.download, which is unsafe across threads.
+    with track_upstream("yfinance", "history"):
+        df = yf.Ticker(stock).history(period=period, interval=interval)
+
+    df = df.drop(columns=["Dividends", "Stock Splits", "Capital Gains"], errors="ignore")
+    df.dropna(inplace=True)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+
+    if not df.empty:
+        PRICE_HISTORY_CACHE.set(key, df)
+    return df
+
+
+def latest_bar(stock: str, interval: str = "1m") -> Dict[str, Any]:
+    """Most recent intraday bar for one symbol, or {} when the market has none.
+
+    Not cached: the subscription poller calls it once per symbol per tick and
+    shares the result with every subscriber.
+    """
+    import yfinance as yf
+
+    with track_upstream("yfinance", "history"):
+        df = yf.Ticker(stock).history(period="1d", interval=interval)
+    df = df.dropna(subset=["Close"]) if "Close" in df.columns else df
+    if df.empty:
+        return {}
+    row = df.iloc[-1]
+    return {
+        "time": df.index[-1].isoformat(),
+        **{field.lower(): float(row[field]) for field in ("Open", "High", "Low", "Close", "Volume") if field in row},
+    }
+
+
+def price_records(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+    """History as JSON-ready rows, the shape /api/myStocks has always returned."""
+    df = df.reset_index()
+    if "Date" in df.columns:
+        df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
+    return df.to_dict(orient="records")
+
+
+def records_by_stock(histories: Dict[str, Any]) -> Dict[str, Any]:
+    """`fetch_price_histories` output with every frame converted by `price_records`."""
+    return {
+        stock: history if isinstance(history, dict) else price_records(history)
+        for stock, history in histories.items()
+    }
+
+
+def fetch_price_histories(stocks: List[str]) -> Dict[str, Any]:
+    """History per symbol, or an {"error": ...} entry for symbols that failed."""
+
+    def fetch(stock: str):
+        try:
+            df = price_history(stock)
+            if df.empty:
+                return {"error": {"message": "No data returned"}}
+            return df
+        except Exception as e:
+            return {"error": {"message": str(e)}}
+
+    return dict(zip(stocks, map_bounded(fetch, stocks)))
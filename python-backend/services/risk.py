@@ -0,0 +1,180 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.analytics import UNKNOWN_SECTOR, portfolio_stats, universe_of
+
+# (low, medium, high) severity cut-offs per rule, as a fraction of portfolio value:
+#   concentration  weight of a single stock
+#   sector         weight of a single sector
+#   volatility     weight in stocks with beta above `high_beta` or volatility above `high_volatility`
+#   overlap        combined weight of a pair correlated above `overlap_correlation`
+#   liquidity      weight in stocks trading less than `min_traded_value` per week
+# Any entry can be overridden with a JSON object in the RISK_THRESHOLDS env var.
+DEFAULT_THRESHOLDS: Dict[str, Any] = {
+    "concentration": [0.08, 0.15, 0.25],
+    "sector": [0.30, 0.40, 0.50],
+    "volatility": [0.15, 0.30, 0.50],
+    "overlap": [0.10, 0.20, 0.30],
+    "liquidity": [0.02, 0.05, 0.10],
+    "high_beta": 1.5,
+    "high_volatility": 0.45,
+    "overlap_correlation": 0.85,
+    # Average weekly traded value, in the listing currency.
+    "min_traded_value": {"NIFTY50": 5e9, "NASDAQ": 1e8},
+}
+RISK_THRESHOLDS = {**DEFAULT_THRESHOLDS, **json.loads(os.environ.get("RISK_THRESHOLDS") or "{}")}
+
+SEVERITIES = np.array(["", "low", "medium", "high"])
+
+RECOMMENDATIONS = {
+    "concentration": "Consider reducing position size or adding more diversified holdings.",
+    "sector": "Consider adding exposure to other sectors like healthcare or consumer goods.",
+    "volatility": "If risk-averse, consider balancing with low-beta dividend stocks.",
+    "overlap": "These holdings move together; trimming one reduces risk without losing much exposure.",
+    "liquidity": "Thinly traded stocks can be hard to exit quickly; size these positions accordingly.",
+}
+
+
+def _severity(values: np.ndarray, cutoffs) -> np.ndarray:
+    """0 (none) to 3 (high) for every value, by how many cut-offs it reaches."""
+    return (values[..., None] >= np.asarray(cutoffs)).sum(axis=-1)
+
+
+def _pct(x: float) -> str:
+    return f"{x:.1%}" if x < 0.1 else f"{x:.0%}"
+
+
+def evaluate(
+    weights: np.ndarray,
+    stats: Dict[str, Any],
+    thresholds: Optional[Dict[str, Any]] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Risk signals for a batch of portfolios over one symbol universe.
+
+    `weights` is (portfolios x symbols), each row a portfolio's value weights
+    over `stats["symbols"]`; `stats` holds the per-symbol arrays produced by
+    services.analytics.compute_stats (sectors, beta, volatility, liquidity,
+    correlation). Every rule is evaluated for all portfolios at once with
+    array operations; Python only runs to format the signals that fired, so
+    thousands of portfolios (e.g. a nightly alert run) cost one pass.
+    """
+    t = {**RISK_THRESHOLDS, **(thresholds or {})}
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    symbols = np.array(stats["symbols"], dtype=object)
+    n = len(symbols)
+    if weights.shape[1] != n:
+        raise ValueError(f"weights have {weights.shape[1]} columns for {n} symbols")
+
+    beta = np.nan_to_num(np.asarray(stats["beta"], dtype=float))
+    volatility = np.nan_to_num(np.asarray(stats["volatility"], dtype=float))
+    liquidity = np.asarray(stats["liquidity"], dtype=float)
+    correlation = np.asarray(stats["correlation"], dtype=float)
+    sector_names, sector_index = np.unique(np.array(stats["sectors"], dtype=object), return_inverse=True)
+
+    # concentration: (P, n)
+    stock_severity = _severity(weights, t["concentration"])
+
+    # sector: (P, S). Unmapped symbols share UNKNOWN_SECTOR, which says
+    # nothing about sector exposure, so it is never flagged.
+    one_hot = np.zeros((n, len(sector_names)))
+    one_hot[np.arange(n), sector_index] = 1.0
+    sector_weights = weights @ one_hot
+    sector_severity = _severity(sector_weights, t["sector"]) * (sector_names != UNKNOWN_SECTOR)
+
+    # volatility: (P,)
+    volatile = (beta > t["high_beta"]) | (volatility > t["high_volatility"])
+    volatile_weight = weights @ volatile
+    volatile_severity = _severity(volatile_weight, t["volatility"])
+
+    # overlap: (P, K) over the K highly correlated pairs
+    first, second = np.nonzero(np.triu(correlation, k=1) >= t["overlap_correlation"])
+    pair_weights = weights[:, first] + weights[:, second]
+    pair_severity = _severity(pair_weights, t["overlap"])
+
+    # liquidity: (P,)
+    floors = np.array([t["min_traded_value"].get(universe_of(s), 0.0) for s in symbols], dtype=float)
+    illiquid = np.nan_to_num(liquidity, nan=np.inf) < floors
+    illiquid_weight = weights @ illiquid
+    illiquid_severity = _severity(illiquid_weight, t["liquidity"])
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in range(len(weights))]
+
+    def signal(p, kind, suffix, severity, title, description, affected):
+        results[p].append({
+            "id": f"{kind}-{suffix}" if suffix else kind,
+            "type": kind,
+            "severity": str(SEVERITIES[severity]),
+            "title": title,
+            "description": description,
+            "affected_stocks": [str(s) for s in affected],
+            "recommendation": RECOMMENDATIONS[kind],
+        })
+
+    for p in np.flatnonzero(stock_severity.max(axis=1, initial=0)):
+        hits = np.flatnonzero(stock_severity[p])
+        hits = hits[np.argsort(-weights[p, hits])]
+        top = hits[0]
+        signal(
+            p, "concentration", "", int(stock_severity[p].max()),
+            "High Single-Stock Concentration",
+            f"{symbols[top]} represents {_pct(weights[p, top])} of your portfolio, which is above the "
+            f"recommended {_pct(t['concentration'][0])} threshold for individual stocks."
+            + (f" {len(hits) - 1} other holding{'s are' if len(hits) > 2 else ' is'} also above it." if len(hits) > 1 else ""),
+            symbols[hits],
+        )
+
+    for p, s in zip(*np.nonzero(sector_severity)):
+        members = np.flatnonzero((sector_index == s) & (weights[p] > 0))
+        signal(
+            p, "sector", str(sector_names[s]).lower().replace(" ", "-"), int(sector_severity[p, s]),
+            f"Sector Overweight: {sector_names[s]}",
+            f"{_pct(sector_weights[p, s])} allocation to the {sector_names[s]} sector.",
+            symbols[members],
+        )
+
+    for p in np.flatnonzero(volatile_severity):
+        members = np.flatnonzero(volatile & (weights[p] > 0))
+        signal(
+            p, "volatility", "", int(volatile_severity[p]),
+            "High Beta Holdings",
+            f"{_pct(volatile_weight[p])} of your portfolio is in stocks with beta above {t['high_beta']} "
+            f"or annualized volatility above {_pct(t['high_volatility'])}, contributing to overall portfolio volatility.",
+            symbols[members],
+        )
+
+    for p in np.flatnonzero(pair_severity.max(axis=1, initial=0)):
+        hits = np.flatnonzero(pair_severity[p])
+        pairs = [f"{symbols[first[k]]}/{symbols[second[k]]}" for k in hits]
+        affected = list(dict.fromkeys(s for k in hits for s in (symbols[first[k]], symbols[second[k]])))
+        signal(
+            p, "overlap", "", int(pair_severity[p].max()),
+            "Duplicate Holdings Detected",
+            f"{', '.join(pairs[:3])} move almost in lockstep (correlation above {t['overlap_correlation']}), "
+            f"creating {_pct(pair_weights[p, hits].max())} effective exposure to the same risk.",
+            affected,
+        )
+
+    for p in np.flatnonzero(illiquid_severity):
+        members = np.flatnonzero(illiquid & (weights[p] > 0))
+        signal(
+            p, "liquidity", "", int(illiquid_severity[p]),
+            "Thinly Traded Holdings",
+            f"{_pct(illiquid_weight[p])} of your portfolio is in stocks with low traded value.",
+            symbols[members],
+        )
+
+    order = {"high": 0, "medium": 1, "low": 2}
+    for signals in results:
+        signals.sort(key=lambda s: order[s["severity"]])
+    return results
+
+
+def risk_signals(holdings: List[Dict[str, Any]], histories: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Risk warnings for a set of holdings, from the request's shared price histories."""
+    stats = portfolio_stats(holdings, histories)
+    if not stats["symbols"]:
+        return []
+    return evaluate(stats["weights"][None, :], stats)[0]
@@ -0,0 +1,155 @@
+import os
+import threading
+from typing import Dict, List
+
+from classes import AppState
+from services.deadline import FETCH_MIN_SECONDS, has_time, mark_degraded
+from services.metrics import instrument_node
+from services.news_store import NEWS_STORE
+
+SENTIMENT_MODEL = os.environ.get(
+    "SENTIMENT_MODEL",
+    "mrm8488/distilroberta-finetuned-financial-news-sentiment-analysis",
+)
+SENTIMENT_BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", "16"))
+SENTIMENT_MAX_LENGTH = int(os.environ.get("SENTIMENT_MAX_LENGTH", "256"))
+
+# When set, news_report formats the locally scored sentiment directly and
+# never calls the LLM.
+NEWS_FAST_MODE = os.environ.get("NEWS_FAST_MODE", "").lower() in ("1", "true", "yes")
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def sentiment_band(x: float) -> str:
+    """Map a score in [-1, 1] onto the bands used by the news_report prompt."""
+    if x <= -0.35:
+        return "Bearish"
+    if x <= -0.15:
+        return "Somewhat-Bearish"
+    if x < 0.15:
+        return "Neutral"
+    if x < 0.35:
+        return "Somewhat-Bullish"
+    return "Bullish"
+
+
+def load_classifier():
+    """Load the tokenizer and an int8 dynamically quantized model once per process.
+
+    Returns None if transformers/torch or the model weights are unavailable, in
+    which case callers fall back to the LLM path.
+    """
+    global _classifier
+    if _classifier is not None:
+        return _classifier or None
+
+    with _classifier_lock:
+        if _classifier is not None:
+            return _classifier or None
+        try:
+            import torch
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(SENTIMENT_MODEL)
+            model = AutoModelForSequenceClassification.from_pretrained(SENTIMENT_MODEL)
+            model.eval()
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+            labels = {i: l.lower() for i, l in model.config.id2label.items()}
+            positive = [i for i, l in labels.items() if l.startswith("pos")]
+            negative = [i for i, l in labels.items() if l.startswith("neg")]
+            if not positive or not negative:
+                raise ValueError(f"Unexpected sentiment labels: {labels}")
+
+            _classifier = (tokenizer, model, positive[0], negative[0])
+            print('\n', f"Loaded sentiment model {SENTIMENT_MODEL}\n")
+        except Exception as e:
+            print("Sentiment model unavailable, falling back to LLM:", e)
+            # Remember the failure so every request doesn't retry the load.
+            _classifier = False
+    return _classifier or None
+
+
+def score_texts(texts: List[str]) -> List[float]:
+    """Score texts in batches; each score is P(positive) - P(negative)."""
+    classifier = load_classifier()
+    if classifier is None or not texts:
+        return []
+
+    import torch
+
+    tokenizer, model, pos, neg = classifier
+    scores: List[float] = []
+    for i in range(0, len(texts), SENTIMENT_BATCH_SIZE):
+        batch = tokenizer(
+            texts[i:i + SENTIMENT_BATCH_SIZE],
+            padding=True,
+            truncation=True,
+            max_length=SENTIMENT_MAX_LENGTH,
+            return_tensors="pt",
+        )
+        with torch.inference_mode():
+            probs = torch.softmax(model(**batch).logits, dim=-1)
+        scores.extend((probs[:, pos] - probs[:, neg]).tolist())
+    return scores
+
+
+# Node scoring every extracted news summary on CPU in one batched pass
+@instrument_node
+def news_sentiment(state: AppState) -> AppState:
+    print('\n', "Scoring News Sentiment locally.\n")
+
+    news_dict = state.get('news_dict') or {}
+    owners: List[str] = []
+    texts: List[str] = []
+    for stock, summaries in news_dict.items():
+        for summary in summaries:
+            if summary:
+                owners.append(stock)
+                texts.append(summary)
+
+    # Scores are stored with the articles, so only these summaries that were
+    # never scored are run through the model, and their scores written back.
+    known: Dict[str, Dict[str, float]] = {
+        stock: NEWS_STORE.sentiments(stock, summaries) for stock, summaries in news_dict.items()
+    }
+    unknown = list(dict.fromkeys(
+        text for stock, text in zip(owners, texts) if text not in known[stock]
+    ))
+    if unknown:
+        if not has_time(state, FETCH_MIN_SECONDS):
+            mark_degraded(state, "news_sentiment", f"deadline reached, {len(unknown)} summaries left unscored")
+        else:
+            fresh = score_texts(unknown)
+            if len(fresh) != len(unknown):
+                state['news_sentiment'] = {}
+                return state
+            scored = dict(zip(unknown, fresh))
+            for stock, summaries in news_dict.items():
+                new = {text: scored[text] for text in summaries if text in scored and text not in known[stock]}
+                if new:
+                    NEWS_STORE.save_sentiments(stock, new)
+                    known[stock].update(new)
+
+    per_stock: Dict[str, List[float]] = {}
+    for stock, text in zip(owners, texts):
+        if text in known[stock]:
+            per_stock.setdefault(stock, []).append(known[stock][text])
+    if texts and not per_stock:
+        state['news_sentiment'] = {}
+        return state
+
+    sentiment = {}
+    for stock in state.get('stocks') or []:
+        values = per_stock.get(stock, [])
+        score = round(sum(values) / len(values), 3) if values else 0.0
+        sentiment[stock] = {
+            "score": score,
+            "label": sentiment_band(score),
+            "articles": len(values),
+        }
+
+    state['news_sentiment'] = sentiment
+    return state
@@ -4,13 +4,15 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
 
 from classes import UsageClassfier
-from services.clients import llm
+from services import clients
+from services.metrics import instrument_node
 
 
 class StocksOnly(BaseModel):
     stocks: List[str] = Field(default_factory=list)
 
 
+@instrument_node
 def stock_extractor(state: UsageClassfier) -> UsageClassfier:
     print('\n', "Extracting stock symbols from user query.\n")
 
@@ -23,7 +25,7 @@ def stock_extractor(state: UsageClassfier) -> UsageClassfier:
     If no stocks are mentioned, return an empty list.
     """
 
-    extractor_llm = llm.with_structured_output(StocksOnly)
+    extractor_llm = clients.llm.with_structured_output(StocksOnly)
     extraction = extractor_llm.invoke([
         SystemMessage(content=prompt),
         HumanMessage(content=state.user_query.strip())
@@ -1,15 +1,89 @@
 import json
 import re
+from typing import Any, Dict, List, Optional
 
 from langchain_core.messages import HumanMessage
 
 from classes import AppState
-from services.clients import llm
+from services import clients
+from services.deadline import LLM_MIN_SECONDS, bounded, has_time, mark_degraded
+from services.metrics import instrument_node
+from services.optimizer import round_percentages
+
+
+def _targets_prompt(targets: Optional[Dict[str, Any]]) -> str:
+    if not targets or not targets.get('weights'):
+        return ""
+    weights = "\n".join(f"{symbol}: {percent}%" for symbol, percent in targets['weights'].items())
+    return f"""The recommended allocation has already been computed by a {targets['method'].replace('_', '-')} optimizer
+    on the stocks' historical covariance (expected annual return {targets.get('expected_return')}%, volatility {targets.get('volatility')}%):
+    ```
+    {weights}
+    ```
+    Use exactly these numbers for every recommendedPercent; do not change them. Your job is to explain them
+    to the investor in the insights, actionPlan and financialAdvice.{_missing_prompt(targets.get('missing'))}"""
+
+
+def _missing_prompt(missing: Optional[List[str]]) -> str:
+    if not missing:
+        return ""
+    return f"""
+    The optimizer had no price history for {', '.join(missing)}; give your own recommendedPercent for those,
+    and the numbers above will be scaled down to make room for them."""
 
 
+def _apply_targets(result: Dict[str, Any], targets: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Overwrite the LLM's recommended percentages with the optimizer's, so the numbers never drift.
+
+    Stocks the optimizer had no history for keep the LLM's row, with a note;
+    the optimizer's weights are scaled into whatever share those rows leave,
+    so the allocation still adds up to 100.
+    """
+    weights = (targets or {}).get('weights')
+    if not weights or not isinstance(result, dict):
+        return result
+
+    missing = {str(s).upper() for s in targets.get('missing') or []}
+    note = "Not optimized: no price history yet, the percentage is the model's own estimate."
+    kept = {
+        str(row.get('symbol', '')).upper(): {**row, "note": note}
+        for row in (result.get('recommendedPortfolio') or {}).get('allocations') or []
+        if isinstance(row, dict) and str(row.get('symbol', '')).upper() in missing
+    }
+    kept_share = sum(
+        row['recommendedPercent'] for row in kept.values() if isinstance(row.get('recommendedPercent'), (int, float))
+    )
+    weights = round_percentages(weights, max(0.0, 100.0 - min(kept_share, 100.0)))
+
+    result['recommendedPortfolio'] = {
+        **(result.get('recommendedPortfolio') or {}),
+        "allocations": [{"symbol": s, "recommendedPercent": p} for s, p in weights.items()] + list(kept.values()),
+    }
+    comparison = {
+        str(row.get('symbol', '')).upper(): row
+        for row in result.get('portfolioComparison') or [] if isinstance(row, dict)
+    }
+    rows = []
+    for symbol, percent in weights.items():
+        row = dict(comparison.get(symbol, {"symbol": symbol, "currentPercent": 0}))
+        current = row.get('currentPercent') or 0
+        row['recommendedPercent'] = percent
+        row['change'] = round(percent - current, 1) if isinstance(current, (int, float)) else percent
+        rows.append(row)
+    rows += [{**comparison[s], "note": note} for s in comparison if s in missing]
+    result['portfolioComparison'] = rows
+    return result
+
+
+@instrument_node
 def strategy(state: AppState) -> AppState:
     print('\n', "Generating the Strategy the user is looking for.\n")
 
+    if not has_time(state, LLM_MIN_SECONDS):
+        mark_degraded(state, "strategy", "deadline reached, strategy not generated")
+        state['strategy'] = ""
+        return state
+
     prompt = f"""
 
 
@@ -34,6 +108,8 @@ def strategy(state: AppState) -> AppState:
     {state['portfolio']}
     ```
 
+    {_targets_prompt(state.get('target_allocation'))}
+
     Transform the strategy into structured JSON optimized for UI. Return only valid JSON with this exact schema:
     {{
       "investorProfile": {{
@@ -113,7 +189,7 @@ def strategy(state: AppState) -> AppState:
     - Macro Economics: {state['macro_economics']}
     """
 
-    response = llm.invoke([HumanMessage(prompt)])
+    response = bounded(clients.llm, state).invoke([HumanMessage(prompt)])
     raw = response.content
 
     match = re.search(r"\{.*\}", raw, flags=re.DOTALL)
@@ -121,10 +197,11 @@ def strategy(state: AppState) -> AppState:
         raise ValueError("No valid JSON object found in LLM response.")
 
     json_str = match.group(0)
-    state['strategy'] = json.loads(json_str)
+    state['strategy'] = _apply_targets(json.loads(json_str), state.get('target_allocation'))
     return state
 
 
+@instrument_node
 def strategy_data(state: AppState) -> AppState:
     print('\n', "Generating the Strategy the user is looking for.\n")
 
@@ -156,6 +233,6 @@ def strategy_data(state: AppState) -> AppState:
     with proper reasoning.
     """
 
-    responce = llm.invoke([HumanMessage(prompt)])
+    responce = clients.llm.invoke([HumanMessage(prompt)])
     state['strategy']  = responce.content
     return state
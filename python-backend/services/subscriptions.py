@@ -0,0 +1,195 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.executors import run_in
+from services.metrics import SUBSCRIPTION_CLIENTS, SUBSCRIPTION_COALESCED, SUBSCRIPTION_FEEDS
+from services.news_store import NEWS_STORE
+from services.prices import latest_bar
+
+# How often each subscribed symbol is polled upstream, however many clients follow it.
+SUBSCRIPTION_POLL_SECONDS = float(os.environ.get("SUBSCRIPTION_POLL_SECONDS", "30"))
+
+# Recent articles a new subscriber receives for each symbol, and the most
+# undelivered articles kept per symbol for a slow subscriber.
+SUBSCRIPTION_NEWS_BACKLOG = int(os.environ.get("SUBSCRIPTION_NEWS_BACKLOG", "5"))
+SUBSCRIPTION_NEWS_BUFFER = int(os.environ.get("SUBSCRIPTION_NEWS_BUFFER", "20"))
+
+# Symbols a single connection may follow.
+SUBSCRIPTION_MAX_SYMBOLS = int(os.environ.get("SUBSCRIPTION_MAX_SYMBOLS", "50"))
+
+# Articles already seen per symbol; only newer ones are pushed.
+_SEEN_WINDOW = 200
+
+
+class Subscriber:
+    """One connected client and the updates it has not received yet.
+
+    Pending updates are held per (kind, symbol) rather than in a queue, so a
+    slow consumer never blocks the pollers and its backlog stays bounded: a
+    newer bar replaces an undelivered one, and undelivered articles are
+    merged into one batch capped at SUBSCRIPTION_NEWS_BUFFER.
+    """
+
+    def __init__(self):
+        self.symbols: Set[str] = set()
+        self._pending: Dict[Tuple[str, str], Any] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, kind: str, symbol: str, data: Any) -> None:
+        key = (kind, symbol)
+        if kind == "news":
+            merged = self._pending.get(key, []) + data
+            if len(merged) > SUBSCRIPTION_NEWS_BUFFER:
+                SUBSCRIPTION_COALESCED.labels(kind).inc(len(merged) - SUBSCRIPTION_NEWS_BUFFER)
+                merged = merged[-SUBSCRIPTION_NEWS_BUFFER:]
+            data = merged
+        elif key in self._pending:
+            SUBSCRIPTION_COALESCED.labels(kind).inc()
+        self._pending[key] = data
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Every pending update, oldest first; [] if none arrived within `timeout`."""
+        if not self._pending:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        pending, self._pending = self._pending, {}
+        self._ready.clear()
+        return [{"event": kind, "symbol": symbol, "data": data} for (kind, symbol), data in pending.items()]
+
+
+class SymbolFeed:
+    """The single upstream poller for one symbol and the clients following it."""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.subscribers: Set[Subscriber] = set()
+        self.recent: List[Dict[str, Any]] = []
+        self.bar: Dict[str, Any] = {}
+        self._seen: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    def _publish(self, kind: str, data: Any) -> None:
+        for subscriber in self.subscribers:
+            subscriber.push(kind, self.symbol, data)
+
+    def _poll_news(self) -> List[Dict[str, Any]]:
+        if NEWS_STORE.needs_refresh(self.symbol):
+            NEWS_STORE.refresh(self.symbol)
+        return NEWS_STORE.articles(self.symbol, limit=_SEEN_WINDOW)
+
+    async def poll(self) -> None:
+        news, bar = await asyncio.gather(
+            run_in("io", self._poll_news),
+            run_in("io", latest_bar, self.symbol),
+            return_exceptions=True,
+        )
+
+        if isinstance(news, Exception):
+            print(f"Error polling news for {self.symbol}:", news)
+        else:
+            first_poll = not self._seen
+            seen = set(self._seen)
+            fresh = [a for a in news if a["id"] not in seen]
+            self._seen = [a["id"] for a in news]
+            self.recent = news[:SUBSCRIPTION_NEWS_BACKLOG]
+            # The first poll only sets the baseline; subscribers get `recent` on joining.
+            if fresh and not first_poll:
+                self._publish("news", list(reversed(fresh)))
+            elif first_poll and self.recent:
+                self._publish("news", list(reversed(self.recent)))
+
+        if isinstance(bar, Exception):
+            print(f"Error polling price for {self.symbol}:", bar)
+        elif bar and bar != self.bar:
+            self.bar = bar
+            self._publish("bar", bar)
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error polling {self.symbol}:", e)
+            await asyncio.sleep(max(0.0, SUBSCRIPTION_POLL_SECONDS - (time.monotonic() - started)))
+
+
+class SubscriptionHub:
+    """Symbol feeds shared by every subscriber in the process.
+
+    A feed starts with its first subscriber and stops with its last, so
+    upstream load grows with the number of distinct symbols followed, not
+    with users x symbols. Must be used from the event loop.
+    """
+
+    def __init__(self):
+        self.feeds: Dict[str, SymbolFeed] = {}
+
+    def connect(self) -> Subscriber:
+        SUBSCRIPTION_CLIENTS.inc()
+        return Subscriber()
+
+    def subscribe(self, subscriber: Subscriber, symbols: Iterable[str]) -> List[str]:
+        """Follow `symbols`; returns the ones added, up to SUBSCRIPTION_MAX_SYMBOLS in total."""
+        added = []
+        for symbol in symbols:
+            symbol = symbol.strip().upper()
+            if not symbol or symbol in subscriber.symbols:
+                continue
+            if len(subscriber.symbols) >= SUBSCRIPTION_MAX_SYMBOLS:
+                break
+            feed = self.feeds.get(symbol)
+            if feed is None:
+                feed = self.feeds[symbol] = SymbolFeed(symbol)
+                feed.start()
+                SUBSCRIPTION_FEEDS.inc()
+            else:
+                # Late joiners get what the feed already has instead of waiting a tick.
+                if feed.recent:
+                    subscriber.push("news", symbol, list(reversed(feed.recent)))
+                if feed.bar:
+                    subscriber.push("bar", symbol, feed.bar)
+            feed.subscribers.add(subscriber)
+            subscriber.symbols.add(symbol)
+            added.append(symbol)
+        return added
+
+    def unsubscribe(self, subscriber: Subscriber, symbols: Iterable[str]) -> None:
+        for symbol in symbols:
+            symbol = symbol.strip().upper()
+            subscriber.symbols.discard(symbol)
+            feed = self.feeds.get(symbol)
+            if feed is None:
+                continue
+            feed.subscribers.discard(subscriber)
+            if not feed.subscribers:
+                feed.stop()
+                del self.feeds[symbol]
+                SUBSCRIPTION_FEEDS.dec()
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        self.unsubscribe(subscriber, list(subscriber.symbols))
+        SUBSCRIPTION_CLIENTS.dec()
+
+    def close(self) -> None:
+        for feed in self.feeds.values():
+            feed.stop()
+        self.feeds.clear()
+        SUBSCRIPTION_FEEDS.set(0)
+
+
+SUBSCRIPTIONS = SubscriptionHub()
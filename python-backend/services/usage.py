@@ -1,10 +1,12 @@
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from classes import AppState, UsageClassfier
-from services.clients import llm
+from services import clients
+from services.metrics import instrument_node
 
 
 # Node adivce or strategy extracter
+@instrument_node
 def usage_extractor(state: UsageClassfier) -> UsageClassfier:
     print('\n', "Determining whether the user wants advice, strategy, or neither.\n")
 
@@ -32,7 +34,7 @@ def usage_extractor(state: UsageClassfier) -> UsageClassfier:
     - `stocks`: A list of stock **symbols** (e.g., ["AAPL", "GOOGL"]), extracted from the companies mentioned
     """
 
-    usage_llm = llm.with_structured_output(UsageClassfier)
+    usage_llm = clients.llm.with_structured_output(UsageClassfier)
     extraction = usage_llm.invoke([
         SystemMessage(content=prompt),
         HumanMessage(content=state.user_query.strip())
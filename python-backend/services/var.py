@@ -0,0 +1,166 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from services.analytics import universe_of
+from services.covariance import COVARIANCE, yf_ticker
+from services.executors import PROCESS_POOL_SIZE, get_process_pool
+from services.prices import price_history
+
+VAR_HORIZONS = (1, 10)
+VAR_CONFIDENCES = (0.95, 0.99)
+VAR_DEFAULT_PATHS = int(os.environ.get("VAR_DEFAULT_PATHS", "100000"))
+VAR_MAX_PATHS = int(os.environ.get("VAR_MAX_PATHS", "1000000"))
+
+# Simulations are split into chunks of this many paths, each with its own
+# random stream. Chunks run across the process pool when there is more than one.
+VAR_CHUNK_PATHS = int(os.environ.get("VAR_CHUNK_PATHS", "25000"))
+
+# Degrees of freedom of the Student-t daily returns; fatter tails than a
+# normal, as daily equity returns have. 0 draws normal returns.
+VAR_T_DOF = float(os.environ.get("VAR_T_DOF", "5"))
+
+# Mixed NSE / US portfolios are reported in rupees.
+FX_TICKER = "USDINR=X"
+
+
+def cholesky(cov: np.ndarray) -> np.ndarray:
+    """Lower Cholesky factor, clipping negative eigenvalues if the EWMA matrix is not quite PSD."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        fixed = (vectors * np.clip(values, 1e-12, None)) @ vectors.T
+        return np.linalg.cholesky(fixed + 1e-12 * np.eye(len(cov)))
+
+
+def simulate(
+    factor: np.ndarray,
+    values: np.ndarray,
+    paths: int,
+    horizons: Sequence[int],
+    dof: float,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """P&L of `paths` simulated paths at each horizon, shape (len(horizons), paths).
+
+    Daily returns are correlated draws z @ factor' (Student-t when dof > 0,
+    scaled to the covariance), compounded per asset over the longest horizon.
+    Runs in a worker process; everything it needs is passed in.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(values)
+    growth = np.ones((paths, n))
+    pnl = np.empty((len(horizons), paths))
+    t_scale = np.sqrt((dof - 2) / dof) if dof > 2 else 1.0
+    for day in range(1, max(horizons) + 1):
+        returns = rng.standard_normal((paths, n)) @ factor.T
+        if dof > 2:
+            returns *= (t_scale / np.sqrt(rng.chisquare(dof, paths) / dof))[:, None]
+        growth *= 1 + returns
+        for i, horizon in enumerate(horizons):
+            if horizon == day:
+                pnl[i] = (growth - 1) @ values
+    return pnl
+
+
+def run_simulation(
+    factor: np.ndarray,
+    values: np.ndarray,
+    paths: int,
+    horizons: Sequence[int] = VAR_HORIZONS,
+    dof: float = VAR_T_DOF,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """`simulate` in chunks of VAR_CHUNK_PATHS, spread across the process pool.
+
+    Each chunk draws from its own child of one SeedSequence, and the chunking
+    does not depend on the pool size, so a seeded run gives the same result
+    on any machine.
+    """
+    sizes = [VAR_CHUNK_PATHS] * (paths // VAR_CHUNK_PATHS) + ([paths % VAR_CHUNK_PATHS] if paths % VAR_CHUNK_PATHS else [])
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(factor, values, size, tuple(horizons), dof, stream) for size, stream in zip(sizes, streams)]
+    if len(args) == 1 or PROCESS_POOL_SIZE <= 1:
+        return np.concatenate([simulate(*a) for a in args], axis=1)
+
+    pool = get_process_pool()
+    futures = [pool.submit(simulate, *a) for a in args]
+    return np.concatenate([f.result() for f in futures], axis=1)
+
+
+def risk_measures(pnl: np.ndarray, confidences: Sequence[float]) -> Dict[str, Dict[str, float]]:
+    """VaR and CVaR (expected shortfall) as positive losses, per confidence level."""
+    var, cvar = {}, {}
+    for c in confidences:
+        cutoff = np.quantile(pnl, 1 - c)
+        var[f"{c:g}"] = float(-cutoff)
+        cvar[f"{c:g}"] = float(-pnl[pnl <= cutoff].mean())
+    return {"var": var, "cvar": cvar}
+
+
+def _usd_inr() -> float:
+    df = price_history(FX_TICKER, period="5d", interval="1d")
+    return float(df["Close"].dropna().iloc[-1])
+
+
+def portfolio_var(
+    holdings: List[Dict[str, Any]],
+    paths: int = VAR_DEFAULT_PATHS,
+    confidences: Sequence[float] = VAR_CONFIDENCES,
+    horizons: Sequence[int] = VAR_HORIZONS,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Monte Carlo VaR / CVaR of a set of holdings over 1- and 10-day horizons.
+
+    Positions are valued at the covariance store's last closes and simulated
+    with its EWMA daily covariance. Symbols the store cannot price are left
+    out and reported under `missing`; the request never waits for their history.
+    """
+    quantities: Dict[str, float] = {}
+    for h in holdings:
+        symbol = (h.get("symbol") or "").strip().upper() if isinstance(h, dict) else ""
+        try:
+            quantity = float(h.get("quantity") or 0)
+        except (TypeError, ValueError):
+            continue
+        if symbol and quantity > 0:
+            quantities[symbol] = quantities.get(symbol, 0.0) + quantity
+
+    symbols = list(quantities)
+    cov, missing = COVARIANCE.covariance(symbols, annualize=False)
+    # Symbols outside the store are added in the background for later requests.
+    COVARIANCE.queue_symbols(missing)
+    prices = np.array([COVARIANCE.last_close.get(yf_ticker(s), np.nan) for s in symbols])
+    priced = np.array([s not in missing for s in symbols]) & np.isfinite(prices)
+    missing = [s for s, ok in zip(symbols, priced) if not ok]
+
+    symbols = [s for s, ok in zip(symbols, priced) if ok]
+    values = np.array([quantities[s] for s in symbols]) * prices[priced]
+    cov = cov[np.ix_(priced, priced)]
+
+    universes = {universe_of(s) for s in symbols}
+    currency = "INR" if "NIFTY50" in universes or not universes else "USD"
+    if len(universes) > 1:
+        is_usd = np.array([universe_of(s) == "NASDAQ" for s in symbols])
+        values = np.where(is_usd, values * _usd_inr(), values)
+
+    result: Dict[str, Any] = {
+        "currency": currency,
+        "portfolio_value": float(values.sum()),
+        "paths": paths,
+        "horizons": [],
+        "missing": missing,
+    }
+    if not symbols:
+        return result
+
+    pnl = run_simulation(cholesky(cov), values, paths, horizons, VAR_T_DOF, seed)
+    for horizon, horizon_pnl in zip(horizons, pnl):
+        result["horizons"].append({
+            "days": horizon,
+            "expected_pnl": float(horizon_pnl.mean()),
+            **risk_measures(horizon_pnl, confidences),
+        })
+    return result
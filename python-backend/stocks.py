@@ -52,54 +52,54 @@ NASDAQ = {
 }
 
 NIFTY50 = {
-"ADANIPORTS": "Adani Ports and Special Economic Zone Ltd",
-"ASIANPAINT": "Asian Paints Ltd",
-"AXISBANK": "Axis Bank Ltd",
-"BAJAJ-AUTO": "Bajaj Auto Ltd",
-"BAJFINANCE": "Bajaj Finance Ltd",
-"BAJAJFINSV": "Bajaj Finserv Ltd",
-"BHARTIARTL": "Bharti Airtel Ltd",
-"BPCL": "Bharat Petroleum Corporation Ltd",
-"BRITANNIA": "Britannia Industries Ltd",
-"CIPLA": "Cipla Ltd",
-"COALINDIA": "Coal India Ltd",
-"DIVISLAB": "Divi's Laboratories Ltd",
-"DRREDDY": "Dr. Reddy's Laboratories Ltd",
-"EICHERMOT": "Eicher Motors Ltd",
-"GRASIM": "Grasim Industries Ltd",
-"HCLTECH": "HCL Technologies Ltd",
-"HDFCBANK": "HDFC Bank Ltd",
-"HDFCLIFE": "HDFC Life Insurance Company Ltd",
-"HEROMOTOCO": "Hero MotoCorp Ltd",
-"HINDALCO": "Hindalco Industries Ltd",
-"HINDUNILVR": "Hindustan Unilever Ltd",
-"ICICIBANK": "ICICI Bank Ltd",
-"INDUSINDBK": "IndusInd Bank Ltd",
-"INFY": "Infosys Ltd",
-"ITC": "ITC Ltd",
-"JSWSTEEL": "JSW Steel Ltd",
-"KOTAKBANK": "Kotak Mahindra Bank Ltd",
-"LT": "Larsen & Toubro Ltd",
-"M&M": "Mahindra & Mahindra Ltd",
-"MARUTI": "Maruti Suzuki India Ltd",
-"NESTLEIND": "Nestle India Ltd",
-"NTPC": "NTPC Ltd",
-"ONGC": "Oil & Natural Gas Corporation Ltd",
-"POWERGRID": "Power Grid Corporation of India Ltd",
-"RELIANCE": "Reliance Industries Ltd",
-"SBILIFE": "SBI Life Insurance Company Ltd",
-"SBIN": "State Bank of India",
-"SHREECEM": "Shree Cement Ltd",
-"SUNPHARMA": "Sun Pharmaceutical Industries Ltd",
-"TATACONSUM": "Tata Consumer Products Ltd",
-"TATAMOTORS": "Tata Motors Ltd",
-"TATASTEEL": "Tata Steel Ltd",
-"TCS": "Tata Consultancy Services Ltd",
-"TECHM": "Tech Mahindra Ltd",
-"TITAN": "Titan Company Ltd",
-"ULTRACEMCO": "UltraTech Cement Ltd",
-"UPL": "UPL Ltd",
-"WIPRO": "Wipro Ltd"
+"ADANIPORTS": {"name": "Adani Ports and Special Economic Zone Ltd", "sector": "Industrials"},  # Ports & Logistics
+"ASIANPAINT": {"name": "Asian Paints Ltd", "sector": "Materials"},  # Paints
+"AXISBANK": {"name": "Axis Bank Ltd", "sector": "Financials"},  # Private Bank
+"BAJAJ-AUTO": {"name": "Bajaj Auto Ltd", "sector": "Consumer Discretionary"},
+"BAJFINANCE": {"name": "Bajaj Finance Ltd", "sector": "Financials"},  # NBFC
+"BAJAJFINSV": {"name": "Bajaj Finserv Ltd", "sector": "Financials"},  # Financial Holding
+"BHARTIARTL": {"name": "Bharti Airtel Ltd", "sector": "Communication Services"},
+"BPCL": {"name": "Bharat Petroleum Corporation Ltd", "sector": "Energy"},
+"BRITANNIA": {"name": "Britannia Industries Ltd", "sector": "Consumer Staples"},
+"CIPLA": {"name": "Cipla Ltd", "sector": "Health Care"},
+"COALINDIA": {"name": "Coal India Ltd", "sector": "Energy"},
+"DIVISLAB": {"name": "Divi's Laboratories Ltd", "sector": "Health Care"},
+"DRREDDY": {"name": "Dr. Reddy's Laboratories Ltd", "sector": "Health Care"},
+"EICHERMOT": {"name": "Eicher Motors Ltd", "sector": "Consumer Discretionary"},
+"GRASIM": {"name": "Grasim Industries Ltd", "sector": "Materials"},  # Cement & Fibres
+"HCLTECH": {"name": "HCL Technologies Ltd", "sector": "Technology"},
+"HDFCBANK": {"name": "HDFC Bank Ltd", "sector": "Financials"},  # Private Bank
+"HDFCLIFE": {"name": "HDFC Life Insurance Company Ltd", "sector": "Financials"},  # Insurance
+"HEROMOTOCO": {"name": "Hero MotoCorp Ltd", "sector": "Consumer Discretionary"},
+"HINDALCO": {"name": "Hindalco Industries Ltd", "sector": "Materials"},
+"HINDUNILVR": {"name": "Hindustan Unilever Ltd", "sector": "Consumer Staples"},
+"ICICIBANK": {"name": "ICICI Bank Ltd", "sector": "Financials"},  # Private Bank
+"INDUSINDBK": {"name": "IndusInd Bank Ltd", "sector": "Financials"},  # Private Bank
+"INFY": {"name": "Infosys Ltd", "sector": "Technology"},
+"ITC": {"name": "ITC Ltd", "sector": "Consumer Staples"},  # FMCG & Cigarettes
+"JSWSTEEL": {"name": "JSW Steel Ltd", "sector": "Materials"},
+"KOTAKBANK": {"name": "Kotak Mahindra Bank Ltd", "sector": "Financials"},  # Private Bank
+"LT": {"name": "Larsen & Toubro Ltd", "sector": "Industrials"},  # Engineering & Construction
+"M&M": {"name": "Mahindra & Mahindra Ltd", "sector": "Consumer Discretionary"},
+"MARUTI": {"name": "Maruti Suzuki India Ltd", "sector": "Consumer Discretionary"},
+"NESTLEIND": {"name": "Nestle India Ltd", "sector": "Consumer Staples"},
+"NTPC": {"name": "NTPC Ltd", "sector": "Utilities"},
+"ONGC": {"name": "Oil & Natural Gas Corporation Ltd", "sector": "Energy"},
+"POWERGRID": {"name": "Power Grid Corporation of India Ltd", "sector": "Utilities"},
+"RELIANCE": {"name": "Reliance Industries Ltd", "sector": "Energy"},  # Oil to Chemicals, Retail & Telecom
+"SBILIFE": {"name": "SBI Life Insurance Company Ltd", "sector": "Financials"},  # Insurance
+"SBIN": {"name": "State Bank of India", "sector": "Financials"},  # Public Sector Bank
+"SHREECEM": {"name": "Shree Cement Ltd", "sector": "Materials"},  # Cement
+"SUNPHARMA": {"name": "Sun Pharmaceutical Industries Ltd", "sector": "Health Care"},
+"TATACONSUM": {"name": "Tata Consumer Products Ltd", "sector": "Consumer Staples"},
+"TATAMOTORS": {"name": "Tata Motors Ltd", "sector": "Consumer Discretionary"},
+"TATASTEEL": {"name": "Tata Steel Ltd", "sector": "Materials"},
+"TCS": {"name": "Tata Consultancy Services Ltd", "sector": "Technology"},
+"TECHM": {"name": "Tech Mahindra Ltd", "sector": "Technology"},
+"TITAN": {"name": "Titan Company Ltd", "sector": "Consumer Discretionary"},  # Jewellery & Watches
+"ULTRACEMCO": {"name": "UltraTech Cement Ltd", "sector": "Materials"},  # Cement
+"UPL": {"name": "UPL Ltd", "sector": "Materials"},  # Agrochemicals
+"WIPRO": {"name": "Wipro Ltd", "sector": "Technology"},
 }
 
 
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest import COLUMNS, join_realized
+
+# Thu 2024-06-06 .. Tue 2024-06-11, no weekend bars.
+CLOSES = {
+    "AAPL": pd.Series([100.0, 101.0, 102.0, 103.0, 104.0],
+                      index=pd.to_datetime(["2024-06-06", "2024-06-07", "2024-06-10", "2024-06-11", "2024-07-01"])),
+}
+
+
+def prediction(stock, made_at, horizon):
+    return ["m", stock, pd.Timestamp(made_at), horizon, 100.0, np.nan, np.nan]
+
+
+def join(*rows):
+    return join_realized(pd.DataFrame(list(rows), columns=COLUMNS), CLOSES)
+
+
+@pytest.mark.parametrize("made_at, horizon, reference, realized", [
+    # Day1 from Friday after the close is Monday's close.
+    ("2024-06-07 17:00", 1, 101.0, 102.0),
+    # Made on Saturday: the reference is Friday's close.
+    ("2024-06-08 10:00", 1, 101.0, 102.0),
+    # Day3 from Friday lands on Monday exactly.
+    ("2024-06-07 17:00", 3, 101.0, 102.0),
+    # Day1 from Monday is Tuesday.
+    ("2024-06-10 17:00", 1, 102.0, 103.0),
+])
+def test_alignment_across_weekends(made_at, horizon, reference, realized):
+    out = join(prediction("AAPL", made_at, horizon))
+    assert out.loc[0, "reference"] == reference
+    assert out.loc[0, "realized"] == realized
+
+
+def test_reference_before_the_close_is_the_previous_session():
+    out = join(prediction("AAPL", "2024-06-07 10:00", 1))
+    assert out.loc[0, "reference"] == 100.0
+
+
+def test_no_close_near_the_horizon_is_not_matched():
+    # The next close after Tuesday is weeks later.
+    out = join(prediction("AAPL", "2024-06-11 17:00", 1))
+    assert np.isnan(out.loc[0, "realized"])
+
+
+def test_unknown_stocks_and_unelapsed_horizons_are_nan():
+    out = join(prediction("ZZZ", "2024-06-07 17:00", 1), prediction("AAPL", "2024-07-01 17:00", 7))
+    assert out[["reference", "realized"]].iloc[0].isna().all()
+    assert out.loc[1, "reference"] == 104.0 and np.isnan(out.loc[1, "realized"])
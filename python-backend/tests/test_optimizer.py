@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from services.optimizer import (
+    MEAN_VARIANCE,
+    MIN_VARIANCE,
+    RISK_PARITY,
+    optimize_batch,
+    project_capped_simplex,
+    round_percentages,
+)
+
+
+def random_cov(rng, batch, n):
+    a = rng.normal(0, 0.2, (batch, n, n))
+    return a @ a.transpose(0, 2, 1) + 0.01 * np.eye(n)
+
+
+def test_projection_keeps_feasible_points():
+    v = np.array([[0.5, 0.3, 0.2]])
+    np.testing.assert_allclose(project_capped_simplex(v, np.ones((1, 3))), v, atol=1e-9)
+
+
+def test_projection_caps_and_redistributes():
+    w = project_capped_simplex(np.array([[2.0, 0.0, 0.0]]), np.full((1, 3), 0.5))
+    np.testing.assert_allclose(w, [[0.5, 0.25, 0.25]], atol=1e-9)
+
+
+def test_projection_rows_with_small_caps_get_their_caps():
+    cap = np.array([[0.2, 0.3, 0.1]])
+    np.testing.assert_allclose(project_capped_simplex(np.array([[1.0, 2.0, 3.0]]), cap), cap, atol=1e-9)
+
+
+def test_projection_is_on_the_capped_simplex():
+    rng = np.random.default_rng(0)
+    v = rng.normal(size=(50, 8))
+    cap = np.full((50, 8), 0.3)
+    w = project_capped_simplex(v, cap)
+    np.testing.assert_allclose(w.sum(axis=1), 1.0, atol=1e-9)
+    assert (w >= 0).all() and (w <= cap + 1e-12).all()
+
+
+@pytest.mark.parametrize("method", [MIN_VARIANCE, RISK_PARITY, MEAN_VARIANCE])
+def test_weights_sum_to_one_within_caps(method):
+    rng = np.random.default_rng(1)
+    cov = random_cov(rng, 20, 6)
+    mu = rng.normal(0.1, 0.05, (20, 6))
+    mask = np.ones((20, 6), dtype=bool)
+    mask[::2, 4:] = False
+    cap = 0.35
+    w = optimize_batch(cov, mu, [method] * 20, np.full(20, 4.0), np.full(20, cap), mask)
+    np.testing.assert_allclose(w.sum(axis=1), 1.0, atol=1e-6)
+    assert (w >= -1e-12).all() and (w <= cap + 1e-6).all()
+    assert (w[~mask] == 0).all()
+
+
+def test_caps_below_equal_weight_fall_back_to_equal_weights():
+    rng = np.random.default_rng(2)
+    w = optimize_batch(random_cov(rng, 1, 4), np.zeros((1, 4)), [MIN_VARIANCE], np.zeros(1), np.array([0.1]))
+    np.testing.assert_allclose(w, 0.25, atol=1e-6)
+
+
+def test_risk_parity_contributions_are_equal():
+    rng = np.random.default_rng(3)
+    cov = random_cov(rng, 5, 5)
+    w = optimize_batch(cov, np.zeros((5, 5)), [RISK_PARITY] * 5, np.zeros(5), np.ones(5))
+    contributions = w * np.einsum("bij,bj->bi", cov, w)
+    share = contributions / contributions.sum(axis=1, keepdims=True)
+    np.testing.assert_allclose(share, 0.2, atol=1e-3)
+
+
+def test_min_variance_beats_equal_weights():
+    rng = np.random.default_rng(4)
+    cov = random_cov(rng, 10, 5)
+    w = optimize_batch(cov, np.zeros((10, 5)), [MIN_VARIANCE] * 10, np.zeros(10), np.ones(10))
+    equal = np.full(5, 0.2)
+    assert (np.einsum("bi,bij,bj->b", w, cov, w) <= equal @ cov @ equal + 1e-9).all()
+
+
+def test_round_percentages_add_up_exactly():
+    rounded = round_percentages({"A": 1 / 3, "B": 1 / 3, "C": 1 / 3})
+    assert rounded == {"A": 33.4, "B": 33.3, "C": 33.3}
+    assert round(sum(round_percentages({"A": 0.123, "B": 0.877}, 80).values()), 1) == 80.0
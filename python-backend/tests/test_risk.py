@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from services.risk import evaluate
+
+THRESHOLDS = {
+    "concentration": [0.08, 0.15, 0.25],
+    "sector": [0.30, 0.40, 0.50],
+    "volatility": [0.15, 0.30, 0.50],
+    "overlap": [0.10, 0.20, 0.30],
+    "liquidity": [0.02, 0.05, 0.10],
+    "high_beta": 1.5,
+    "high_volatility": 0.45,
+    "overlap_correlation": 0.85,
+    "min_traded_value": {"NIFTY50": 0.0, "NASDAQ": 0.0},
+}
+
+
+def stats(n, **overrides):
+    base = {
+        "symbols": [f"S{i}" for i in range(n)],
+        "sectors": [f"Sector {i}" for i in range(n)],
+        "beta": np.ones(n),
+        "volatility": np.full(n, 0.2),
+        "liquidity": np.full(n, 1e12),
+        "correlation": np.eye(n),
+    }
+    return {**base, **overrides}
+
+
+def signals(weights, stats, **thresholds):
+    return evaluate(np.array([weights]), stats, {**THRESHOLDS, **thresholds})[0]
+
+
+def by_type(found):
+    return {s["type"]: s for s in found}
+
+
+@pytest.mark.parametrize("weight, severity", [(0.07, None), (0.08, "low"), (0.15, "medium"), (0.2499, "medium"), (0.25, "high")])
+def test_concentration_thresholds(weight, severity):
+    n = 20
+    weights = [weight] + [(1 - weight) / (n - 1)] * (n - 1)
+    found = by_type(signals(weights, stats(n), sector=[2, 2, 2]))
+    assert found.get("concentration", {}).get("severity") == severity
+
+
+def test_sector_weight_sums_its_members_and_ignores_unknown():
+    sectors = ["Tech", "Tech", "Other", "Other", "Energy"]
+    found = signals([0.2, 0.2, 0.25, 0.25, 0.1], stats(5, sectors=sectors), concentration=[1, 1, 1])
+    sector = [s for s in found if s["type"] == "sector"]
+    assert [(s["id"], s["severity"]) for s in sector] == [("sector-tech", "medium")]
+    assert sector[0]["affected_stocks"] == ["S0", "S1"]
+
+
+def test_volatility_counts_high_beta_or_high_volatility():
+    st = stats(4, beta=np.array([1.6, 1.0, 1.0, 1.0]), volatility=np.array([0.2, 0.5, 0.2, 0.2]))
+    found = by_type(signals([0.1, 0.2, 0.35, 0.35], st, concentration=[1, 1, 1], sector=[2, 2, 2]))
+    assert found["volatility"]["severity"] == "medium"
+    assert found["volatility"]["affected_stocks"] == ["S0", "S1"]
+
+
+def test_overlap_fires_only_above_the_correlation_cut_off():
+    correlation = np.eye(4)
+    correlation[0, 1] = correlation[1, 0] = 0.9
+    correlation[2, 3] = correlation[3, 2] = 0.8
+    found = by_type(signals([0.1, 0.1, 0.4, 0.4], stats(4, correlation=correlation), concentration=[1, 1, 1], sector=[2, 2, 2]))
+    assert found["overlap"]["severity"] == "medium"
+    assert found["overlap"]["affected_stocks"] == ["S0", "S1"]
+
+
+def test_liquidity_uses_the_floor_for_the_listing():
+    # TCS.NS trades as little as S0, but NSE stocks have no floor here; an unknown traded value is not flagged.
+    st = stats(4, symbols=["S0", "TCS.NS", "S2", "S3"], liquidity=np.array([1.0, 1.0, np.nan, 1e12]))
+    found = by_type(signals([0.06, 0.3, 0.3, 0.34], st, concentration=[1, 1, 1], sector=[2, 2, 2],
+                            min_traded_value={"NIFTY50": 0.0, "NASDAQ": 100.0}))
+    assert found["liquidity"]["severity"] == "medium"
+    assert found["liquidity"]["affected_stocks"] == ["S0"]
+
+
+def test_every_portfolio_in_the_batch_is_evaluated():
+    results = evaluate(np.array([[0.5, 0.5], [0.05, 0.95]]), stats(2), {**THRESHOLDS, "sector": [2, 2, 2]})
+    assert [[s["severity"] for s in r] for r in results] == [["high"], ["high"]]
+    assert results[1][0]["affected_stocks"] == ["S1"]
+
+
+def test_weights_must_match_the_symbols():
+    with pytest.raises(ValueError):
+        evaluate(np.ones((1, 3)) / 3, stats(2))
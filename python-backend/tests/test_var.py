@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from services import var
+from services.executors import shutdown_executors
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(var, "VAR_CHUNK_PATHS", 1000)
+    yield
+    shutdown_executors()
+
+
+def inputs():
+    cov = np.array([[0.0004, 0.0001], [0.0001, 0.0009]])
+    return var.cholesky(cov), np.array([1000.0, 2000.0])
+
+
+def test_seeded_run_is_deterministic(small_chunks):
+    factor, values = inputs()
+    first = var.run_simulation(factor, values, 2500, seed=7)
+    second = var.run_simulation(factor, values, 2500, seed=7)
+    assert first.shape == (len(var.VAR_HORIZONS), 2500)
+    np.testing.assert_array_equal(first, second)
+    assert not np.array_equal(first, var.run_simulation(factor, values, 2500, seed=8))
+
+
+def test_result_does_not_depend_on_the_pool(small_chunks, monkeypatch):
+    factor, values = inputs()
+    pooled = var.run_simulation(factor, values, 2500, seed=7)
+    monkeypatch.setattr(var, "PROCESS_POOL_SIZE", 1)
+    np.testing.assert_array_equal(pooled, var.run_simulation(factor, values, 2500, seed=7))
+
+
+def test_risk_measures_are_positive_losses():
+    pnl = np.arange(-50.0, 50.0)
+    measures = var.risk_measures(pnl, (0.95,))
+    assert measures["var"]["0.95"] == pytest.approx(-np.quantile(pnl, 0.05))
+    assert measures["cvar"]["0.95"] >= measures["var"]["0.95"]
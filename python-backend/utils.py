@@ -2,23 +2,33 @@ from stocks import NIFTY50 as _NIFTY50
 from stocks import NASDAQ as _NASDAQ
 
 from services.advice import advice, advice_data
-from services.clients import FIN_CLIENT, MODEL, llm
+from services import clients
+from services.clients import MODEL
 from services.macro_analysis import macro_economic, market_trends
 from services.news import news_extractor, news_report
 from services.parallel import (
     macro_economic_async,
     news_extractor_async,
     news_report_async,
+    news_sentiment_async,
     run_parallel_news_and_macro,
     run_parallel_news_and_macro_async,
 )
 from services.portfolio import portfolio_builder, portfolio_summariser
+from services.sentiment import news_sentiment
 from services.strategy import strategy, strategy_data
 from services.usage import usage_check, usage_extractor
 
 NIFTY50 = list(_NIFTY50)
 NASDAQ = list(_NASDAQ)
 
+
+def __getattr__(name):
+    # llm / FIN_CLIENT are built lazily by services.clients.
+    if name in ("llm", "FIN_CLIENT"):
+        return getattr(clients, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 __all__ = [
     "MODEL",
     "FIN_CLIENT",
@@ -34,6 +44,8 @@ __all__ = [
     "news_extractor_async",
     "news_report",
     "news_report_async",
+    "news_sentiment",
+    "news_sentiment_async",
     "portfolio_builder",
     "portfolio_summariser",
     "run_parallel_news_and_macro",